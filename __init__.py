@@ -1,3 +1,5 @@
-from .symfile import SymFile
+__version__ = "0.1.0"
 
-__all__ = [SymFile]
\ No newline at end of file
+from .symfile import SymFile, iter_entries
+
+__all__ = [SymFile, iter_entries]
\ No newline at end of file
@@ -0,0 +1,143 @@
+"""
+Maps addresses back to the function and source line they belong to, for symbolizing crash dumps and PC traces
+"""
+import array
+from bisect import bisect_right
+from typing import Iterable, List, NamedTuple, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # Lookups fall back to a binary search per address
+    np = None
+
+import symdump.symbols as syms
+
+
+class Location(NamedTuple):
+    """Where an address ended up. Everything but `address` is None if it isn't inside a known function"""
+    address: int
+    function: Union[str, None]
+    offset: Union[int, None]
+    """Distance from the start of `function`"""
+    file: Union[str, None]
+    line: Union[int, None]
+
+
+class AddressIndex:
+    """Sorted, array backed tables of function ranges and source lines for a `SymFile`.
+
+    Function ranges come from each `FunctionSymbol` and its end address. Lines come from replaying the line program:
+    `SourceLineBeginSymbol` and each function start set the file and line, `SourceLineSymbol` entries then increment
+    (`sl_inc`, `sl_add1`, `sl_add2`) or set (`sl_set`) the line at their address.
+
+    When NumPy is available, the batch lookups are vectorised with `numpy.searchsorted`.
+
+    Args:
+        symfile (SymFile): File to index. Function bodies are decoded if they haven't been already
+    """
+    def __init__(self, symfile):
+        functions: List[Tuple[int, int, str]] = []
+        lines: List[Tuple[int, int, int]] = []
+        self.files: List[str] = []
+        """File names, indexed by `line_files`"""
+        file_ids = {}
+
+        def file_id(name: str) -> int:
+            if name not in file_ids:
+                file_ids[name] = len(self.files)
+                self.files.append(name)
+            return file_ids[name]
+
+        curr_file = -1
+        curr_line = 0
+
+        def replay(entries: Iterable[syms.SymbolEntry]):
+            nonlocal curr_file, curr_line
+            for entry in entries:
+                symbol = entry.symbol
+                if type(symbol) is syms.SourceLineSymbol:
+                    if symbol.dir_type == 6:
+                        curr_line = symbol.value
+                    else:
+                        curr_line += symbol.value
+                elif type(symbol) is syms.SourceLineBeginSymbol:
+                    curr_file = file_id(symbol.file)
+                    curr_line = symbol.line[0]
+                elif type(symbol) is syms.FunctionSymbol:
+                    functions.append((entry.value, symbol.end_address, symbol.name))
+                    curr_file = file_id(symbol.file)
+                    curr_line = symbol.line[0]
+                    lines.append((entry.value, curr_line, curr_file))
+                    replay(symbol.children)
+                    curr_line = symbol.end.line
+                    entry = symbol.children[-1]
+                else:
+                    continue
+                if curr_file != -1:
+                    lines.append((entry.value, curr_line, curr_file))
+
+        replay(symfile.symbols)
+
+        # Stable sorts, so of several records at the same address the last one read wins
+        functions.sort(key=lambda x: x[0])
+        lines.sort(key=lambda x: x[0])
+        self.function_names: List[str] = [x[2] for x in functions]
+        self.function_starts = self._array([x[0] for x in functions])
+        self.function_ends = self._array([x[1] for x in functions])
+        self.line_addresses = self._array([x[0] for x in lines])
+        self.line_numbers = self._array([x[1] for x in lines])
+        self.line_files = self._array([x[2] for x in lines])
+
+    @staticmethod
+    def _array(values: List[int]):
+        if np is not None:
+            return np.array(values, dtype=np.int64)
+        return array.array('q', values)
+
+    def function_indices(self, addresses: Sequence[int]):
+        """Index into `function_names` of the function containing each address, -1 where there isn't one"""
+        if np is not None:
+            addresses = np.asarray(addresses, dtype=np.int64)
+            indices = np.searchsorted(self.function_starts, addresses, side="right") - 1
+            if len(self.function_ends) == 0:
+                return indices
+            inside = (indices >= 0) & (addresses <= self.function_ends[np.maximum(indices, 0)])
+            return np.where(inside, indices, -1)
+        indices = array.array('q')
+        for address in addresses:
+            i = bisect_right(self.function_starts, address) - 1
+            indices.append(i if i >= 0 and address <= self.function_ends[i] else -1)
+        return indices
+
+    def line_indices(self, addresses: Sequence[int]):
+        """Index of the line record in effect at each address, -1 for addresses before the first record"""
+        if np is not None:
+            return np.searchsorted(self.line_addresses, np.asarray(addresses, dtype=np.int64), side="right") - 1
+        return array.array('q', [bisect_right(self.line_addresses, address) - 1 for address in addresses])
+
+    def lookup_many(self, addresses: Sequence[int]) -> List[Location]:
+        """Resolves a batch of addresses at once"""
+        functions = self.function_indices(addresses)
+        lines = self.line_indices(addresses)
+        if np is not None:
+            addresses = np.asarray(addresses, dtype=np.int64).tolist()
+            functions = functions.tolist()
+            lines = lines.tolist()
+        locations = []
+        for address, function, line in zip(addresses, functions, lines):
+            if function == -1:
+                locations.append(Location(address, None, None, None, None))
+            elif line == -1:
+                locations.append(Location(address, self.function_names[function], address - int(self.function_starts[function]), None, None))
+            else:
+                locations.append(Location(
+                    address,
+                    self.function_names[function],
+                    address - int(self.function_starts[function]),
+                    self.files[int(self.line_files[line])],
+                    int(self.line_numbers[line])
+                ))
+        return locations
+
+    def lookup(self, address: int) -> Location:
+        return self.lookup_many([address])[0]
@@ -0,0 +1,177 @@
+"""
+Dumps many SYM files at once, spread over a pool of worker processes.
+
+Usage: python -m symdump.batch <directory or glob> [-o OUTPUT] [-j WORKERS] [--archive {tar,tar.gz,tar.xz,zip}]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, NamedTuple, Tuple, Union
+
+from symdump.output import open_sink
+from symdump.symfile import SymFile
+
+
+class DumpResult(NamedTuple):
+    """Outcome of dumping a single SYM file"""
+    path: str
+    output_dir: str
+    size: int
+    """Size of the SYM file in bytes"""
+    seconds: float
+    source_files: int
+    """Number of source files written"""
+    error: Union[str, None] = None
+    """Description of what went wrong, None if the dump succeeded"""
+
+    @property
+    def throughput(self) -> float:
+        """MB of SYM processed per second"""
+        return self.size / (1024 * 1024) / self.seconds if self.seconds > 0 else 0.0
+
+
+def find_sym_files(pattern: str) -> List[str]:
+    """Returns the SYM files directly inside the directory `pattern`, or those matching it as a glob"""
+    if os.path.isdir(pattern):
+        return sorted(
+            os.path.join(pattern, name) for name in os.listdir(pattern)
+            if name.lower().endswith(".sym") and os.path.isfile(os.path.join(pattern, name))
+        )
+    return sorted(glob.glob(pattern, recursive=True))
+
+
+def dump_file(path: str, output_dir: str) -> DumpResult:
+    """Loads the SYM at `path` and writes all of its source files under `output_dir`, or into it if it names an archive
+    (see `open_sink`). Any error is reported in the result rather than raised, so one bad file doesn't take the rest of a
+    batch down with it
+    """
+    start = time.perf_counter()
+    size = 0
+    source_files = 0
+    try:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f, contextlib.redirect_stdout(io.StringIO()):
+            symfile = SymFile(f, lazy_functions=True)
+            symfile.index()
+            with open_sink(output_dir) as sink:
+                for source_file in symfile.source_files.values():
+                    source_file.write_to(sink)
+                    source_files += 1
+    except Exception as e:
+        return DumpResult(path, output_dir, size, time.perf_counter() - start, source_files, f"{type(e).__name__}: {e}")
+    return DumpResult(path, output_dir, size, time.perf_counter() - start, source_files)
+
+
+def output_dirs(paths: List[str], output_root: str, archive: Union[str, None] = None) -> Dict[str, str]:
+    """Gives each SYM its own directory under `output_root`, named after the file, or its own archive with the
+    extension `archive`
+    """
+    dirs: Dict[str, str] = {}
+    used = set()
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        candidate, n = name, 1
+        while candidate in used:
+            candidate = f"{name}_{n}"
+            n += 1
+        used.add(candidate)
+        dirs[path] = os.path.abspath(os.path.join(output_root, candidate))
+        if archive is not None:
+            dirs[path] += f".{archive}"
+    return dirs
+
+
+def _dump_isolated(paths: List[str], dirs: Dict[str, str], workers: int) -> Dict[str, DumpResult]:
+    # Dumps each of `paths` in a process of its own, up to `workers` at once, so a file that takes its process down only
+    # fails itself
+    results: Dict[str, DumpResult] = {}
+    queue = list(reversed(paths))
+    running: Dict[Future, Tuple[str, ProcessPoolExecutor]] = {}
+    while queue or running:
+        while queue and len(running) < workers:
+            path = queue.pop()
+            executor = ProcessPoolExecutor(max_workers=1)
+            running[executor.submit(dump_file, path, dirs[path])] = (path, executor)
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            path, executor = running.pop(future)
+            executor.shutdown()
+            try:
+                results[path] = future.result()
+            except BrokenProcessPool as e:
+                results[path] = DumpResult(path, dirs[path], 0, 0.0, 0, f"{type(e).__name__}: {e}")
+    return results
+
+
+def dump_batch(paths: List[str], output_root: str = "output", workers: Union[int, None] = None,
+               archive: Union[str, None] = None) -> List[DumpResult]:
+    """Dumps every file in `paths` into its own directory under `output_root`, using up to `workers` processes (defaults
+    to the number of CPUs). With `archive` (e.g. "tar" or "zip"), each is written to a single archive instead.
+
+    A worker process dying outright (e.g. killed, out of memory) fails everything the pool was still running or had
+    queued, so those files are dumped again, each in a process of its own. Only the files that take their process down
+    again are reported as failed
+
+    Returns:
+        List[DumpResult]: One result per path, in the same order as `paths`
+    """
+    dirs = output_dirs(paths, output_root, archive)
+    if archive is not None:
+        os.makedirs(output_root, exist_ok=True)
+    results: Dict[str, DumpResult] = {}
+    unfinished = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(dump_file, path, dirs[path]): path for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                results[path] = future.result()
+            except BrokenProcessPool:
+                unfinished.append(path)
+    if unfinished:
+        results.update(_dump_isolated(unfinished, dirs, workers or os.cpu_count() or 1))
+    return [results[path] for path in paths]
+
+
+def format_summary(results: List[DumpResult], wall_time: float) -> str:
+    lines = []
+    for result in results:
+        status = "ok  " if result.error is None else "FAIL"
+        line = f"{status} {result.path}: {result.size / (1024 * 1024):.2f}MB in {result.seconds:.2f}s " \
+               f"({result.throughput:.2f}MB/s, {result.source_files} source files)"
+        if result.error is not None:
+            line += f" - {result.error}"
+        lines.append(line)
+    failed = len([x for x in results if x.error is not None])
+    total_size = sum(x.size for x in results if x.error is None) / (1024 * 1024)
+    lines.append(f"{len(results) - failed} dumped, {failed} failed, {total_size:.2f}MB in {wall_time:.2f}s "
+                 f"({total_size / wall_time if wall_time > 0 else 0.0:.2f}MB/s)")
+    return "\n".join(lines)
+
+
+def main(argv: Union[List[str], None] = None) -> int:
+    parser = argparse.ArgumentParser(description="Dump every SYM file in a directory or matching a glob")
+    parser.add_argument("pattern", help="Directory containing SYM files, or a glob matching them")
+    parser.add_argument("-o", "--output", default="output", help="Root directory, each SYM is written to a subdirectory")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--archive", choices=["tar", "tar.gz", "tar.xz", "zip"], default=None,
+                        help="Write each SYM to a single archive in OUTPUT, rather than a subdirectory")
+    args = parser.parse_args(argv)
+
+    paths = find_sym_files(args.pattern)
+    if len(paths) == 0:
+        print("No SYM files found")
+        return 1
+    start = time.perf_counter()
+    results = dump_batch(paths, args.output, args.workers, args.archive)
+    print(format_summary(results, time.perf_counter() - start))
+    return 0 if all(x.error is None for x in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
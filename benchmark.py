@@ -0,0 +1,659 @@
+"""
+Rough timings for the various ways of loading and rendering a SYM file.
+
+Usage: python -m symdump.benchmark <benchmark> <file.sym> [repeat]
+"""
+import contextlib
+import gc
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+import symdump
+
+
+def _load(path: str, **kwargs) -> symdump.SymFile:
+    with open(path, "rb") as f:
+        return symdump.SymFile(f, **kwargs)
+
+
+def _best_of(func: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        # Don't charge the run for collecting whatever the previous one left behind
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_parse(path: str, repeat: int = 3) -> Dict[str, float]:
+    """Compares parsing through the stream against parsing from a memory mapped buffer"""
+    stream = _best_of(lambda: _load(path), repeat)
+    mapped = _best_of(lambda: _load(path, use_mmap=True), repeat)
+    entries = len(_load(path, use_mmap=True).symbols)
+    print(f"{entries} entries")
+    print(f"stream: {stream * 1000:.1f}ms")
+    print(f"mmap:   {mapped * 1000:.1f}ms ({stream / mapped:.2f}x faster)")
+    return {"stream": stream, "mmap": mapped}
+
+
+def _first_query(path: str, **kwargs) -> None:
+    symobj = _load(path, **kwargs)
+    # Same steps as SymDumpShell, followed by a printfunction
+    with contextlib.redirect_stdout(io.StringIO()):
+        symobj.index()
+    str(next(iter(symobj.functions.values())))
+
+
+def bench_first_query(path: str, repeat: int = 3) -> Dict[str, float]:
+    """Time from opening the file to rendering a single function, with and without lazily decoded function bodies"""
+    eager = _best_of(lambda: _first_query(path, use_mmap=True), repeat)
+    lazy = _best_of(lambda: _first_query(path, lazy_functions=True), repeat)
+    print(f"eager: {eager * 1000:.1f}ms")
+    print(f"lazy:  {lazy * 1000:.1f}ms ({lazy / eager * 100:.0f}% of eager)")
+    return {"eager": eager, "lazy": lazy}
+
+
+def bench_cache(path: str, repeat: int = 3) -> Dict[str, float]:
+    """Compares full loads (parse and map everything) against loading the same state back from the cache"""
+    from symdump.cache import load_symfile
+
+    def full_load(**kwargs):
+        symobj = _load(path, **kwargs)
+        with contextlib.redirect_stdout(io.StringIO()):
+            symobj.index()
+
+    stream = _best_of(full_load, repeat)
+    lazy = _best_of(lambda: full_load(lazy_functions=True), repeat)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            load_symfile(path, cache_dir=cache_dir)
+        cached = _best_of(lambda: load_symfile(path, cache_dir=cache_dir), repeat)
+    print(f"full load (stream): {stream * 1000:.1f}ms")
+    print(f"full load (lazy):   {lazy * 1000:.1f}ms")
+    print(f"cached:             {cached * 1000:.1f}ms ({stream / cached:.2f}x / {lazy / cached:.2f}x faster)")
+    return {"stream": stream, "lazy": lazy, "cached": cached}
+
+
+def _dump(path: str) -> None:
+    # Everything a batch job does for one file, short of writing the output out
+    symobj = _load(path, lazy_functions=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        symobj.index()
+    for source_file in symobj.source_files.values():
+        str(source_file)
+
+
+def bench_batch(path: str, files: int = 10) -> Dict[str, float]:
+    """Per file cost of dumping `files` copies of `path` in one long lived worker, against a fresh process per file"""
+    start = time.perf_counter()
+    for _ in range(files):
+        _dump(path)
+    worker = (time.perf_counter() - start) / files
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    command = [sys.executable, "-c", "import sys; from symdump.benchmark import _dump; _dump(sys.argv[1])", path]
+    start = time.perf_counter()
+    for _ in range(files):
+        subprocess.run(command, env=env, check=True)
+    process = (time.perf_counter() - start) / files
+    print(f"long lived worker:    {worker * 1000:.1f}ms per file")
+    print(f"one process per file: {process * 1000:.1f}ms per file ({process / worker:.2f}x)")
+    return {"worker": worker, "process": process}
+
+
+def _read_tree(root: str) -> Dict[str, bytes]:
+    tree = {}
+    for directory, _, files in os.walk(root):
+        for name in files:
+            with open(os.path.join(directory, name), "rb") as f:
+                tree[os.path.relpath(os.path.join(directory, name), root)] = f.read()
+    return tree
+
+
+def bench_emit(path: str, workers: int = 0) -> Dict[str, float]:
+    """Renders and writes every source file one at a time, then with a pool of `workers` processes (0 for one per CPU)"""
+    timings = {}
+    trees = []
+    for label, count in [("serial", 1), ("parallel", workers or None)]:
+        symobj = _load(path, lazy_functions=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            symobj.index()
+        with tempfile.TemporaryDirectory() as output_dir:
+            start = time.perf_counter()
+            symobj.write_files(output_dir, count)
+            timings[label] = time.perf_counter() - start
+            trees.append(_read_tree(output_dir))
+    print(f"serial:   {timings['serial'] * 1000:.1f}ms")
+    print(f"parallel: {timings['parallel'] * 1000:.1f}ms ({timings['serial'] / timings['parallel']:.2f}x faster, "
+          f"{len(trees[0])} files, output {'identical' if trees[0] == trees[1] else 'DIFFERENT'})")
+    return timings
+
+
+def bench_found_in(path: str, repeat: int = 3) -> Dict[str, float]:
+    """Cost of working out which object files every struct/union member's type is found in, by scanning each object
+    file's members against looking it up in `SymFile.object_file_index`
+    """
+    symobj = _load(path, lazy_functions=True)
+    symobj.map_types()
+    symobj.map_obj_files()
+    tags = [
+        member.symbol.tag
+        for definition in symobj.type_definitions.values() if getattr(definition, "children", None) is not None
+        for member in definition.children if member.cls_name in ["StructMember", "Bitfield", "UnionMember"] and hasattr(member.symbol, "tag")
+    ]
+    scan = _best_of(lambda: [[file for file, obj in symobj.object_files.items() if tag in obj.children_names] for tag in tags], repeat)
+    index = _best_of(lambda: [symobj.object_files_containing(tag) for tag in tags], repeat)
+    print(f"{len(tags)} members, {len(symobj.object_files)} object files")
+    print(f"scan:  {scan * 1000:.1f}ms")
+    print(f"index: {index * 1000:.1f}ms ({scan / index:.0f}x faster)")
+    return {"scan": scan, "index": index}
+
+
+def _count_entries(entries) -> int:
+    count = 0
+    for entry in entries:
+        count += 1
+        children = getattr(entry.symbol, "children", None)
+        if children is not None:
+            count += _count_entries(children)
+    return count
+
+
+class _UnslottedEntry:
+    """`SymbolEntry` laid out the way it was before symbols were slotted, see `bench_memory`"""
+
+
+class _UnslottedSymbol:
+    """Any symbol laid out the way it was before symbols were slotted: an instance dict, and definition and array type
+    words decoded up front into a list of modifiers and the class and type names
+    """
+
+
+_UNSLOTTED_CLASSES: Dict[type, type] = {}
+
+_LATER_SLOTS = ("_args", "_body")
+"""Function attributes added after symbols were slotted, left out of the unslotted layout"""
+
+
+def _slot_values(obj) -> Dict[str, object]:
+    values = {}
+    for klass in type(obj).__mro__:
+        for name in getattr(klass, "__slots__", ()):
+            if hasattr(obj, name):
+                values[name] = getattr(obj, name)
+    return values
+
+
+def _unslotted(value, copies: Dict[int, object]):
+    # Copies `value` (and every entry and symbol reachable from it) into the unslotted layout. Everything else, strings
+    # included, is shared with the original
+    if isinstance(value, list):
+        return [_unslotted(x, copies) for x in value]
+    if not isinstance(value, (symdump.symbols.SymbolEntry, symdump.symbols.SymbolABC)):
+        return value
+    try:
+        return copies[id(value)]
+    except KeyError:
+        pass
+    is_entry = isinstance(value, symdump.symbols.SymbolEntry)
+    if is_entry:
+        copy = _UnslottedEntry()
+    else:
+        # A class per symbol class, so instance dicts share their keys the way they did
+        klass = _UNSLOTTED_CLASSES.get(type(value))
+        if klass is None:
+            klass = _UNSLOTTED_CLASSES[type(value)] = type(f"Unslotted{type(value).__name__}", (_UnslottedSymbol,), {})
+        copy = klass()
+    copies[id(value)] = copy
+    for name, attribute in _slot_values(value).items():
+        if name in _LATER_SLOTS:
+            continue
+        if name == "descriptor":
+            copy._type = attribute.word
+            copy.type_modifiers = list(attribute.modifiers)
+            copy.type_name = attribute.base
+        elif name == "dims":
+            copy.dims = list(attribute)
+        else:
+            setattr(copy, name, _unslotted(attribute, copies))
+    if is_entry:
+        copy.type_name = symdump.symbols._SYMBOL_TYPES.get(value.type)
+    elif hasattr(copy, "_type"):
+        copy.cls_name = symdump.symbols._SYMBOL_TYPES.get(value.cls)
+    return copy
+
+
+def _slotted_size(value, seen: set) -> int:
+    # Bytes of every entry and symbol reachable from `value`: the objects themselves, and the lists and dims tuples they
+    # hold, but not the values in those (which the unslotted copy shares)
+    if id(value) in seen:
+        return 0
+    if isinstance(value, list):
+        seen.add(id(value))
+        return sys.getsizeof(value) + sum(_slotted_size(x, seen) for x in value)
+    if not isinstance(value, (symdump.symbols.SymbolEntry, symdump.symbols.SymbolABC)):
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    for name, attribute in _slot_values(value).items():
+        if name == "dims":
+            size += sys.getsizeof(attribute)
+        elif name not in _LATER_SLOTS:
+            size += _slotted_size(attribute, seen)
+    return size
+
+
+def bench_memory(path: str) -> Dict[str, float]:
+    """Memory held by a fully decoded file, per entry (nested function and struct entries included), against the same
+    file laid out as it was before symbols were slotted. The baseline swaps the size of every entry and symbol object for
+    that of an unslotted copy of it (see `_unslotted`), so the two only differ in how the objects are laid out
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        symobj = _load(path, use_mmap=True)
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    entries = _count_entries(symobj.symbols)
+    slotted = _slotted_size(symobj.symbols, set())
+    # Instance dicts are only materialised when something asks for them, so the copy is measured as it's allocated
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        copies = {}
+        unslotted_copy = _unslotted(symobj.symbols, copies)
+        del copies
+        unslotted = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    baseline = used - slotted + unslotted
+    print(f"{entries} entries")
+    print(f"unslotted: {baseline / (1024 * 1024):.1f}MB, {baseline / entries:.0f} bytes per entry")
+    print(f"slotted:   {used / (1024 * 1024):.1f}MB, {used / entries:.0f} bytes per entry "
+          f"({baseline / used:.2f}x smaller)")
+    return {"bytes": used, "per_entry": used / entries, "baseline_bytes": baseline, "baseline_per_entry": baseline / entries}
+
+
+def bench_render(path: str, repeat: int = 3) -> Dict[str, float]:
+    """Renders every source file, then every function, with and without `SymFile.render_cache`"""
+    timings = {}
+    for label, size in [("uncached", 0), ("cached", symdump.symfile.DEFAULT_RENDER_CACHE_SIZE)]:
+        symobj = _load(path, lazy_functions=True, render_cache_size=size)
+        with contextlib.redirect_stdout(io.StringIO()):
+            symobj.index()
+
+        def dump():
+            for source_file in symobj.source_files.values():
+                source_file.render_file()
+        timings[f"{label}_dump"] = _best_of(dump, 1)
+        timings[f"{label}_functions"] = _best_of(lambda: [str(entry) for entry in symobj.functions.values()], repeat)
+        print(f"{label + ':':9} dump {timings[f'{label}_dump'] * 1000:.1f}ms, "
+              f"every function {timings[f'{label}_functions'] * 1000:.1f}ms ({symobj.render_cache!r})")
+    print(f"dump {timings['uncached_dump'] / timings['cached_dump']:.2f}x faster, "
+          f"functions {timings['uncached_functions'] / timings['cached_functions']:.2f}x faster")
+    return timings
+
+
+def bench_stream(path: str) -> Dict[str, float]:
+    """Time and peak traced memory of writing every source file from fully rendered text, against streaming each file
+    out as it's rendered. The render cache is off, so it doesn't count towards either.
+
+    The peak is only what tracemalloc sees allocated while writing. Neither way moves the process's peak RSS, which is
+    set by the loaded symbols long before anything is written
+    """
+    results = {}
+    for label in ["buffered", "streamed"]:
+        symobj = _load(path, lazy_functions=True, render_cache_size=0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            symobj.index()
+        # Decode every function body up front, only rendering should count
+        for entry in symobj.functions.values():
+            entry.symbol.children
+        with tempfile.TemporaryDirectory() as output_dir:
+            gc.collect()
+            tracemalloc.start()
+            start = time.perf_counter()
+            try:
+                for source_file in symobj.source_files.values():
+                    if label == "buffered":
+                        source_file.render_file()
+                    source_file.write_file(output_dir)
+                    # Drop the text once written, so only the largest file counts towards the peak
+                    source_file.text_lines, source_file.header_text_lines = [], []
+                results[label] = time.perf_counter() - start
+                results[f"{label}_peak"] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        print(f"{label + ':':9} {results[label] * 1000:.1f}ms, peak traced {results[f'{label}_peak'] / 1024:.0f}KB")
+    return results
+
+
+def bench_functions(path: str, count: int = 10) -> Dict[str, float]:
+    """Renders the `count` largest functions, and compares building their block trees against the old way of finding
+    the non-argument children (rebuilding the argument list for every child)
+    """
+    symobj = _load(path, use_mmap=True, render_cache_size=0)
+    symobj.map_types()
+    symobj.map_obj_files()
+    largest = sorted((entry.symbol for entry in symobj.functions.values()), key=lambda x: len(x.children), reverse=True)[:count]
+
+    def rebuild_args():
+        for function in largest:
+            [sym for sym in function.children if sym not in [x for x in function.children if x.cls_name in ['RegParam', 'Argument']]]
+
+    def build_trees():
+        for function in largest:
+            function.children = function.children
+            function.body
+
+    def render_all():
+        for function in largest:
+            function.children = function.children
+            str(function)
+    old = _best_of(rebuild_args, 1)
+    tree = _best_of(build_trees, 3)
+    rendered = _best_of(render_all, 3)
+    print(f"{len(largest)} functions, {min(len(x.children) for x in largest)}-{max(len(x.children) for x in largest)} entries, "
+          f"up to {max(sum(1 for _ in x.body.walk()) for x in largest) - 1} blocks")
+    print(f"old filtering: {old * 1000:.1f}ms")
+    print(f"block trees:   {tree * 1000:.1f}ms ({old / tree:.0f}x faster)")
+    print(f"full render:   {rendered * 1000:.1f}ms")
+    return {"old": old, "tree": tree, "render": rendered}
+
+
+def bench_index(path: str, repeat: int = 3) -> Dict[str, float]:
+    """Compares running `map_types`, `map_obj_files` and `create_files` (plus a look at `definitions` and `sourcelines`)
+    one after the other against the single `SymFile.index` pass, on the same loaded file
+    """
+    symobj = _load(path, lazy_functions=True)
+
+    def separate():
+        symobj.type_definitions = {}
+        symobj.object_files = {}
+        symobj.source_files = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            symobj.map_types()
+            symobj.map_obj_files()
+            symobj.create_files()
+        [entry for entry in symobj.symbols if type(entry.symbol) is symdump.symbols.DefinitionSymbol]
+        [entry for entry in symobj.symbols if type(entry.symbol) in (symdump.symbols.SourceLineBeginSymbol, symdump.symbols.SourceLineSymbol)]
+
+    def fused():
+        with contextlib.redirect_stdout(io.StringIO()):
+            symobj.index()
+        symobj.definitions
+        symobj.sourcelines
+    old = _best_of(separate, repeat)
+    new = _best_of(fused, repeat)
+    print(f"{len(symobj.symbols)} entries, {len(symobj.source_files)} source files, {len(symobj.object_files)} object files")
+    print(f"separate passes: {old * 1000:.1f}ms")
+    print(f"index:           {new * 1000:.1f}ms ({old / new:.2f}x faster)")
+    return {"separate": old, "index": new}
+
+
+def bench_header(path: str, repeat: int = 3) -> Dict[str, float]:
+    """Time to build the type dependency graph, order it, and write every type out as a single header"""
+    from symdump.sorting import TypeGraph
+    symobj = _load(path, lazy_functions=True)
+    symobj.index()
+    graph = TypeGraph(symobj)
+    build = _best_of(lambda: TypeGraph(symobj), repeat)
+    ordered = _best_of(graph.order, repeat)
+    written = _best_of(lambda: graph.write_header(io.StringIO()), repeat)
+    order, forward = graph.order()
+    cycles = sum(1 for component in graph.components() if len(component) > 1)
+    print(f"{len(graph)} types, {sum(len(x) for x in graph.requires)} dependencies, "
+          f"{sum(len(x) for x in graph.refers_to)} pointers, {cycles} cycles, {len(forward)} forward declarations")
+    print(f"graph:  {build * 1000:.1f}ms")
+    print(f"order:  {ordered * 1000:.1f}ms")
+    print(f"header: {written * 1000:.1f}ms")
+    return {"graph": build, "order": ordered, "header": written}
+
+
+def bench_dedup(path: str) -> Dict[str, float]:
+    """Memory and rendered output size with and without sharing identical type definitions"""
+    def load():
+        symobj = _load(path, lazy_functions=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            symobj.index()
+        return symobj
+
+    def render(symobj):
+        sink = io.StringIO()
+        for source_file in symobj.source_files.values():
+            source_file.write_source(sink)
+            source_file.write_header(sink)
+        return sink.tell()
+    symobj, shared_memory = _traced(load)
+    registry = symobj.type_registry
+    # The same file again, with every type definition as it was decoded
+    unshared, unshared_memory = _traced(lambda: _load(path, lazy_functions=True))
+    defined = sum(1 for entry in unshared.symbols if type(entry.symbol) in (symdump.symbols.DefinitionSymbol, symdump.symbols.ArraySymbol)
+                  and entry.symbol.cls in (10, 12, 13, 15))
+    start = time.perf_counter()
+    size = render(symobj)
+    rendered = time.perf_counter() - start
+    print(f"{defined} type definitions, {len(registry)} distinct, {registry.duplicates} shared, {len(registry.conflicts())} conflicting names")
+    print(f"memory: {unshared_memory / (1024 * 1024):.1f}MB parsed, {shared_memory / (1024 * 1024):.1f}MB indexed and shared")
+    print(f"output: {size / 1024:.0f}KB in {rendered * 1000:.1f}ms, render cache {symobj.render_cache}")
+    return {"unshared_memory": unshared_memory, "shared_memory": shared_memory, "render": rendered}
+
+
+def bench_startup(path: str, repeat: int = 3) -> Dict[str, float]:
+    """Time for `symdump.cli` to import, for the shell to be ready for input, and for it to be able to answer `functions`
+    and everything else, with nothing cached
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+
+    def run(code: str) -> float:
+        return _best_of(lambda: subprocess.run([sys.executable, "-c", code], env=env, check=True), repeat)
+    interpreter = run("pass")
+    imported = run("import symdump.cli") - interpreter
+    with_pygments = run("import symdump.cli, pygments.lexers, pygments.formatters") - interpreter
+
+    from symdump.cli import SymDumpShell
+    prompt = parsed = indexed = float("inf")
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            gc.collect()
+            start = time.perf_counter()
+            shell = SymDumpShell(path, progress=io.StringIO(), cache_dir=cache_dir)
+            prompt = min(prompt, time.perf_counter() - start)
+            shell.loader.wait(indexed=False)
+            parsed = min(parsed, time.perf_counter() - start)
+            shell.loader.wait()
+            indexed = min(indexed, time.perf_counter() - start)
+    print(f"import symdump.cli: {imported * 1000:.1f}ms ({with_pygments * 1000:.1f}ms with pygments)")
+    print(f"prompt:    {prompt * 1000:.1f}ms")
+    print(f"functions: {parsed * 1000:.1f}ms")
+    print(f"indexed:   {indexed * 1000:.1f}ms")
+    return {"import": imported, "import_pygments": with_pygments, "prompt": prompt, "parsed": parsed, "indexed": indexed}
+
+
+def bench_names(path: str, queries: int = 200) -> Dict[str, float]:
+    """Substring and prefix lookups through the name index against scanning every name, using pieces of real names as
+    queries
+    """
+    import random
+    from symdump.name_index import ANY
+    symobj = _load(path, lazy_functions=True)
+    symobj.index()
+    start = time.perf_counter()
+    name_index = symobj.name_index
+    build = time.perf_counter() - start
+    rng = random.Random(0)
+    samples = rng.sample(name_index.names, min(queries, len(name_index)))
+    substrings = [name[i:i + rng.randint(3, 8)] for name in samples for i in [rng.randrange(max(1, len(name) - 3))]]
+    prefixes = [name[:rng.randint(1, len(name))] for name in samples]
+
+    def scan():
+        for text in substrings:
+            [name for name in name_index.names if text in name]
+    scanned = _best_of(scan, 1) / len(substrings)
+    searched = _best_of(lambda: [name_index.search(text, ANY) for text in substrings], 3) / len(substrings)
+    prefixed = _best_of(lambda: [name_index.prefix(text, ANY, 50) for text in prefixes], 3) / len(prefixes)
+    print(f"{len(name_index)} names, {len(name_index.trigrams)} trigrams, built in {build * 1000:.1f}ms")
+    print(f"substring: scan {scanned * 1000:.3f}ms, index {searched * 1000:.3f}ms per query ({scanned / searched:.0f}x faster)")
+    print(f"prefix:    {prefixed * 1000:.3f}ms per query")
+    return {"build": build, "scan": scanned, "search": searched, "prefix": prefixed}
+
+
+def bench_server(path: str, queries: int = 1000) -> Dict[str, float]:
+    """Time to load a SYM into the symbol server, against the round trip time of queries to it over a Unix socket"""
+    import asyncio
+    import threading
+    from symdump.server import SymbolClient, SymbolServer
+    with tempfile.TemporaryDirectory() as temp_dir:
+        start = time.perf_counter()
+        server = SymbolServer.load([path], cache_dir=temp_dir)
+        load = time.perf_counter() - start
+        socket_path = os.path.join(temp_dir, "server.sock")
+        loop = asyncio.new_event_loop()
+        listener = loop.run_until_complete(server.serve_unix(socket_path))
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            symfile = next(iter(server.files.values())).symfile
+            names = list(symfile.functions.keys())[:queries]
+            addresses = [symfile.functions[name].value for name in names]
+            with SymbolClient(socket_path) as client:
+                def run(op, args):
+                    start = time.perf_counter()
+                    for arg in args:
+                        client.query(op, **arg)
+                    return (time.perf_counter() - start) / len(args)
+                function = run("function", [{"name": name} for name in names])
+                symbolize = run("symbolize", [{"addresses": [address + 4]} for address in addresses])
+                search = run("search", [{"text": name[1:4], "limit": 20} for name in names])
+        finally:
+            loop.call_soon_threadsafe(listener.close)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            # Let the client's connection finish closing
+            loop.run_until_complete(asyncio.gather(*asyncio.all_tasks(loop)))
+            loop.close()
+    print(f"load: {load * 1000:.1f}ms")
+    print(f"function:  {function * 1000:.3f}ms per query")
+    print(f"symbolize: {symbolize * 1000:.3f}ms per query")
+    print(f"search:    {search * 1000:.3f}ms per query")
+    return {"load": load, "function": function, "symbolize": symbolize, "search": search}
+
+
+def bench_watch(path: str) -> Dict[str, float]:
+    """Time of a full dump through `DumpWatcher`, against updating that dump after the SYM was touched without its
+    contents changing, and after it was rewritten with the same contents under a fresh watcher (so every file is
+    compared against the manifest rather than written)
+    """
+    from symdump.watch import DumpWatcher
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_dir = os.path.join(temp_dir, "output")
+        cache_dir = os.path.join(temp_dir, "cache")
+        watcher = DumpWatcher(path, output_dir, cache_dir=cache_dir)
+        full = watcher.update()
+        start = time.perf_counter()
+        watcher.update()
+        touched = time.perf_counter() - start
+        unchanged = DumpWatcher(path, output_dir, cache_dir=cache_dir).update()
+    print(f"full dump: {full.seconds * 1000:.1f}ms ({full})")
+    print(f"touched:   {touched * 1000:.1f}ms")
+    print(f"unchanged: {unchanged.seconds * 1000:.1f}ms ({unchanged}, {full.seconds / unchanged.seconds:.2f}x faster)")
+    return {"full": full.seconds, "touched": touched, "unchanged": unchanged.seconds}
+
+
+def bench_sinks(path: str) -> Dict[str, float]:
+    """Time to write every (already rendered) source file to a directory, one file per source file and header, against
+    a single tar and zip archive
+    """
+    from symdump.output import DirectorySink, TarSink, ZipSink
+    symobj = _load(path, lazy_functions=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        symobj.index()
+    symobj.render_files()
+    timings = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for label, make_sink in [("directory", lambda: DirectorySink(os.path.join(temp_dir, "output"))),
+                                 ("tar", lambda: TarSink(os.path.join(temp_dir, "output.tar"))),
+                                 ("zip", lambda: ZipSink(os.path.join(temp_dir, "output.zip")))]:
+            start = time.perf_counter()
+            with make_sink() as sink:
+                symobj.write_files(sink=sink)
+            timings[label] = time.perf_counter() - start
+            print(f"{label + ':':10} {timings[label] * 1000:.1f}ms")
+    return timings
+
+
+def _traced(func: Callable[[], object]):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = func()
+        return result, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def bench_columns(path: str, repeat: int = 3) -> Dict[str, float]:
+    """Load time and memory of the columnar table against fully decoded objects, and the cost of finding every top
+    level struct either way
+    """
+    import symdump.columns
+    objects = _best_of(lambda: _load(path, use_mmap=True), repeat)
+    columnar = _best_of(lambda: _load(path, columnar=True), repeat)
+    symobj, objects_memory = _traced(lambda: _load(path, use_mmap=True))
+    table, columnar_memory = _traced(lambda: _load(path, columnar=True).table)
+
+    def scan():
+        return [entry for entry in symobj.symbols
+                if type(entry.symbol) is symdump.symbols.DefinitionSymbol and entry.symbol.cls_name == "Struct"]
+    scanned = _best_of(scan, repeat)
+    queried = _best_of(lambda: table.select(classes=["Struct"], top_level=True), repeat)
+    print(f"{len(table)} entries")
+    print(f"objects:  {objects * 1000:.1f}ms, {objects_memory / (1024 * 1024):.1f}MB")
+    print(f"columnar: {columnar * 1000:.1f}ms, {columnar_memory / (1024 * 1024):.1f}MB")
+    print(f"structs: scan {scanned * 1000:.2f}ms, query {queried * 1000:.2f}ms ({scanned / queried:.1f}x faster"
+          f"{'' if symdump.columns.np is not None else ', without NumPy so not vectorized'})")
+    return {"objects": objects, "columnar": columnar, "objects_memory": objects_memory,
+            "columnar_memory": columnar_memory, "scan": scanned, "query": queried}
+
+
+BENCHMARKS: Dict[str, Callable[..., Dict[str, float]]] = {
+    "parse": bench_parse,
+    "first_query": bench_first_query,
+    "cache": bench_cache,
+    "batch": bench_batch,
+    "emit": bench_emit,
+    "found_in": bench_found_in,
+    "memory": bench_memory,
+    "columns": bench_columns,
+    "render": bench_render,
+    "stream": bench_stream,
+    "functions": bench_functions,
+    "index": bench_index,
+    "header": bench_header,
+    "dedup": bench_dedup,
+    "startup": bench_startup,
+    "names": bench_names,
+    "server": bench_server,
+    "watch": bench_watch,
+    "sinks": bench_sinks,
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in BENCHMARKS:
+        print(__doc__.strip())
+        print("Benchmarks: " + ", ".join(BENCHMARKS.keys()))
+        sys.exit(1)
+    BENCHMARKS[sys.argv[1]](sys.argv[2], *[int(x) for x in sys.argv[3:]])
@@ -0,0 +1,150 @@
+"""
+On-disk cache of fully loaded `SymFile` objects, so repeatedly opening the same SYM skips parsing and the
+`SymFile.index` pass
+
+Cache entries are pickles, and unpickling a file runs whatever code it was crafted to, so the cache directory must only
+be writable by people trusted to run code as whoever loads from it. Don't point `cache_dir` at a shared or world writable
+directory.
+"""
+import gc
+import hashlib
+import os
+import pickle
+import tempfile
+import zlib
+from typing import Callable, List, Tuple, Union
+
+import symdump
+from symdump.symfile import SymFile, map_input
+
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "symdump")
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+"""Default upper bound on the total size of the cache directory, in bytes"""
+
+_CACHE_SUFFIX = ".symcache"
+_CACHE_FORMAT = 9
+"""Bumped whenever the pickled layout of the symbol classes changes"""
+_CACHE_ERRORS = (OSError, EOFError, zlib.error, pickle.UnpicklingError, AttributeError, ImportError, ValueError,
+                 TypeError, KeyError, IndexError)
+"""What reading a corrupt, truncated or stale cache entry raises, any of these is treated as a miss and the SYM reparsed.
+Stale entries (pickled by a different layout of the classes) mostly fail with the last four"""
+
+
+def cache_key(buffer: memoryview) -> str:
+    """Key for the cache entry of a SYM with the given contents. Changes whenever the contents, symdump version or cache
+    format do
+    """
+    digest = hashlib.blake2b(buffer, digest_size=16).hexdigest()
+    return f"{digest}-{symdump.__version__}-{_CACHE_FORMAT}"
+
+
+def load_symfile(path: Union[str, os.PathLike], cache_dir: Union[str, os.PathLike, None] = None,
+                 max_size: int = DEFAULT_MAX_SIZE, lazy_functions: bool = True,
+                 on_parsed: Union[Callable[[SymFile], None], None] = None,
+                 on_indexed: Union[Callable[[SymFile], None], None] = None) -> SymFile:
+    """Loads the SYM at `path` with all its types, object files and source files mapped, going through the cache.
+
+    Args:
+        path (Union[str, os.PathLike]): SYM file to load
+        cache_dir (Union[str, os.PathLike, None]): Where cached files are kept. Defaults to `DEFAULT_CACHE_DIR`, pass the
+            directory of the SYM to keep them alongside it. Must be trusted, see the module docstring
+        max_size (int): Once the cache directory grows past this many bytes, the least recently used entries are removed
+        lazy_functions (bool): Passed on to `SymFile` on a cache miss
+        on_parsed (Union[Callable[[SymFile], None], None]): Called with the file as soon as its entries have been read,
+            before `SymFile.index` runs. From then on `symbols` and `functions` can be used. On a cache hit this is
+            called with the fully loaded file
+        on_indexed (Union[Callable[[SymFile], None], None]): Called once the file is fully loaded, before it's written
+            to the cache
+
+    Returns:
+        SymFile: The loaded file. When it comes from the cache, `input` is None
+    """
+    cache_dir = DEFAULT_CACHE_DIR if cache_dir is None else cache_dir
+    with open(path, "rb") as f:
+        buffer = map_input(f)
+        cache_path = os.path.join(cache_dir, cache_key(buffer) + _CACHE_SUFFIX)
+        try:
+            symfile = _read_cache(cache_path, buffer)
+            os.utime(cache_path)
+        except _CACHE_ERRORS:
+            pass
+        else:
+            if on_parsed is not None:
+                on_parsed(symfile)
+            if on_indexed is not None:
+                on_indexed(symfile)
+            return symfile
+        symfile = SymFile(f, lazy_functions=lazy_functions)
+        if on_parsed is not None:
+            on_parsed(symfile)
+        symfile.index()
+    if on_indexed is not None:
+        on_indexed(symfile)
+    try:
+        _write_cache(cache_path, symfile)
+        evict(cache_dir, max_size)
+    except OSError:
+        pass  # A cache we can't write to shouldn't stop the file being loaded
+    return symfile
+
+
+def _read_cache(cache_path: str, buffer: memoryview) -> SymFile:
+    with open(cache_path, "rb") as f:
+        data = zlib.decompress(f.read())
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        symfile: SymFile = pickle.loads(data)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    symfile.buffer = buffer
+    # Function bodies that were never decoded need something to be decoded from
+    for entry in symfile.functions.values():
+        if entry.symbol._children is None:
+            entry.symbol._buffer = buffer
+    return symfile
+
+
+def _write_cache(cache_path: str, symfile: SymFile) -> None:
+    # Only created private, an existing directory is left as it is
+    os.makedirs(os.path.dirname(cache_path), mode=0o700, exist_ok=True)
+    data = zlib.compress(pickle.dumps(symfile, pickle.HIGHEST_PROTOCOL), 1)
+    # Write to a temporary file first so a concurrent reader never sees half a cache entry
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def evict(cache_dir: Union[str, os.PathLike], max_size: int = DEFAULT_MAX_SIZE) -> List[str]:
+    """Removes the least recently used cache entries until `cache_dir` is no bigger than `max_size` bytes
+
+    Returns:
+        List[str]: Paths of the removed entries
+    """
+    entries: List[Tuple[float, int, str]] = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(_CACHE_SUFFIX):
+            entry_path = os.path.join(cache_dir, name)
+            try:
+                stat = os.stat(entry_path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+    total = sum(size for _, size, _ in entries)
+    removed = []
+    for _, size, entry_path in sorted(entries):
+        if total <= max_size:
+            break
+        try:
+            os.remove(entry_path)
+        except OSError:
+            continue
+        total -= size
+        removed.append(entry_path)
+    return removed
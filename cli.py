@@ -1,46 +1,202 @@
 import cmd
-from unicodedata import name
+import itertools
+import sys
+import threading
+import time
 import symdump
 import os
 import ntpath
+from typing import List, TextIO
 
-from pygments import highlight
-from pygments.lexers import get_lexer_for_filename
-from pygments.lexers.c_cpp import CFamilyLexer
-from pygments.formatters import Terminal256Formatter
+from symdump.name_index import FUNCTION, SOURCE_FILE, SYMBOL
 
-from symdump.symbols import DefinitionSymbol
+COMPLETION_LIMIT = 200
+"""Most completions offered at once, so completing a short prefix doesn't flood the terminal"""
+
+
+def _highlight(text: str, file_name: str | None = None) -> str:
+    """Colours `text` for the terminal, as C unless `file_name` says otherwise. Pygments takes about as long to import
+    as the rest of symdump put together, so it's only imported the first time something is printed
+    """
+    from pygments import highlight
+    from pygments.formatters import Terminal256Formatter
+    if file_name is None:
+        from pygments.lexers.c_cpp import CFamilyLexer
+        lexer = CFamilyLexer()
+    else:
+        from pygments.lexers import get_lexer_for_filename
+        lexer = get_lexer_for_filename(file_name)
+    return highlight(text, lexer, Terminal256Formatter())
+
+
+class SymFileLoader:
+    """Loads a SYM file through `symdump.cache.load_symfile` on a background thread. The file becomes usable in two
+    steps: once its entries are parsed (`symbols` and `functions`), and once it's indexed (everything else).
+
+    Args:
+        path (str): SYM file to load
+        progress (TextIO): Where to show progress while `wait` is blocked
+        **load_args: Passed on to `load_symfile`
+    """
+    def __init__(self, path: str, progress: TextIO = sys.stderr, **load_args):
+        self.path = path
+        self.progress = progress
+        self.symobj: "symdump.SymFile" = None
+        self.stage = "parsing"
+        self.error: BaseException = None
+        self.started = time.perf_counter()
+        self.timings: dict[str, float] = {}
+        """Seconds from starting to each stage being reached"""
+        self._parsed = threading.Event()
+        self._indexed = threading.Event()
+        self._thread = threading.Thread(target=self._load, kwargs=load_args, name=f"load {path}", daemon=True)
+        self._thread.start()
+
+    def _load(self, **load_args):
+        try:
+            from symdump.cache import load_symfile
+            load_symfile(self.path, on_parsed=self._on_parsed, on_indexed=self._on_indexed, **load_args)
+        except BaseException as e:
+            self.error = e
+            self.stage = "failed"
+        finally:
+            self._parsed.set()
+            self._indexed.set()
+
+    def _on_parsed(self, symobj: "symdump.SymFile"):
+        self.symobj = symobj
+        self.stage = "indexing"
+        self.timings["parsed"] = time.perf_counter() - self.started
+        self._parsed.set()
+
+    def _on_indexed(self, symobj: "symdump.SymFile"):
+        # Built here rather than on the first search, so it's ready by then (and gets cached along with the file)
+        self.stage = "indexing names"
+        symobj.name_index
+        self.stage = "ready"
+        self.timings["indexed"] = time.perf_counter() - self.started
+        self._indexed.set()
+
+    @property
+    def ready(self) -> bool:
+        """Whether the file has been fully loaded"""
+        return self._indexed.is_set() and self.error is None
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def wait(self, indexed: bool = True) -> "symdump.SymFile":
+        """Blocks until the file is parsed, or also indexed, showing a spinner in the meantime. Raises whatever loading
+        failed with
+        """
+        event = self._indexed if indexed else self._parsed
+        if not event.is_set():
+            name = os.path.basename(self.path)
+            width = 0
+            for frame in itertools.cycle("|/-\\"):
+                if event.wait(0.1):
+                    break
+                status = f"\r{frame} {self.stage} {name} ({self.elapsed:.1f}s)"
+                width = max(width, len(status))
+                self.progress.write(status)
+                self.progress.flush()
+            self.progress.write("\r" + " " * width + "\r")
+            self.progress.flush()
+        if self.error is not None and (indexed or self.symobj is None):
+            raise self.error
+        return self.symobj
 
 
 class SymDumpShell(cmd.Cmd):
-    def __init__(self, symfile: str | None = None) -> None:
+    def __init__(self, symfile: str | None = None, **load_args) -> None:
         self.symfile = None
-        self.symobj = None
+        self.loader: SymFileLoader = None
         if symfile is not None:
-            self.symfile = open(symfile, "rb")
-            self.symobj = symdump.SymFile(self.symfile)
-            self.symobj.map_types()
-            self.symobj.create_files()
+            self.symfile = symfile
+            self.loader = SymFileLoader(symfile, **load_args)
+            self.intro = f"Loading {symfile} in the background"
         super().__init__()
 
+    @property
+    def symobj(self) -> "symdump.SymFile":
+        """The loaded file, waiting for it to finish loading if it hasn't yet"""
+        return self.loader.wait() if self.loader is not None else None
+
+    def _wait_for(self, indexed: bool = True) -> "symdump.SymFile":
+        # Commands that only need the function list can run before the file is indexed
+        if self.loader is None:
+            print("No SYM file loaded")
+            return None
+        try:
+            return self.loader.wait(indexed)
+        except Exception as e:
+            print(f"Loading {self.symfile} failed: {type(e).__name__}: {e}")
+            return None
+
+    def _search(self, symobj: "symdump.SymFile", arg: str, kinds: int) -> List[str]:
+        # Until the name index is ready, only function names can be searched, by going through all of them
+        if self.loader.ready:
+            return symobj.name_index.search(arg, kinds)
+        return sorted(x for x in symobj.functions.keys() if arg in x)
+
+    def _complete(self, line: str, begidx: int, endidx: int, kinds: int) -> List[str]:
+        # Nothing is offered until the name index is ready, completion should never have to wait for loading
+        if self.loader is None or not self.loader.ready:
+            return []
+        # readline splits words on characters like the backslashes in source file paths, so the whole argument is
+        # completed, less the part before the word being completed
+        _, _, arg = line[:endidx].partition(" ")
+        arg = arg.lstrip()
+        skip = len(arg) - (endidx - begidx)
+        return [name[skip:] for name in self.loader.symobj.name_index.prefix(arg, kinds, COMPLETION_LIMIT)]
+
+    def complete_functions(self, text, line, begidx, endidx):
+        return self._complete(line, begidx, endidx, FUNCTION)
+
+    def complete_printfunction(self, text, line, begidx, endidx):
+        return self._complete(line, begidx, endidx, FUNCTION)
+
+    def complete_printsource(self, text, line, begidx, endidx):
+        return self._complete(line, begidx, endidx, SOURCE_FILE)
+
+    def complete_printsymbol(self, text, line, begidx, endidx):
+        return self._complete(line, begidx, endidx, SYMBOL)
+
+    def do_status(self, arg):
+        """Shows how far loading the SYM file has got"""
+        if self.loader is None:
+            print("No SYM file loaded")
+            return
+        print(f"{self.symfile}: {self.loader.stage} ({self.loader.elapsed:.1f}s)")
+        for stage, seconds in self.loader.timings.items():
+            print(f"\t{stage} after {seconds:.2f}s")
+
     def do_sourcefiles(self, arg):
         """Lists source file names"""
+        symobj = self._wait_for()
+        if symobj is None:
+            return
         self.columnize(
-            list(self.symobj.source_files.keys()), os.get_terminal_size().columns
+            list(symobj.source_files.keys()), os.get_terminal_size().columns
         )
         return None
 
     def do_functions(self, arg):
         """Lists function, filtered by provided string"""
-        function_names = self.symobj.functions.keys()
-        matches = [x for x in function_names if arg in x]
+        symobj = self._wait_for(indexed=False)
+        if symobj is None:
+            return
+        matches = self._search(symobj, arg, FUNCTION)
         self.columnize(matches, os.get_terminal_size().columns)
 
     def do_printsource(self, arg):
         """Prints the source of the specified source file"""
-        file_names = self.symobj.source_files.keys()
-        matches = [x for x in file_names if arg in x]
-        if len(matches) > 1 and self.symobj.source_files.get(arg) is None:
+        symobj = self._wait_for()
+        if symobj is None:
+            return
+        matches = self._search(symobj, arg, SOURCE_FILE)
+        if len(matches) > 1 and symobj.source_files.get(arg) is None:
             print("Multiple matching files found, they are:")
             self.columnize(matches, os.get_terminal_size().columns)
             return
@@ -49,65 +205,61 @@ class SymDumpShell(cmd.Cmd):
             return
         else:
             file_name = ntpath.basename(matches[0])
-            print(
-                highlight(
-                    str(self.symobj.source_files[matches[0]]),
-                    get_lexer_for_filename(file_name),
-                    Terminal256Formatter(),
-                )
-            )
+            print(_highlight(str(symobj.source_files[matches[0]]), file_name))
             return
 
     def do_printfunction(self, arg):
         """Prints the source of the specified function"""
-        function_names = self.symobj.functions.keys()
-        matches = [x for x in function_names if arg in x]
-        if len(matches) > 1 and self.symobj.functions.get(arg) is None:
+        symobj = self._wait_for(indexed=False)
+        if symobj is None:
+            return
+        matches = self._search(symobj, arg, FUNCTION)
+        if len(matches) > 1 and symobj.functions.get(arg) is None:
             print("Multiple matching functions found, they are:")
             self.columnize(matches, os.get_terminal_size().columns)
             return
         elif len(matches) == 0:
             print("No matching functions found")
             return
-        elif self.symobj.functions.get(arg) is not None:
-            print(
-                highlight(
-                    str(self.symobj.functions[arg]),
-                    CFamilyLexer(),
-                    Terminal256Formatter(),
-                )
-            )
+        # Rendering needs the types
+        symobj = self._wait_for()
+        if symobj is None:
+            return
+        elif symobj.functions.get(arg) is not None:
+            print(_highlight(str(symobj.functions[arg])))
         else:
-            print(
-                highlight(
-                    str(self.symobj.functions[matches[0]]),
-                    CFamilyLexer(),
-                    Terminal256Formatter(),
-                )
-            )
+            print(_highlight(str(symobj.functions[matches[0]])))
             return
 
+    def do_typeconflicts(self, arg):
+        """Lists types with more than one distinct definition, filtered by provided string"""
+        symobj = self._wait_for()
+        if symobj is None:
+            return
+        registry = symobj.type_registry
+        conflicts = {type_key: variants for type_key, variants in registry.conflicts().items() if arg in type_key[1]}
+        print(f"{len(registry)} distinct types, {registry.duplicates} duplicates shared, {len(conflicts)} conflicting names")
+        for (namespace, name), variants in conflicts.items():
+            for i, (variant, object_files) in enumerate(zip(variants, registry.found_in[namespace, name])):
+                print(f"/* {name} ({namespace}) variant {i + 1}, defined in: {', '.join(object_files)} */")
+                print(_highlight(str(variant)))
+
     def do_printsymbol(self, arg):
         """Prints the source code for a given symbol name"""
-        symbols = []
-        name_list = []
-        for symbol in self.symobj.symbols:
-            if symbol.name in name_list or symbol.name is None:
-                next
-            else:
-                symbols.append(symbol)
-                name_list.append(symbol.name)
-        matches = [(x, x.name) for x in symbols if arg in x.name]
-        if len(matches) > 1 and [x for x in matches if x[1] == arg] == []:
+        symobj = self._wait_for()
+        if symobj is None:
+            return
+        name_index = symobj.name_index
+        matches = name_index.search(arg, SYMBOL)
+        if len(matches) > 1 and arg not in name_index.symbols:
             print("Multiple matching symbols found, they are:")
-            self.columnize([x[1] for x in matches], os.get_terminal_size().columns)
+            self.columnize(matches, os.get_terminal_size().columns)
             return
         elif len(matches) == 0:
             print("No matching symbols found")
             return
-        elif [x for x in matches if x[1] == arg] != []:
-            match = [x for x in matches if x[1] == arg][0]
-            print(highlight(str(match[0]), CFamilyLexer(), Terminal256Formatter()))
+        elif arg in name_index.symbols:
+            print(_highlight(str(name_index.symbols[arg])))
         else:
-            print(highlight(str(matches[0][0]), CFamilyLexer(), Terminal256Formatter()))
+            print(_highlight(str(name_index.symbols[matches[0]])))
             return
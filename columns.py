@@ -0,0 +1,255 @@
+"""
+Columnar representation of a SYM file, for bulk queries that don't need one Python object per entry
+"""
+import array
+import itertools
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # Columns stay as array.array, and queries fall back to plain loops
+    np = None
+
+import symdump.symbols as syms
+
+_CLASS_IDS: Dict[str, int] = {name: cls for cls, name in syms._SYMBOL_TYPES.items()}
+
+# Column name -> array typecode
+_COLUMNS: Dict[str, str] = {
+    "offset": "q",
+    "value": "I",
+    "type": "B",
+    "cls": "h",
+    "type_word": "H",
+    "size": "q",
+    "name_offset": "q",
+    "name_length": "B",
+    "parent": "q",
+    "object_file": "i",
+}
+
+
+class SymbolTable:
+    """Every entry of a SYM file (nested function and struct entries included, in file order) decoded into columns.
+
+    Columns:
+        offset: Where the entry starts in the file
+        value: The entry value, an address for most entries
+        type: The raw entry type byte, `type & 0x7F` is the symbol kind when `type & 0x80` is set
+        cls: Symbol class of definitions and arrays, -1 for everything else
+        type_word: Raw type word of definitions and arrays
+        size: Size of definitions and arrays, length in bytes of functions
+        name_offset, name_length: Where the entry's name (or label, or file for source line begin entries) is in the
+            file, the file itself being the string blob. -1 if the entry has no name
+        parent: Row of the function or struct/union/enum the entry is nested in, -1 for top level entries
+        object_file: Index into `object_files` of the object file the entry belongs to, -1 if none
+
+    Columns are NumPy arrays when NumPy is available, `array.array` otherwise.
+
+    Args:
+        buffer (memoryview): The whole SYM file, see `symdump.symfile.map_input`
+    """
+    def __init__(self, buffer: memoryview):
+        self.buffer = buffer
+        self.object_files: List[str] = []
+        object_file_ids: Dict[str, int] = {}
+        # One tuple per row while walking the file, split into columns at the end
+        self._rows: List[list] = []
+
+        offset = 8
+        end = len(buffer)
+        object_file = -1
+        while offset < end:
+            row = len(self._rows)
+            offset = self._add(buffer, offset, -1, object_file)
+            if self._rows[row][3] == 103:
+                _, _, _, _, _, _, name_offset, name_length, _, _ = self._rows[row]
+                name = str(buffer[name_offset:name_offset + name_length], 'ASCII')
+                if name not in object_file_ids:
+                    object_file_ids[name] = len(self.object_files)
+                    self.object_files.append(name)
+                object_file = object_file_ids[name]
+                self._rows[row][9] = object_file
+
+        for (name, typecode), column in zip(_COLUMNS.items(), zip(*self._rows) if self._rows else [()] * len(_COLUMNS)):
+            column = array.array(typecode, column)
+            setattr(self, name, np.frombuffer(column, dtype=np.dtype(column.typecode)) if np is not None else column)
+        del self._rows
+
+    def __len__(self):
+        return len(self.offset)
+
+    def _add(self, buffer: memoryview, offset: int, parent: int, object_file: int) -> int:
+        # Appends the row for the entry at `offset`, then the rows of anything nested in it. Returns the next offset
+        row = len(self._rows)
+        entry_type = buffer[offset + 4]
+        value = syms._U32_STRUCT.unpack_from(buffer, offset)[0]
+        pos = offset + 5
+        if entry_type == 8:
+            pos += 1
+        cls, type_word, size, name_offset, name_length = -1, 0, 0, -1, 0
+        kind = entry_type & 0x7F
+        if entry_type & 0x80 == 0:
+            name_offset, name_length = pos + 1, buffer[pos]
+            next_offset = name_offset + name_length
+        elif kind == 8:
+            name_offset, name_length = pos + 5, buffer[pos + 4]
+            next_offset = name_offset + name_length
+        elif kind == 12:
+            pos += 20
+            pos += 1 + buffer[pos]
+            name_offset, name_length = pos + 1, buffer[pos]
+            next_offset = name_offset + name_length
+        elif kind == 20:
+            cls, type_word, size = syms._DEFINITION_STRUCT.unpack_from(buffer, pos)
+            name_offset, name_length = pos + 9, buffer[pos + 8]
+            next_offset = name_offset + name_length
+        elif kind == 22:
+            cls, type_word, size, n_dims = syms._ARRAY_STRUCT.unpack_from(buffer, pos)
+            pos += 10 + 4 * max(n_dims, 0)
+            pos += 1 + buffer[pos]
+            name_offset, name_length = pos + 1, buffer[pos]
+            next_offset = name_offset + name_length
+        else:
+            next_offset = pos + syms._FIXED_SYMBOL_SIZES.get(kind, 0)
+        self._rows.append([offset, value, entry_type, cls, type_word, size, name_offset, name_length, parent, object_file])
+
+        if entry_type & 0x80 == 0:
+            return next_offset
+        if kind == 12:
+            while True:
+                child_row = len(self._rows)
+                child_type = buffer[next_offset + 4]
+                next_offset = self._add(buffer, next_offset, row, object_file)
+                if child_type & 0x7F == 14:
+                    # The function end entry's value is the address the function ends at
+                    self._rows[row][5] = self._rows[child_row][1] - value
+                    break
+            next_offset += 4
+        elif kind == 20 and (cls == 10 or cls == 15 or cls == 12):
+            while True:
+                _, child_symbol, child_end = syms.skip_entry(buffer, next_offset)
+                if syms._I16_STRUCT.unpack_from(buffer, child_symbol)[0] == 102:
+                    next_offset = child_end
+                    break
+                next_offset = self._add(buffer, next_offset, row, object_file)
+        return next_offset
+
+    def name(self, row: int) -> Union[str, None]:
+        """Name (or label) of the entry in `row`"""
+        name_offset = self.name_offset[row]
+        if name_offset == -1:
+            return None
+        name_length = self.name_length[row]
+        return str(self.buffer[name_offset:name_offset + name_length], 'ASCII')
+
+    def names(self, rows: Iterable[int]) -> List[Union[str, None]]:
+        return [self.name(int(row)) for row in rows]
+
+    def select(self, kinds: Union[Iterable[int], None] = None, classes: Union[Iterable[Union[int, str]], None] = None,
+               object_file: Union[str, None] = None, address_range: Union[Tuple[int, int], None] = None,
+               top_level: Union[bool, None] = None):
+        """Rows matching every filter given. Vectorized when NumPy is available. Without it, each filter is a pass over a
+        column in Python, which is slower than scanning a list of already decoded objects would be; the columns' memory
+        savings are still there, but a query isn't a speed up.
+
+        Args:
+            kinds (Union[Iterable[int], None]): Symbol kinds (`type & 0x7F`, e.g. 12 for functions), only entries with a
+                symbol match
+            classes (Union[Iterable[Union[int, str]], None]): Symbol classes, by id or name (e.g. "Struct")
+            object_file (Union[str, None]): Name of the object file the entries belong to
+            address_range (Union[Tuple[int, int], None]): Half open range of entry values
+            top_level (Union[bool, None]): Only top level entries if True, only nested ones if False
+
+        Returns:
+            Row indices, as a NumPy array or `array.array`
+        """
+        class_ids = None if classes is None else {_CLASS_IDS[x] if isinstance(x, str) else x for x in classes}
+        object_file_id = None
+        if object_file is not None:
+            object_file_id = self.object_files.index(object_file) if object_file in self.object_files else -2
+        if np is not None:
+            mask = np.ones(len(self), dtype=bool)
+            if kinds is not None:
+                mask &= ((self.type & 0x80) != 0) & np.isin(self.type & 0x7F, list(kinds))
+            if class_ids is not None:
+                mask &= np.isin(self.cls, list(class_ids))
+            if object_file_id is not None:
+                mask &= self.object_file == object_file_id
+            if address_range is not None:
+                mask &= (self.value >= address_range[0]) & (self.value < address_range[1])
+            if top_level is not None:
+                mask &= (self.parent == -1) if top_level else (self.parent != -1)
+            return np.flatnonzero(mask)
+        # Without NumPy, each filter is one pass over a column (or the rows left after the previous filters) through
+        # map/compress, which keeps the per-row work out of the interpreter loop but is still several times slower
+        # than the vectorized path
+        rows = None
+        if kinds is not None:
+            rows = _filter(rows, self.type, {kind | 0x80 for kind in kinds}.__contains__)
+        if class_ids is not None:
+            rows = _filter(rows, self.cls, class_ids.__contains__)
+        if object_file_id is not None:
+            rows = _filter(rows, self.object_file, object_file_id.__eq__)
+        if address_range is not None:
+            rows = _filter(rows, self.value, range(*address_range).__contains__)
+        if top_level is not None:
+            rows = _filter(rows, self.parent, (-1).__eq__ if top_level else (-1).__ne__)
+        return array.array('q', range(len(self)) if rows is None else rows)
+
+
+def _filter(rows: Union[List[int], None], column, predicate) -> List[int]:
+    # Rows (all of them if None) whose value in `column` satisfies `predicate`
+    if rows is None:
+        return list(itertools.compress(range(len(column)), map(predicate, column)))
+    return list(itertools.compress(rows, map(predicate, map(column.__getitem__, rows))))
+
+
+class EntryView(Sequence):
+    """Read only sequence of `SymbolEntry` objects for some rows of a `SymbolTable`, decoded from the file each time
+    they're accessed rather than kept around
+
+    Args:
+        symfile (SymFile): File the table was built from, which the entries belong to
+        rows: Rows of `symfile.table` to include
+    """
+    def __init__(self, symfile, rows):
+        self.symfile = symfile
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _decode(self, row: int) -> syms.SymbolEntry:
+        return syms.SymbolEntry.from_buffer(self.symfile.buffer, int(self.symfile.table.offset[row]), True, self.symfile)[0]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return EntryView(self.symfile, self.rows[index])
+        return self._decode(self.rows[index])
+
+    def __iter__(self) -> Iterator[syms.SymbolEntry]:
+        for row in self.rows:
+            yield self._decode(row)
+
+
+class FunctionView(Mapping):
+    """Function name -> `SymbolEntry` mapping over a `SymbolTable`, matching `SymFile.functions`. Entries are decoded on
+    access. Where several functions share a name, the last one wins
+    """
+    def __init__(self, symfile):
+        self.symfile = symfile
+        table = symfile.table
+        rows = table.select(kinds=[12], top_level=True)
+        self._rows: Dict[str, int] = {name: int(row) for name, row in zip(table.names(rows), rows)}
+
+    def __getitem__(self, name: str) -> syms.SymbolEntry:
+        return syms.SymbolEntry.from_buffer(self.symfile.buffer, int(self.symfile.table.offset[self._rows[name]]), True,
+                                            self.symfile)[0]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
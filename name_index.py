@@ -0,0 +1,116 @@
+"""
+Fast name lookups over a `SymFile`, see `NameIndex`
+"""
+import array
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Union
+
+import symdump.symbols as syms
+
+FUNCTION = 1
+TYPE = 2
+GLOBAL = 4
+SOURCE_FILE = 8
+SYMBOL = 16
+"""Any named top level entry, see `NameIndex.symbols`"""
+ANY = FUNCTION | TYPE | GLOBAL | SOURCE_FILE | SYMBOL
+
+_TYPE_CLASSES = (10, 12, 13, 15)
+"""Struct, Union, Typedef and Enum"""
+_GLOBAL_CLASSES = (2, 3)
+"""Extern and Static"""
+
+
+class NameIndex:
+    """Sorted table of every function, type, global, source file and symbol name in a `SymFile`, along with an inverted
+    index from each 3 character substring (trigram) to the names containing it.
+
+    Prefix lookups are a binary search into the sorted names. Substring lookups only check the names containing the
+    query's rarest trigram, queries shorter than a trigram fall back to a scan. Matching is case sensitive, and results
+    come back in sorted order.
+
+    Args:
+        symfile (SymFile): File to index, `index` must have been run
+    """
+    def __init__(self, symfile):
+        kinds: Dict[str, int] = {}
+        self.symbols: Dict[str, syms.SymbolEntry] = {}
+        """The first top level entry with each name"""
+        for name in symfile.functions.keys():
+            kinds[name] = kinds.get(name, 0) | FUNCTION
+        for name in symfile.source_files.keys():
+            kinds[name] = kinds.get(name, 0) | SOURCE_FILE
+        for entry in symfile.symbols:
+            symbol = entry.symbol
+            name = getattr(symbol, "name", None)
+            if name is None:
+                continue
+            kind = SYMBOL
+            if type(symbol) is syms.DefinitionSymbol or type(symbol) is syms.ArraySymbol:
+                if symbol.cls in _TYPE_CLASSES:
+                    if type(symbol) is not syms.DefinitionSymbol or not symbol.is_fake:
+                        kind |= TYPE
+                elif symbol.cls in _GLOBAL_CLASSES and not symbol.descriptor.is_function:
+                    kind |= GLOBAL
+            kinds[name] = kinds.get(name, 0) | kind
+            if name not in self.symbols:
+                self.symbols[name] = entry
+        self.names: List[str] = sorted(kinds)
+        self.kinds = array.array('B', [kinds[name] for name in self.names])
+        postings: Dict[str, List[int]] = {}
+        for i, name in enumerate(self.names):
+            for trigram in {name[j:j + 3] for j in range(len(name) - 2)}:
+                try:
+                    postings[trigram].append(i)
+                except KeyError:
+                    postings[trigram] = [i]
+        self.trigrams: Dict[str, array.array] = {trigram: array.array('I', ids) for trigram, ids in postings.items()}
+        """Ids (indices into `names`) of the names containing each trigram, ascending"""
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name: str):
+        i = bisect_left(self.names, name)
+        return i < len(self.names) and self.names[i] == name
+
+    def kind(self, name: str) -> int:
+        """The kinds of thing `name` is, or 0 if it isn't in the index"""
+        i = bisect_left(self.names, name)
+        return self.kinds[i] if i < len(self.names) and self.names[i] == name else 0
+
+    def prefix(self, prefix: str, kinds: int = ANY, limit: Union[int, None] = None) -> List[str]:
+        """Names starting with `prefix`, of any of `kinds`, at most `limit` of them"""
+        matches = []
+        names = self.names
+        for i in range(bisect_left(names, prefix), len(names)):
+            if not names[i].startswith(prefix) or (limit is not None and len(matches) >= limit):
+                break
+            if self.kinds[i] & kinds:
+                matches.append(names[i])
+        return matches
+
+    def _candidates(self, text: str) -> Iterator[int]:
+        if len(text) < 3:
+            return iter(range(len(self.names)))
+        smallest = None
+        for j in range(len(text) - 2):
+            ids = self.trigrams.get(text[j:j + 3])
+            if ids is None:
+                return iter(())
+            if smallest is None or len(ids) < len(smallest):
+                smallest = ids
+        # Every name containing `text` contains all of its trigrams, so the names holding its rarest trigram are all
+        # that need checking. Intersecting with the other lists would cost more than checking those names directly
+        return iter(smallest)
+
+    def search(self, text: str, kinds: int = ANY, limit: Union[int, None] = None) -> List[str]:
+        """Names containing `text`, of any of `kinds`, at most `limit` of them"""
+        matches = []
+        names = self.names
+        for i in self._candidates(text):
+            if limit is not None and len(matches) >= limit:
+                break
+            if self.kinds[i] & kinds and text in names[i]:
+                matches.append(names[i])
+        return matches
@@ -0,0 +1,220 @@
+"""
+Where a dump's source files and headers go, see `OutputSink`
+"""
+import abc
+import contextlib
+import io
+import os
+import posixpath
+import sys
+import tarfile
+import time
+import zipfile
+from typing import BinaryIO, Iterator, Set, TextIO, Union
+
+BUFFER_SIZE = 1 << 20
+"""Bytes buffered before each write to the underlying file"""
+
+
+class OutputSink(abc.ABC):
+    """Destination for every file in a dump. Files are given by a relative, "/" separated path (see
+    `SourceFile.relative_paths`), and written to through the text stream `open` gives. Sinks are context managers,
+    closing one finishes off the output (e.g. writing an archive's index)
+    """
+    @abc.abstractmethod
+    def open(self, path: str) -> "contextlib.AbstractContextManager[TextIO]":
+        """Context manager giving a text stream for the file at `path`, which is complete once it exits"""
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class DirectorySink(OutputSink):
+    """Writes each file under the directory `root`, as its own file. Each directory is only created once
+
+    Args:
+        root (str): Directory to write to, relative to the current directory at the time the sink's created
+        encoding (str): Encoding the files are written in
+    """
+    def __init__(self, root: str = "output", encoding: str = "utf-8"):
+        self.root = os.path.abspath(root)
+        self.encoding = encoding
+        self._created: Set[str] = set()
+
+    def full_path(self, path: str) -> str:
+        return os.path.join(self.root, *path.split("/"))
+
+    def encode(self, text: str) -> bytes:
+        """The bytes `open` would write for `text`"""
+        if os.linesep != "\n":
+            text = text.replace("\n", os.linesep)
+        return text.encode(self.encoding, "surrogateescape")
+
+    def _make_directory(self, full_path: str) -> None:
+        directory = os.path.dirname(full_path)
+        if directory not in self._created:
+            os.makedirs(directory, exist_ok=True)
+            self._created.add(directory)
+
+    @contextlib.contextmanager
+    def open(self, path: str) -> Iterator[TextIO]:
+        full_path = self.full_path(path)
+        self._make_directory(full_path)
+        with open(full_path, "w", buffering=BUFFER_SIZE, encoding=self.encoding, errors="surrogateescape") as f:
+            yield f
+
+    def write_bytes(self, path: str, data: bytes) -> None:
+        """Writes `data` (e.g. from `encode`) to the file at `path` as it is"""
+        full_path = self.full_path(path)
+        self._make_directory(full_path)
+        with open(full_path, "wb") as f:
+            f.write(data)
+
+
+class _ArchiveSink(OutputSink):
+    # Members need their size up front, so each file is put together in memory and added once it's complete
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        self.mtime = time.time()
+        """Modification time given to every member"""
+        self._directories: Set[str] = set()
+
+    def _add_directories(self, path: str) -> None:
+        directory = posixpath.dirname(path)
+        missing = []
+        while directory and directory not in self._directories:
+            missing.append(directory)
+            self._directories.add(directory)
+            directory = posixpath.dirname(directory)
+        for directory in reversed(missing):
+            self._add_directory(directory)
+
+    @abc.abstractmethod
+    def _add_directory(self, path: str) -> None: pass
+
+    @abc.abstractmethod
+    def _add_file(self, path: str, data: bytes) -> None: pass
+
+    @contextlib.contextmanager
+    def open(self, path: str) -> Iterator[TextIO]:
+        sink = io.StringIO()
+        yield sink
+        self._add_directories(path)
+        self._add_file(path, sink.getvalue().encode(self.encoding, "surrogateescape"))
+
+
+class TarSink(_ArchiveSink):
+    """Writes every file into a single tar archive, written out as a stream so it can go to a pipe
+
+    Args:
+        target (Union[str, BinaryIO]): Path of the archive, or a binary stream to write it to (e.g. `sys.stdout.buffer`)
+        compression (str): "" for none, or "gz", "bz2" or "xz"
+        encoding (str): Encoding the files are written in
+    """
+    def __init__(self, target: Union[str, BinaryIO], compression: str = "", encoding: str = "utf-8"):
+        super().__init__(encoding)
+        mode = f"w|{compression}"
+        if isinstance(target, str):
+            self.tar = tarfile.open(target, mode, bufsize=BUFFER_SIZE)
+        else:
+            self.tar = tarfile.open(fileobj=target, mode=mode, bufsize=BUFFER_SIZE)
+
+    def _member(self, path: str, member_type: bytes, mode: int) -> tarfile.TarInfo:
+        info = tarfile.TarInfo(path)
+        info.type = member_type
+        info.mode = mode
+        info.mtime = self.mtime
+        return info
+
+    def _add_directory(self, path: str) -> None:
+        self.tar.addfile(self._member(path, tarfile.DIRTYPE, 0o755))
+
+    def _add_file(self, path: str, data: bytes) -> None:
+        info = self._member(path, tarfile.REGTYPE, 0o644)
+        info.size = len(data)
+        self.tar.addfile(info, io.BytesIO(data))
+
+    def close(self) -> None:
+        self.tar.close()
+
+
+class ZipSink(_ArchiveSink):
+    """Writes every file into a single, deflated, zip archive
+
+    Args:
+        target (Union[str, BinaryIO]): Path of the archive, or a binary stream to write it to. The stream doesn't need
+            to be seekable
+        encoding (str): Encoding the files are written in
+    """
+    def __init__(self, target: Union[str, BinaryIO], encoding: str = "utf-8"):
+        super().__init__(encoding)
+        self._file = None
+        if isinstance(target, str):
+            target = self._file = open(target, "wb", buffering=BUFFER_SIZE)
+        self.zip = zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED)
+        self._date_time = time.localtime(self.mtime)[:6]
+
+    def _member(self, path: str, mode: int) -> zipfile.ZipInfo:
+        info = zipfile.ZipInfo(path, self._date_time)
+        info.external_attr = mode << 16
+        return info
+
+    def _add_directory(self, path: str) -> None:
+        info = self._member(path + "/", 0o40755)
+        info.external_attr |= 0x10  # MS-DOS directory flag
+        self.zip.writestr(info, b"")
+
+    def _add_file(self, path: str, data: bytes) -> None:
+        info = self._member(path, 0o100644)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        self.zip.writestr(info, data)
+
+    def close(self) -> None:
+        try:
+            self.zip.close()
+        finally:
+            if self._file is not None:
+                self._file.close()
+
+
+class StreamSink(OutputSink):
+    """Writes every file one after another to a single text stream, each starting with a comment giving its path
+
+    Args:
+        stream (TextIO): Where to write to, `sys.stdout` (as it is when the sink's created) if not given
+    """
+    def __init__(self, stream: Union[TextIO, None] = None):
+        self.stream = stream if stream is not None else sys.stdout
+
+    @contextlib.contextmanager
+    def open(self, path: str) -> Iterator[TextIO]:
+        self.stream.write(f"/* ==> {path} <== */\n")
+        yield self.stream
+        self.stream.write("\n")
+
+    def close(self) -> None:
+        self.stream.flush()
+
+
+_TAR_SUFFIXES = {".tar": "", ".tar.gz": "gz", ".tgz": "gz", ".tar.bz2": "bz2", ".tar.xz": "xz"}
+
+
+def open_sink(target: str) -> OutputSink:
+    """Sink for `target`: "-" for `StreamSink` to stdout, a path ending with .zip or .tar (optionally .gz, .bz2 or .xz)
+    for an archive, otherwise a directory
+    """
+    if target == "-":
+        return StreamSink()
+    lower = target.lower()
+    if lower.endswith(".zip"):
+        return ZipSink(target)
+    for suffix, compression in _TAR_SUFFIXES.items():
+        if lower.endswith(suffix):
+            return TarSink(target, compression)
+    return DirectorySink(target)
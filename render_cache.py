@@ -0,0 +1,85 @@
+"""
+Bounded cache of rendered symbols, see `SymFile.render_cache`
+"""
+import functools
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Tuple
+
+DEFAULT_RENDER_CACHE_SIZE = 65536
+"""Default number of rendered strings a `SymFile` keeps"""
+
+
+class RenderCache:
+    """Least recently used cache of rendered symbols, keyed by the symbol's identity and how it was rendered (e.g.
+    `__str__` or `param_str`). Each cached string keeps its symbol alive, so an identity can't be reused while it's
+    cached.
+
+    Args:
+        maxsize (int): Number of rendered strings to keep, 0 disables caching
+    """
+    def __init__(self, maxsize: int = DEFAULT_RENDER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[object, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Cached strings are cheap to rebuild and would pin every symbol they came from, so only the size is kept
+        return {"maxsize": self.maxsize}
+
+    def __setstate__(self, state: Dict[str, int]):
+        self.__init__(state["maxsize"])
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"<RenderCache hits:{self.hits} misses:{self.misses} size:{len(self._entries)}/{self.maxsize}>"
+
+    def get(self, symbol: object, option: str) -> str:
+        """The cached rendering of `symbol`, or None"""
+        key = (id(symbol), option)
+        with self._lock:
+            try:
+                _, text = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, symbol: object, option: str, text: str) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[(id(symbol), option)] = (symbol, text)
+            self._entries.move_to_end((id(symbol), option))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drops every cached string, for when something rendering depends on (e.g. `SymFile.type_definitions`) changes.
+        The counters are kept
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+def cached_render(method: Callable[[object], str]) -> Callable[[object], str]:
+    """Decorates a symbol's rendering method so its result is kept in the `render_cache` of the symbol's `SymFile`"""
+    option = method.__name__
+
+    @functools.wraps(method)
+    def render(self) -> str:
+        cache = getattr(self.symfile, "render_cache", None)
+        if cache is None or cache.maxsize <= 0:
+            return method(self)
+        text = cache.get(self, option)
+        if text is None:
+            text = method(self)
+            cache.put(self, option, text)
+        return text
+    return render
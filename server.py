@@ -0,0 +1,409 @@
+"""
+Keeps SYM files loaded and answers queries about them over a local socket, so tools don't each have to parse the same
+file.
+
+Usage: python -m symdump.server <file.sym> [file.sym ...] (--socket PATH | --port PORT)
+
+Requests and responses are JSON objects, one per line. Each request has an `op`, optionally an `id` that's echoed back,
+and a `file` when more than one file is loaded. `file` is the SYM's file name, with as many of its parent directories as
+it takes to tell it apart from the other loaded files with the same name (e.g. `a/game.sym` and `b/game.sym`, `/`
+separated), as given by the `files` op. The path the file was loaded from is accepted too:
+
+    {"id": 1, "op": "function", "name": "main"}
+    {"id": 1, "ok": true, "result": {...}, "elapsed_ms": 0.21}
+
+Failed requests get `"ok": false` and an `error` instead of a `result`. The ops are:
+
+- `function` (`name`): Address, end address, file, line and rendered source of a function
+- `symbolize` (`addresses`): Function, offset, file and line of each address
+- `type` (`name`): A type rendered as C, along with any other definitions with the same name
+- `search` (`text`, `kind`, `prefix`, `limit`): Names containing (or starting with) `text`, at most `limit` of them
+  (1000 by default). `kind` is one of `function`, `type`, `global`, `source`, `symbol` or `any`
+- `files`: The loaded files
+- `stats`: Request counts and latencies, per op
+"""
+import argparse
+import asyncio
+import collections
+import contextlib
+import errno
+import json
+import os
+import socket
+import stat
+import sys
+import time
+from typing import Any, Callable, Deque, Dict, List, Union
+
+from symdump.address_index import AddressIndex
+from symdump.cache import load_symfile
+from symdump.name_index import ANY, FUNCTION, GLOBAL, SOURCE_FILE, SYMBOL, TYPE
+from symdump.symfile import SymFile
+from symdump.type_registry import namespace
+
+_KINDS = {"function": FUNCTION, "type": TYPE, "global": GLOBAL, "source": SOURCE_FILE, "symbol": SYMBOL, "any": ANY}
+
+DEFAULT_SEARCH_LIMIT = 1000
+"""Most names a `search` returns when the request doesn't give a limit"""
+
+_LINE_LIMIT = 16 * 1024 * 1024
+"""Longest request line accepted, big enough for a `symbolize` with a few hundred thousand addresses"""
+
+
+class QueryError(Exception):
+    """A request that can't be answered, reported back to the client rather than raised"""
+
+
+class LatencyStats:
+    """Count, mean, maximum and percentiles of request times for one op. Percentiles are over the last `window` requests
+
+    Args:
+        window (int): Number of recent requests to keep the times of
+    """
+    def __init__(self, window: int = 4096):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = collections.deque(maxlen=window)
+
+    def add(self, seconds: float, failed: bool = False) -> None:
+        self.count += 1
+        self.errors += failed
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        """The stats, times in milliseconds"""
+        recent = sorted(self.recent)
+
+        def percentile(p: float) -> float:
+            return recent[min(len(recent) - 1, int(len(recent) * p))] * 1000 if recent else 0.0
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": percentile(0.5),
+            "p99_ms": percentile(0.99),
+            "max_ms": self.max * 1000,
+        }
+
+
+def file_names(paths: List[str]) -> Dict[str, str]:
+    """Gives each of `paths` the shortest name that tells it apart from the others: its file name, along with as many
+    parent directories as it takes for the files sharing that name. Raises `ValueError` if a file is given twice
+    """
+    parts = {path: os.path.abspath(path).replace(os.sep, "/").split("/") for path in paths}
+    names: Dict[str, str] = {}
+    depth = {path: 1 for path in paths}
+    pending = list(paths)
+    while pending:
+        by_name: Dict[str, List[str]] = collections.defaultdict(list)
+        for path in paths:
+            by_name["/".join(parts[path][-depth[path]:])].append(path)
+        pending = []
+        for name, clashing in by_name.items():
+            if len(clashing) == 1:
+                names[clashing[0]] = name
+                continue
+            for path in clashing:
+                if depth[path] >= len(parts[path]):
+                    raise ValueError(f"{path} is given more than once")
+                depth[path] += 1
+            pending.extend(clashing)
+    return names
+
+
+def remove_socket(path: str) -> None:
+    """Removes the Unix socket at `path`, if there is one. Raises `FileExistsError` if something other than a socket is
+    there, so a mistyped path can't delete a file
+    """
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(errno.EEXIST, "Not a socket, leaving it alone", path)
+    os.remove(path)
+
+
+class LoadedFile:
+    """A SYM file the server answers for. The address index is built the first time it's needed"""
+    def __init__(self, path: str, symfile: SymFile):
+        self.path = path
+        self.symfile = symfile
+        self._address_index: AddressIndex = None
+
+    @property
+    def address_index(self) -> AddressIndex:
+        if self._address_index is None:
+            self._address_index = AddressIndex(self.symfile)
+        return self._address_index
+
+
+class SymbolServer:
+    """Answers queries against a set of loaded SYM files. `handle` does the work for a single request, `serve_unix` and
+    `serve_tcp` take requests from any number of clients at once.
+
+    Queries are answered one at a time on the event loop, most take well under a millisecond, and the symbols aren't
+    safe to decode from several threads at once anyway.
+
+    Args:
+        files (Dict[str, SymFile]): Files to answer for, by path. Clients refer to them by the names from `file_names`
+    """
+    def __init__(self, files: Dict[str, SymFile]):
+        names = file_names(list(files))
+        self.files: Dict[str, LoadedFile] = {names[path]: LoadedFile(path, symfile) for path, symfile in files.items()}
+        self.stats: Dict[str, LatencyStats] = collections.defaultdict(LatencyStats)
+        self.clients = 0
+        self._ops: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "function": self._function,
+            "symbolize": self._symbolize,
+            "type": self._type,
+            "search": self._search,
+            "files": self._files,
+            "stats": self._stats,
+        }
+
+    @classmethod
+    def load(cls, paths: List[str], **load_args) -> "SymbolServer":
+        """Loads each of `paths` through `load_symfile`, and builds their name and address indexes, so none of that has to
+        happen while answering a query
+        """
+        file_names(paths)  # Fail on a file given twice before spending time loading anything
+        server = cls({path: load_symfile(path, **load_args) for path in paths})
+        for loaded in server.files.values():
+            loaded.symfile.name_index
+            loaded.address_index
+        return server
+
+    def _file(self, request: Dict[str, Any]) -> LoadedFile:
+        name = request.get("file")
+        if name is None:
+            if len(self.files) != 1:
+                raise QueryError(f"'file' is needed, one of: {', '.join(self.files)}")
+            return next(iter(self.files.values()))
+        try:
+            return self.files[name]
+        except KeyError:
+            pass
+        for loaded in self.files.values():
+            if loaded.path == name:
+                return loaded
+        raise QueryError(f"No file called {name!r} is loaded, one of: {', '.join(self.files)}")
+
+    @staticmethod
+    def _arg(request: Dict[str, Any], name: str) -> Any:
+        try:
+            return request[name]
+        except KeyError:
+            raise QueryError(f"'{name}' is missing")
+
+    def _function(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        name = self._arg(request, "name")
+        entry = self._file(request).symfile.functions.get(name)
+        if entry is None:
+            raise QueryError(f"No function called {name!r}")
+        function = entry.symbol
+        return {
+            "name": function.name,
+            "address": entry.value,
+            "end_address": function.end_address,
+            "file": function.file,
+            "line": function.line[0],
+            "source": str(function),
+        }
+
+    def _symbolize(self, request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        addresses = self._arg(request, "addresses")
+        try:
+            addresses = [int(x, 0) if isinstance(x, str) else int(x) for x in addresses]
+        except (TypeError, ValueError):
+            raise QueryError("'addresses' has to be a list of integers or integer strings")
+        return [location._asdict() for location in self._file(request).address_index.lookup_many(addresses)]
+
+    def _type(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        name = self._arg(request, "name")
+        symfile = self._file(request).symfile
+        definition = symfile.type_definitions.get(name)
+        if definition is None:
+            raise QueryError(f"No type called {name!r}")
+        variants = symfile.type_registry.variants.get((namespace(definition), name), [])
+        return {
+            "name": name,
+            "source": str(definition),
+            "other_definitions": [str(x) for x in variants if x is not definition],
+        }
+
+    def _search(self, request: Dict[str, Any]) -> List[str]:
+        text = self._arg(request, "text")
+        if not isinstance(text, str):
+            raise QueryError("'text' has to be a string")
+        try:
+            kinds = _KINDS[request.get("kind", "any")]
+        except (KeyError, TypeError):
+            raise QueryError(f"'kind' has to be one of: {', '.join(_KINDS)}")
+        limit = request.get("limit", DEFAULT_SEARCH_LIMIT)
+        if type(limit) is not int or limit < 0:
+            raise QueryError("'limit' has to be a non-negative integer")
+        name_index = self._file(request).symfile.name_index
+        if request.get("prefix", False):
+            return name_index.prefix(text, kinds, limit)
+        return name_index.search(text, kinds, limit)
+
+    def _files(self, request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [
+            {"name": name, "path": loaded.path, "functions": len(loaded.symfile.functions),
+             "types": len(loaded.symfile.type_definitions), "names": len(loaded.symfile.name_index)}
+            for name, loaded in self.files.items()
+        ]
+
+    def _stats(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return {"clients": self.clients, "ops": {op: stats.summary() for op, stats in self.stats.items()}}
+
+    def handle(self, request: Any) -> Dict[str, Any]:
+        """Answers a single, already decoded, request"""
+        start = time.perf_counter()
+        request_id = request.get("id") if isinstance(request, dict) else None
+        op = request.get("op") if isinstance(request, dict) else None
+        response: Dict[str, Any] = {"id": request_id}
+        try:
+            if op not in self._ops:
+                raise QueryError(f"'op' has to be one of: {', '.join(self._ops)}")
+            response["result"] = self._ops[op](request)
+            response["ok"] = True
+        except QueryError as e:
+            response["ok"] = False
+            response["error"] = str(e)
+        except Exception as e:  # A bad query shouldn't take the server down for everyone else
+            response["ok"] = False
+            response["error"] = f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - start
+        self.stats[op if op in self._ops else "invalid"].add(elapsed, not response["ok"])
+        response["elapsed_ms"] = elapsed * 1000
+        return response
+
+    def handle_line(self, line: bytes) -> bytes:
+        """Answers a request given as a line of JSON, returning the response as one"""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            response = {"id": None, "ok": False, "error": f"Invalid JSON: {e}"}
+            self.stats["invalid"].add(0.0, True)
+        else:
+            response = self.handle(request)
+        return json.dumps(response).encode() + b"\n"
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.clients += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                writer.write(self.handle_line(line))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients -= 1
+            writer.close()
+
+    async def serve_unix(self, path: str) -> asyncio.AbstractServer:
+        """Starts answering on a Unix socket at `path`, replacing any socket that was there. Raises `FileExistsError` if
+        there's something else at `path`
+        """
+        remove_socket(path)
+        return await asyncio.start_unix_server(self._client, path, limit=_LINE_LIMIT)
+
+    async def serve_tcp(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.AbstractServer:
+        """Starts answering on `host`:`port`, localhost only by default. Port 0 picks a free one"""
+        return await asyncio.start_server(self._client, host, port, limit=_LINE_LIMIT)
+
+
+class SymbolClient:
+    """Blocking client for a `SymbolServer`, for scripts that just want answers
+
+    Args:
+        address (Union[str, tuple]): Path of the server's Unix socket, or its (host, port)
+    """
+    def __init__(self, address: Union[str, tuple]):
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        self.socket = socket.socket(family, socket.SOCK_STREAM)
+        self.socket.connect(address)
+        self._file = self.socket.makefile("rwb")
+        self._next_id = 0
+
+    def close(self) -> None:
+        self._file.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def request(self, op: str, **args) -> Dict[str, Any]:
+        """Sends a request, returning the whole response"""
+        self._next_id += 1
+        self._file.write(json.dumps({"id": self._next_id, "op": op, **args}).encode() + b"\n")
+        self._file.flush()
+        return json.loads(self._file.readline())
+
+    def query(self, op: str, **args) -> Any:
+        """Sends a request, returning its result. Raises `QueryError` if it failed"""
+        response = self.request(op, **args)
+        if not response["ok"]:
+            raise QueryError(response["error"])
+        return response["result"]
+
+
+async def _serve(server: SymbolServer, args: argparse.Namespace) -> None:
+    if args.socket is not None:
+        listener = await server.serve_unix(args.socket)
+    else:
+        listener = await server.serve_tcp(args.host, args.port)
+    names = ", ".join(str(x.getsockname()) for x in listener.sockets)
+    print(f"Serving {', '.join(server.files)} on {names}", file=sys.stderr)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv: Union[List[str], None] = None) -> int:
+    parser = argparse.ArgumentParser(description="Keep SYM files loaded and answer JSON queries about them over a socket")
+    parser.add_argument("symfiles", nargs="+", help="SYM files to load")
+    listen = parser.add_mutually_exclusive_group(required=True)
+    listen.add_argument("--socket", help="Unix socket to listen on")
+    listen.add_argument("--port", type=int, help="TCP port to listen on")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on with --port")
+    args = parser.parse_args(argv)
+
+    try:
+        file_names(args.symfiles)
+        if args.socket is not None:
+            remove_socket(args.socket)
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+    start = time.perf_counter()
+    server = SymbolServer.load(args.symfiles)
+    print(f"Loaded {len(server.files)} files in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    try:
+        asyncio.run(_serve(server, args))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.socket is not None:
+            with contextlib.suppress(OSError):
+                remove_socket(args.socket)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
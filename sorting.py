@@ -1,21 +1,250 @@
-import networkx as nx
-import symdump
-
-class SympdumpSorter():
-    def __init__(self) -> None:
-        self.graph = nx.DiGraph()
-        
-        sortable_definitions = [x for x in symdump.SymFile().type_definitions.values() if type(x) is not symdump.symbols.ArraySymbol and not x.is_fake]
-        for definition in sortable_definitions:
-            self.graph.add_node(definition)
-            if definition.children is not None:
-                for child in definition.children:
-                    if type(child.symbol) is symdump.symbols.ArraySymbol:
-                        if child.symbol.tag is not None \
-                            and symdump.SymFile().type_definitions.get(child.symbol.tag) is not None \
-                            and not child.symbol.is_fake \
-                            and child.symbol.tag != type_def.name \
-                            and ('pointer', '*{}') not in child.symbol.type_modifiers:
-                            self.graph.add_edge(symdump.SymFile().type_definitions[child.symbol.tag], definition)
-
-        self.sorted_graph = nx.topological_sort(self.graph)
+"""
+Orders type definitions so every type comes after the types it's built from, and writes them all out as a single header.
+
+Usage: python -m symdump.sorting <file.sym> [-o types.h]
+"""
+import argparse
+import io
+import ntpath
+import re
+import sys
+from typing import Dict, List, TextIO, Tuple, Union
+
+from symdump.symfile import SymFile
+from symdump.type_registry import TAG, namespace
+from symdump.writer import IndentWriter
+import symdump.symbols as syms
+
+_TAGGED_CLASSES = (10, 12, 15)
+"""Definitions that other types refer to by tag"""
+_FORWARD_DECLARABLE = ("struct", "union")
+
+TypeDefinition = Union[syms.DefinitionSymbol, syms.ArraySymbol]
+
+
+class TypeGraph:
+    """Dependency graph between the types in `SymFile.type_registry`. Types are numbered in the order they were defined,
+    and each keeps the types it needs to be complete before it (members and typedefs of them, and nested anonymous types)
+    apart from the ones it only refers to through a pointer, which just need declaring.
+
+    There's one type per name in each of C's namespaces (see `symdump.type_registry`), so `typedef struct Foo Foo` is
+    both the struct and the typedef. Members and typedefs refer to structs, unions and enums by tag, so only tags are
+    resolved. Where a name has conflicting definitions, the first is used.
+
+    Anonymous (fake) types are part of the graph, every object file's own, as whatever they need is needed by the type
+    they're written into, but are never written out themselves.
+
+    Args:
+        symfile (SymFile): File to take the types from, `index` must have been run
+    """
+    def __init__(self, symfile: SymFile):
+        self.symfile = symfile
+        self.types: List[TypeDefinition] = []
+        for variants in symfile.type_registry.variants.values():
+            if type(variants[0]) is syms.DefinitionSymbol and variants[0].is_fake:
+                self.types.extend(variants)
+            else:
+                self.types.append(variants[0])
+        self.types.sort(key=lambda x: x.entry.loc)
+        tags: Dict[str, int] = {}
+        nodes: Dict[int, int] = {}
+        for i, definition in enumerate(self.types):
+            nodes[id(definition)] = i
+            if namespace(definition) == TAG:
+                tags.setdefault(definition.name, i)
+        self.requires: List[List[int]] = []
+        """Types that have to be defined before each type"""
+        self.refers_to: List[List[int]] = []
+        """Types each type only has pointers to"""
+        for i, definition in enumerate(self.types):
+            requires = []
+            refers_to = []
+            if type(definition) is syms.ArraySymbol:
+                members = [(definition, definition.entry.loc)]
+            else:
+                members = [(x.symbol, x.loc) for x in definition.children or () if type(x.symbol) is syms.ArraySymbol]
+            for member, loc in members:
+                if member.is_fake:
+                    # Anonymous types are numbered per object file, see `SymFile.type_definition`
+                    target = nodes.get(id(symfile.type_definition(member.tag, loc)))
+                else:
+                    target = tags.get(member.tag)
+                if target is None or target == i:
+                    continue
+                if member.descriptor.pointer_num > 0 or member.descriptor.is_function:
+                    refers_to.append(target)
+                else:
+                    requires.append(target)
+            self.requires.append(requires)
+            self.refers_to.append(refers_to)
+
+    def __len__(self):
+        return len(self.types)
+
+    def components(self) -> List[List[int]]:
+        """Strongly connected components over `requires` (Tarjan's algorithm), each listed after every component it
+        depends on. Components of more than one type are dependency cycles, their types are in definition order
+        """
+        count = len(self.types)
+        index = [-1] * count
+        lowlink = [0] * count
+        on_stack = [False] * count
+        stack: List[int] = []
+        components: List[List[int]] = []
+        next_index = 0
+        for root in range(count):
+            if index[root] != -1:
+                continue
+            # Iterative, as deeply nested types would otherwise run into the recursion limit
+            work: List[Tuple[int, int]] = [(root, 0)]
+            index[root] = lowlink[root] = next_index
+            next_index += 1
+            stack.append(root)
+            on_stack[root] = True
+            while work:
+                node, edge = work[-1]
+                requires = self.requires[node]
+                if edge < len(requires):
+                    work[-1] = (node, edge + 1)
+                    target = requires[edge]
+                    if index[target] == -1:
+                        index[target] = lowlink[target] = next_index
+                        next_index += 1
+                        stack.append(target)
+                        on_stack[target] = True
+                        work.append((target, 0))
+                    elif on_stack[target] and index[target] < lowlink[node]:
+                        lowlink[node] = index[target]
+                    continue
+                work.pop()
+                if work and lowlink[node] < lowlink[work[-1][0]]:
+                    lowlink[work[-1][0]] = lowlink[node]
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1:
+                        component.sort()
+                    components.append(component)
+        return components
+
+    def order(self) -> Tuple[List[int], List[int]]:
+        """Works out the order to write the types in
+
+        Returns:
+            Tuple[List[int], List[int]]: Every type, dependencies first, and the structs and unions that need a forward
+            declaration as they're used before being defined, either through a pointer or as part of a cycle
+        """
+        order = [node for component in self.components() for node in component]
+        position = [0] * len(order)
+        for i, node in enumerate(order):
+            position[node] = i
+        forward = []
+        declared = set()
+        for node in order:
+            for target in self.refers_to[node] + self.requires[node]:
+                if position[target] > position[node] and target not in declared \
+                        and self.types[target].type_name in _FORWARD_DECLARABLE and not self.types[target].is_fake:
+                    declared.add(target)
+                    forward.append(target)
+        return order, forward
+
+    def write_header(self, sink: TextIO, guard: Union[str, None] = None) -> None:
+        """Writes every type to `sink` as one header, in the order given by `order`
+
+        Args:
+            sink (TextIO): Where the header goes
+            guard (Union[str, None]): Include guard macro to wrap the header in, if any
+        """
+        order, forward = self.order()
+        writer = IndentWriter(sink)
+        if guard is not None:
+            writer.write(f"#ifndef {guard}\n#define {guard}\n\n")
+        for node in forward:
+            writer.write(f"{self.types[node].type_name} {self.types[node].name};\n")
+        if forward:
+            writer.write("\n")
+        for node in order:
+            definition = self.types[node]
+            if type(definition) is syms.DefinitionSymbol and definition.is_fake:
+                continue
+            self._write_type(writer, definition)
+            writer.write("\n")
+        if guard is not None:
+            writer.write(f"\n#endif // {guard}\n")
+
+
+    def _write_type(self, writer: IndentWriter, definition: TypeDefinition) -> None:
+        # Types are written as C rather than the way source files render them: enum members get their values, anonymous
+        # types are written out in place, and there are no register comments
+        if definition.cls_name == "Typedef":
+            # Function and function pointer typedefs included, everything here is a type
+            writer.write("typedef ")
+        if type(definition) is syms.ArraySymbol and definition.is_fake:
+            self._write_nested(writer, definition, definition.entry.loc)
+            writer.write(";")
+        elif type(definition) is syms.DefinitionSymbol and definition.cls in _TAGGED_CLASSES and definition.children is not None:
+            writer.write(f"{definition.type_name} {definition.name}")
+            self._write_body(writer, definition)
+            writer.write(";")
+        else:
+            definition.write_to(writer)
+
+    def _write_body(self, writer: IndentWriter, definition: syms.DefinitionSymbol) -> None:
+        writer.write(" {\n")
+        with writer.indented():
+            for member in definition.children:
+                symbol = member.symbol
+                if symbol.cls_name == "EnumMember":
+                    # The entry value is the member's value, as a signed int
+                    value = member.value - (1 << 32) if member.value >= 1 << 31 else member.value
+                    writer.write(f"{symbol.name} = {value},")
+                elif symbol.is_fake:
+                    self._write_nested(writer, symbol, member.loc)
+                    writer.write(";")
+                else:
+                    symbol.write_to(writer)
+                writer.write("\n")
+        writer.write("}")
+
+    def _write_nested(self, writer: IndentWriter, symbol: syms.ArraySymbol, loc: int) -> None:
+        # An anonymous type written out in full, followed by the name (and pointers and dimensions) of what it's the type of
+        nested = self.symfile.type_definition(symbol.tag, loc)
+        writer.write(nested.type_name)
+        self._write_body(writer, nested)
+        dims = "".join(f"[{x}]" for x in symbol.dims)
+        writer.write(f" {'*' * symbol.descriptor.pointer_num}{symbol.name}{dims}")
+
+
+def header_text(symfile: SymFile, guard: Union[str, None] = None) -> str:
+    """All of the types in `symfile` as a single header, see `TypeGraph`"""
+    sink = io.StringIO()
+    TypeGraph(symfile).write_header(sink, guard)
+    return sink.getvalue()
+
+
+def main(argv: Union[List[str], None] = None) -> int:
+    parser = argparse.ArgumentParser(description="Write every type in a SYM file out as a single, dependency ordered header")
+    parser.add_argument("symfile", help="SYM file to take the types from")
+    parser.add_argument("-o", "--output", help="Header to write, stdout if not given")
+    args = parser.parse_args(argv)
+
+    with open(args.symfile, "rb") as f:
+        symfile = SymFile(f, lazy_functions=True)
+    symfile.index()
+    name = ntpath.basename(args.output) if args.output is not None else ntpath.basename(args.symfile) + ".h"
+    guard = re.sub(r"\W", "_", name).upper()
+    if args.output is None:
+        TypeGraph(symfile).write_header(sys.stdout, guard)
+    else:
+        with open(args.output, "w") as f:
+            TypeGraph(symfile).write_header(f, guard)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,6 +1,21 @@
 import symdump.symbols
-from typing import List, Dict
-import os
+from symdump.output import DirectorySink, OutputSink
+from symdump.writer import IndentWriter
+from typing import List, Dict, TextIO, Tuple
+import io
+
+_TYPE_CLASSES = (10, 12, 13, 15)
+"""Struct, Union, Typedef and Enum"""
+
+
+def _write_symbol(writer: IndentWriter, symbol) -> None:
+    if getattr(symbol, "cls", None) in _TYPE_CLASSES:
+        # The same types turn up in file after file and share a symbol (see `SymFile.type_registry`), so they go
+        # through the render cache
+        writer.write(str(symbol))
+    else:
+        symbol.write_to(writer)
+
 
 class SourceFile:
     """Abstraction of a source file generated using symbols.
@@ -53,7 +68,7 @@ class SourceFile:
                 else:
                     self.header_lines[self.curr_header_line].append(symbol)
                 self.curr_header_line += 1
-            elif type(symbol.symbol) is symdump.symbols.FunctionSymbol or (symbol.symbol.cls_name != "Typedef" and ('func_return', '({})') not in symbol.symbol.type_modifiers):
+            elif type(symbol.symbol) is symdump.symbols.FunctionSymbol or (symbol.symbol.cls_name != "Typedef" and not symbol.symbol.descriptor.is_function):
                 if self.lines.get(self.curr_line) is None:
                     self.lines[self.curr_line] = [symbol]
                 else:
@@ -111,43 +126,72 @@ class SourceFile:
                     pass
         self.lines_written = True
 
-    def write_file(self):
+    def write_source(self, sink: TextIO):
+        """Renders the source file straight to `sink`, a symbol at a time"""
+        writer = IndentWriter(sink)
+        writer.write(f'#include "{self.basename[:-1]}H"\n')
+        for entries in self.lines.values():
+            for entry in entries:
+                if entry.symbol is not None:
+                    _write_symbol(writer, entry.symbol)
+                    writer.write('\n')
+
+    def write_header(self, sink: TextIO):
+        """Renders the header straight to `sink`, a symbol at a time"""
+        writer = IndentWriter(sink)
+        for entries in self.header_lines.values():
+            for entry in entries:
+                if entry.symbol is None:
+                    continue
+                if entry.symbol.cls_name == 'Typedef' and not entry.symbol.is_function:
+                    writer.write("typedef ")
+                _write_symbol(writer, entry.symbol)
+                writer.write('\n')
+
+    def render_file(self):
+        """Renders the source file and header into `text_lines` and `header_text_lines`, unless that has already been
+        done. Only needed where the text has to be kept around, `write_file` streams it out otherwise
+        """
         if self.lines_written:
-            self.write_out()
             return
-        if len(self.lines.keys()) >= 1:
-            for i, _ in self.lines.items():
-                if self.lines.get(i) is not None:
-                    for entry in self.lines[i]:
-                        self.text_lines.append(str(entry.symbol) + '\n' if entry.symbol is not None else '')
-                else:
-                    pass
-        if len(self.header_lines.keys()) >= 1:
-            for i, _ in self.header_lines.items():
-                if self.header_lines.get(i) is not None:
-                    for entry in self.header_lines[i]:
-                        if entry.symbol.cls_name == 'Typedef' and not entry.symbol.is_function:
-                            self.header_text_lines.append("typedef " + str(entry.symbol) + '\n' if entry.symbol is not None else '')
-                        else:
-                            self.header_text_lines.append(str(entry.symbol) + '\n' if entry.symbol is not None else '')
-                            
-                else:
-                    pass
+        sink = io.StringIO()
+        self.write_source(sink)
+        self.text_lines = [sink.getvalue()]
+        sink = io.StringIO()
+        self.write_header(sink)
+        self.header_text_lines = [sink.getvalue()]
         self.lines_written = True
-        self.write_out()
-    
-    def write_out(self, output_dir="output"):
+
+    def relative_paths(self) -> Tuple[str, str]:
+        """Paths of the source file and its header within a dump, "/" separated"""
         split_path = self.filename.upper().split("\\")[1:]  # Remove the first part of the path. Likely not ideal in every circumstance, but removes the C: part of windows paths
-        os.makedirs(os.path.join(os.getcwd(), output_dir, *split_path[:-1]), exist_ok=True)
-        output_file = os.path.join(os.getcwd(), output_dir, *split_path)
-        output_header = output_file[:-1] + 'H'
-        with open(output_file, "w") as f:
-            f.writelines(self.text_lines)
-            f.close()
-        with open(output_header, "w") as f:
-            f.writelines(self.header_text_lines)
-            f.close()
+        source_path = "/".join(split_path)
+        return source_path, source_path[:-1] + 'H'
 
+    def output_paths(self, output_dir="output") -> Tuple[str, str]:
+        """Where `write_out` puts the source file and its header"""
+        sink = DirectorySink(output_dir)
+        return tuple(sink.full_path(path) for path in self.relative_paths())
 
-            
+    def write_file(self, output_dir="output"):
+        self.write_out(output_dir)
+    
+    def write_out(self, output_dir="output"):
+        """Writes out the source file and header under `output_dir`, see `write_to`"""
+        self.write_to(DirectorySink(output_dir))
 
+    def write_to(self, sink: OutputSink):
+        """Writes out the source file and header to `sink`, from `text_lines` and `header_text_lines` if they've already
+        been rendered, otherwise rendering them as they're written
+        """
+        source_path, header_path = self.relative_paths()
+        with sink.open(source_path) as f:
+            if self.lines_written:
+                f.writelines(self.text_lines)
+            else:
+                self.write_source(f)
+        with sink.open(header_path) as f:
+            if self.lines_written:
+                f.writelines(self.header_text_lines)
+            else:
+                self.write_header(f)
@@ -0,0 +1,101 @@
+"""
+Symbolizes the addresses in emulator traces and crash logs, writing one `addr function+offset file:line` line per address.
+
+Usage: python -m symdump.symbolize <file.sym> [log ...] [--chunk LINES]
+
+Reads from stdin if no logs are given. Every 8 digit hex number (optionally prefixed with 0x) is treated as an address.
+"""
+import argparse
+import io
+import itertools
+import re
+import sys
+from typing import List, TextIO, Union
+
+from symdump.address_index import AddressIndex
+from symdump.symfile import SymFile
+
+_ADDRESS_RE = re.compile(r"\b(?:0[xX])?([0-9a-fA-F]{8})\b")
+
+DEFAULT_CHUNK_LINES = 65536
+
+
+class Symbolizer:
+    """Formats batches of addresses against an `AddressIndex`"""
+    def __init__(self, index: AddressIndex):
+        self.index = index
+        # Plain lists, indexing these per address is much cheaper than going through the arrays
+        self._names = index.function_names
+        self._starts = index.function_starts.tolist()
+        self._lines = index.line_numbers.tolist()
+        self._files = [index.files[x] for x in index.line_files.tolist()]
+
+    def format(self, addresses: List[int]) -> List[str]:
+        """Returns an output line, including the newline, for each address"""
+        functions = self.index.function_indices(addresses).tolist()
+        lines = self.index.line_indices(addresses).tolist()
+        out = []
+        for address, function, line in zip(addresses, functions, lines):
+            if function == -1:
+                out.append(f"{address:08x} ?? ??:0\n")
+            elif line == -1:
+                out.append(f"{address:08x} {self._names[function]}+0x{address - self._starts[function]:x} ??:0\n")
+            else:
+                out.append(f"{address:08x} {self._names[function]}+0x{address - self._starts[function]:x} "
+                           f"{self._files[line]}:{self._lines[line]}\n")
+        return out
+
+    def symbolize_stream(self, input: TextIO, output: TextIO, chunk_lines: int = DEFAULT_CHUNK_LINES) -> int:
+        """Symbolizes every address in `input`, `chunk_lines` lines at a time, so memory use doesn't depend on the size of
+        the input
+
+        Returns:
+            int: The number of addresses written
+        """
+        count = 0
+        while True:
+            chunk = list(itertools.islice(input, chunk_lines))
+            if len(chunk) == 0:
+                return count
+            addresses = [int(x, 16) for x in _ADDRESS_RE.findall("".join(chunk))]
+            if len(addresses) > 0:
+                output.writelines(self.format(addresses))
+                count += len(addresses)
+
+
+def main(argv: Union[List[str], None] = None) -> int:
+    parser = argparse.ArgumentParser(description="Resolve addresses in traces and crash logs to function+offset file:line")
+    parser.add_argument("symfile", help="SYM file to resolve addresses against")
+    parser.add_argument("logs", nargs="*", help="Logs to read addresses from, stdin if none are given")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK_LINES, help="Lines to read per batch")
+    args = parser.parse_args(argv)
+
+    with open(args.symfile, "rb") as f:
+        symbolizer = Symbolizer(AddressIndex(SymFile(f, lazy_functions=True)))
+    # Block buffered output even on a terminal, and input that doesn't stop at undecodable bytes. The wrappers are
+    # detached afterwards rather than closed, closing them would close the process's own stdin and stdout
+    wrappers: List[io.TextIOWrapper] = []
+    output = sys.stdout
+    if hasattr(sys.stdout, "buffer"):
+        sys.stdout.flush()
+        output = io.TextIOWrapper(sys.stdout.buffer, write_through=False)
+        wrappers.append(output)
+    try:
+        if len(args.logs) == 0:
+            input = sys.stdin
+            if hasattr(sys.stdin, "buffer"):
+                input = io.TextIOWrapper(sys.stdin.buffer, errors="replace")
+                wrappers.append(input)
+            symbolizer.symbolize_stream(input, output, args.chunk)
+        for log in args.logs:
+            with open(log, "r", errors="replace") as f:
+                symbolizer.symbolize_stream(f, output, args.chunk)
+    finally:
+        output.flush()
+        for wrapper in wrappers:
+            wrapper.detach()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
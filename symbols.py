@@ -3,15 +3,17 @@ All the types of symbol supported are present here
 """
 
 __all__ = ["SourceLineSymbol", "SetOverlaySymbol", "OverlaySymbol", "FunctionSymbol", "ArraySymbol", "DefinitionSymbol",
-           "SourceLineBeginSymbol", "SymbolEntry"]
+           "SourceLineBeginSymbol", "SymbolEntry", "FunctionBlock"]
 
 from ast import arg
 import io
 import struct
 import re
-from typing import List, Tuple, Dict, Union
+from typing import Iterator, List, NamedTuple, Tuple, Dict, Union
 
 from symdump.utils import *
+from symdump.render_cache import cached_render
+from symdump.writer import IndentWriter, render
 import symdump
 
 _PRIMITIVE_TYPES: List[str] = [
@@ -108,11 +110,72 @@ _TYPE_MODIFIERS: List[Tuple[str, str]] = [
     ("array", "[{}]")
 ]
 
+# Precompiled layouts used when decoding straight from a buffer, see `SymbolEntry.from_buffer`
+_ENTRY_STRUCT = struct.Struct("<IB")
+_OVERLAY_STRUCT = struct.Struct("<ii")
+_U32_STRUCT = struct.Struct("<I")
+_I32_STRUCT = struct.Struct("<i")
+_ARRAY_STRUCT = struct.Struct("<hHih")
+_FUNCTION_STRUCT = struct.Struct("<hihIii")
+_DEFINITION_STRUCT = struct.Struct("<hHi")
+_I16_STRUCT = struct.Struct("<h")
+
+# Size of the symbol data for symbol types that don't contain strings or nested entries
+_FIXED_SYMBOL_SIZES: Dict[int, int] = {
+    0: 0,
+    2: 1,
+    4: 2,
+    6: 4,
+    16: 4,
+    18: 4,
+    24: 8,
+    26: 0
+}
+
+
+
+class TypeDescriptor(NamedTuple):
+    """Decoded form of a definition or array type word. There's only ever one descriptor per type word, see
+    `type_descriptor`, so symbols of the same type share it and can be compared by identity
+    """
+    word: int
+    base: str
+    """Name of the primitive type, from the low 4 bits of the word"""
+    modifiers: Tuple[Tuple[str, str], ...]
+    """All 6 modifier slots, innermost first, unused ones being `("none", "")`"""
+    pointer_num: int
+    func_returns: int
+    """Number of `func_return` modifiers, more than 1 for functions returning function pointers"""
+
+    @property
+    def is_function(self) -> bool:
+        return self.func_returns > 0
+
+    def __reduce__(self):
+        # Unpickle (e.g. from the cache) to the interned descriptor rather than a copy of it
+        return type_descriptor, (self.word,)
+
+
+_TYPE_DESCRIPTORS: Dict[int, TypeDescriptor] = {}
+
+
+def type_descriptor(type_word: int) -> TypeDescriptor:
+    """The shared `TypeDescriptor` for `type_word`, decoded the first time that word is seen"""
+    try:
+        return _TYPE_DESCRIPTORS[type_word]
+    except KeyError:
+        modifiers = tuple(_TYPE_MODIFIERS[(type_word >> (x * 2 + 4)) & 3] for x in range(0, 6))
+        descriptor = TypeDescriptor(type_word, _PRIMITIVE_TYPES[type_word & 0x0F], modifiers,
+                                    modifiers.count(_TYPE_MODIFIERS[1]), modifiers.count(_TYPE_MODIFIERS[2]))
+        return _TYPE_DESCRIPTORS.setdefault(type_word, descriptor)
 
 
 class SymbolABC:
+    """Base of all symbols. Symbols are slotted to keep large files small in memory, subclasses must declare `__slots__`
+    for any attribute they set
+    """
+    __slots__ = ("entry",)
     _TYPE_MAPPING: Dict[int, str] = {}
-    entry = None
 
     @classmethod
     def add_type_mapping(cls, type_id: int, name: str) -> None:
@@ -121,28 +184,60 @@ class SymbolABC:
     @classmethod
     def map_type(cls, type_id: int) -> str: return cls._TYPE_MAPPING[type_id]
 
+    @property
+    def symfile(self):
+        """The `SymFile` this symbol was read from, used to resolve types and functions by name while rendering"""
+        entry = getattr(self, "entry", None)
+        return entry.symfile if entry is not None else None
+
     @property
     def is_fake(self):
         return False
 
+    def write_to(self, writer: IndentWriter) -> None:
+        """Writes the rendered symbol to `writer`, the same text `str()` gives"""
+        writer.write(str(self))
+
 
 class OverlaySymbol(SymbolABC):
+    __slots__ = ("length", "id")
+
     def __init__(self, file_input: io.BytesIO):
         self.length, self.id = struct.unpack("<ii", file_input.read(8))
 
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int):
+        self = cls.__new__(cls)
+        self.length, self.id = _OVERLAY_STRUCT.unpack_from(buffer, offset)
+        return self, offset + 8
+
     def __repr__(self):
         return f"<Overlay(id:{self.id},len:{self.length})>"
 
 
 class SetOverlaySymbol(SymbolABC):
+    __slots__ = ()
+
     def __init__(self, file_input: io.BytesIO):
         pass
 
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int):
+        return cls.__new__(cls), offset
+
 
 class BlockSymbol(SymbolABC):
+    __slots__ = ("line",)
+
     def __init__(self, file_input: io.BytesIO):
         self.line = int.from_bytes(file_input.read(4), 'little')
 
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int):
+        self = cls.__new__(cls)
+        self.line = _U32_STRUCT.unpack_from(buffer, offset)[0]
+        return self, offset + 4
+
     def __repr__(self):
         return f"<Block @ {self.line}>"
 
@@ -151,6 +246,8 @@ class BlockSymbol(SymbolABC):
 
 
 class BlockEndSymbol(BlockSymbol):
+    __slots__ = ()
+
     def __repr__(self):
         return "<BlockEnd>"
     def __str__(self):
@@ -158,48 +255,71 @@ class BlockEndSymbol(BlockSymbol):
 
 
 class ArraySymbol(SymbolABC):
+    __slots__ = ("cls", "descriptor", "length", "n_dims", "dims", "tag", "name")
+
     def __init__(self, file_input: io.BytesIO):
         self.cls = struct.unpack("<h", file_input.read(2))[0]
-        self._type_modifier = struct.unpack("<H", file_input.read(2))[0]
-        self.type_modifiers = [_TYPE_MODIFIERS[(self._type_modifier >> (x * 2 + 4)) & 3] for x in range(0, 6)]
-        self.cls_name = _SYMBOL_TYPES.get(self.cls)
+        self.descriptor = type_descriptor(struct.unpack("<H", file_input.read(2))[0])
         self.length, self.n_dims = struct.unpack("<ih", file_input.read(6))
-        self.dims = []
-        for i in range(0, self.n_dims):
-            dim = struct.unpack("<I", file_input.read(4))[0]
-            self.dims.append(dim)
+        self.dims = tuple(struct.unpack("<I", file_input.read(4))[0] for _ in range(0, self.n_dims))
         self.tag = read_pascal_string(file_input).decode('ASCII')
         self.name = read_pascal_string(file_input).decode('ASCII')
 
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int):
+        self = cls.__new__(cls)
+        self.cls, type_word, self.length, self.n_dims = _ARRAY_STRUCT.unpack_from(buffer, offset)
+        self.descriptor = type_descriptor(type_word)
+        offset += 10
+        self.dims = struct.unpack_from(f"<{self.n_dims}I", buffer, offset) if self.n_dims > 0 else ()
+        offset += 4 * max(self.n_dims, 0)
+        self.tag, offset = unpack_pascal_string(buffer, offset)
+        self.name, offset = unpack_pascal_string(buffer, offset)
+        return self, offset
+
+    @property
+    def _type_modifier(self) -> int:
+        return self.descriptor.word
+
     @property
     def type_name(self):
-        return _PRIMITIVE_TYPES[self._type_modifier & 0x0F]
+        return self.descriptor.base
+
+    @property
+    def type_modifiers(self) -> Tuple[Tuple[str, str], ...]:
+        return self.descriptor.modifiers
+
+    @property
+    def cls_name(self):
+        return _SYMBOL_TYPES.get(self.cls)
     
     @property
     def is_fake(self):
         return re.match(r"\.\d+fake", self.tag) is not None
 
+    @cached_render
     def __str__(self):
-        pointers = self.type_modifiers.count(('pointer', '*{}'))
+        pointers = self.descriptor.pointer_num
         if not self.is_fake:
             p1 = f"{self.type_name} {self.tag if self.tag is not None else ''} {'*' * pointers}{self.name}"
         else:
-            actual_type = symdump.SymFile().type_definitions[self.tag]
+            actual_type = self.symfile.type_definition(self.tag, self.entry.loc)
             p1 = str(actual_type)
         p1 += "".join([f"[{x}]" for x in self.dims]) + ";"
         if self.entry.value < len(_REGISTERS) and not self.is_fake and self.cls_name not in  ["StructMember", "Bitfield", "UnionMember"]:
             p1 += f"\t/* ${_REGISTERS[self.entry.value]} */"
         if self.cls_name in ["StructMember", "Bitfield", "UnionMember"]:
-            object_files = [file for file, obj in symdump.SymFile().object_files.items() if self.tag in obj.children_names]
+            object_files = self.symfile.object_files_containing(self.tag)
             p1 += f"\t/* offset: {self.entry.value}{', found in:' + ', '.join(object_files) if object_files != [] else ''} */"
         return p1
     
+    @cached_render
     def param_str(self):
-        pointers = self.type_modifiers.count(('pointer', '*{}'))
+        pointers = self.descriptor.pointer_num
         if not self.is_fake:
             p1 = f"{self.type_name} {self.tag if self.tag is not None else ''} {'*' * pointers}{self.name}"
         else:
-            actual_type = symdump.SymFile().type_definitions[self.tag]
+            actual_type = self.symfile.type_definition(self.tag, self.entry.loc)
             p1 = str(actual_type)
         p1 += "".join([f"[{x}]" for x in self.dims])
         if self.entry.value < len(_REGISTERS) and not self.is_fake:
@@ -222,12 +342,23 @@ class ArraySymbol(SymbolABC):
         return False
 
 class FunctionEndSymbol(SymbolABC):
+    __slots__ = ("line",)
+
     def __init__(self, file_input: io.BytesIO):
         self.line = struct.unpack("<i", file_input.read(4))[0]
 
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int):
+        self = cls.__new__(cls)
+        self.line = _I32_STRUCT.unpack_from(buffer, offset)[0]
+        return self, offset + 4
+
 
 class FunctionSymbol(SymbolABC):
-    def __init__(self, file_input: io.BytesIO):
+    __slots__ = ("fp", "fsize", "retreg", "mask", "maskoffs", "line", "file", "name", "_complete", "_buffer", "_children",
+                 "body_span", "end_address", "end", "_args", "_body")
+
+    def __init__(self, file_input: io.BytesIO, symfile: "symdump.SymFile" = None):
         self.fp, self.fsize, self.retreg, self.mask, self.maskoffs, self.line = struct.unpack("<hihIii",
                                                                                               file_input.read(20))
         self.file = read_pascal_string(file_input).decode('ASCII')
@@ -235,58 +366,172 @@ class FunctionSymbol(SymbolABC):
         self.name = read_pascal_string(file_input).decode('ASCII')
         """Name of the function"""
         self._complete = False
-        self.children: List[SymbolEntry] = []
-        self.children += [SymbolEntry(file_input)]
-        while self.children[-1].type & 0x7F != 14:
-            self.children += [SymbolEntry(file_input)]
+        self._buffer: memoryview = None
+        self._args: List[SymbolEntry] = None
+        self._body: FunctionBlock = None
+        body_start = file_input.tell()
+        self._children: List[SymbolEntry] = []
+        self._children += [SymbolEntry(file_input, symfile)]
+        while self._children[-1].type & 0x7F != 14:
+            self._children += [SymbolEntry(file_input, symfile)]
+        self.body_span: Tuple[int, int] = (body_start, file_input.tell())
+        """Start and end offsets of the entries making up the function body"""
+        self.end_address: int = self._children[-1].value
+        """Address the function ends at, taken from the function end entry"""
         self.end = FunctionEndSymbol(file_input)
         if type(self.line) is not Tuple:
             self.line = (self.line, 0)
 
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int, symfile: "symdump.SymFile" = None, lazy: bool = False):
+        """Decodes a function from `buffer`. If `lazy` is set, only the header is decoded, and the body is skipped over
+        until `children` is first accessed
+        """
+        self = cls.__new__(cls)
+        self.fp, self.fsize, self.retreg, self.mask, self.maskoffs, line = _FUNCTION_STRUCT.unpack_from(buffer, offset)
+        self.file, offset = unpack_pascal_string(buffer, offset + 20)
+        self.name, offset = unpack_pascal_string(buffer, offset)
+        self._complete = False
+        self._buffer = None
+        self._args = None
+        self._body = None
+        body_start = offset
+        if lazy:
+            self._buffer = buffer
+            self._children = None
+            while True:
+                child_offset = offset
+                child_type, _, offset = skip_entry(buffer, offset)
+                if child_type & 0x7F == 14:
+                    self.end_address = _U32_STRUCT.unpack_from(buffer, child_offset)[0]
+                    break
+        else:
+            self._children = []
+            while True:
+                child, offset = SymbolEntry.from_buffer(buffer, offset, symfile=symfile)
+                self._children.append(child)
+                if child.type & 0x7F == 14:
+                    self.end_address = child.value
+                    break
+        self.body_span = (body_start, offset)
+        self.end, offset = FunctionEndSymbol.from_buffer(buffer, offset)
+        self.line = (line, 0)
+        return self, offset
 
+    @property
+    def children(self) -> List["SymbolEntry"]:
+        if self._children is None:
+            # Only publish the list once it's complete, another thread may be rendering this function too
+            children = []
+            offset, end = self.body_span
+            while offset < end:
+                child, offset = SymbolEntry.from_buffer(self._buffer, offset, symfile=self.symfile)
+                children.append(child)
+            self._children = children
+        return self._children
+
+    @children.setter
+    def children(self, value: List["SymbolEntry"]):
+        self._children = value
+        self._args = None
+        self._body = None
+
+    def __getstate__(self):
+        # An undecoded body stays undecoded, the buffer has to be reattached after unpickling. The block tree is rebuilt
+        # on demand
+        state = {name: getattr(self, name) for name in FunctionSymbol.__slots__ + SymbolABC.__slots__ if hasattr(self, name)}
+        state["_buffer"] = None
+        state["_args"] = None
+        state["_body"] = None
+        return None, state
+
+    def _build_body(self) -> None:
+        args = []
+        body = FunctionBlock(self.line[0], self.entry.value if getattr(self, "entry", None) is not None else None)
+        open_blocks = [body]
+        for child in self.children:
+            symbol = child.symbol
+            if getattr(symbol, "cls", None) in (9, 17):  # Argument, RegParam
+                args.append(child)
+            elif type(symbol) is BlockSymbol:
+                block = FunctionBlock(symbol.line, child.value)
+                open_blocks[-1].items.append(block)
+                open_blocks.append(block)
+            elif type(symbol) is BlockEndSymbol and len(open_blocks) > 1:
+                block = open_blocks.pop()
+                block.end_line, block.end_offset = symbol.line, child.value
+            else:
+                # Includes block ends that don't close anything, which are kept as they are
+                open_blocks[-1].items.append(child)
+        # Publish the body last, as that's what's checked for, see `children`
+        self._args = args
+        self._body = body
+
+    @property
+    def body(self) -> "FunctionBlock":
+        """The function body as a tree of blocks, the outermost being the function itself. Built from `children` the first
+        time it's needed
+        """
+        if self._body is None:
+            self._build_body()
+        return self._body
+
+
+    @cached_render
     def __str__(self):
+        return render(self)
+
+    def write_to(self, writer: IndentWriter) -> None:
         # TODO: Clean this up, is a mess
-        object_files = [file for file, obj in symdump.SymFile().object_files.items() if self.name in obj.children_names]
-        indent_amount = 0
-        curr_line = 0
+        object_files = self.symfile.object_files_containing(self.name)
         try:
-            func_def = symdump.SymFile().type_definitions[self.name]
+            func_def = self.symfile.type_definitions[self.name]
         except KeyError:
-            return "Function Missing Definition Symbol"
+            writer.write("Function Missing Definition Symbol")
+            return
         return_type = ''
         if func_def.type_name == 'struct':
-            # return_type = next(typedef for typedef in symdump.SymFile().type_definitions.values() if type(typedef) is ArraySymbol and typedef.tag == func_def.tag).name
+            # return_type = next(typedef for typedef in self.symfile.type_definitions.values() if type(typedef) is ArraySymbol and typedef.tag == func_def.tag).name
             return_type = re.match(r"^(\w+\s\w+\s[\*|])", str(func_def).replace(";", ""))[0]
         else:
             return_type = str(func_def.type_name)
         arg_strings = ", ".join([str(x).replace(";", "") for x in self.args])  # Remove the ; from the normal string represetatoin
-        blocks = io.StringIO()
-        for symbol in [sym for sym in self.children if sym not in self.args]:
-            if type(symbol.symbol) is BlockSymbol:
-                blocks.write(('\t' * indent_amount) + '{' + f" /* line {symbol.symbol.line}, offset 0x{symbol.value:X} */ \n")
-                indent_amount += 1
-            elif type(symbol.symbol) is BlockEndSymbol:
-                indent_amount -= 1
-                blocks.write(('\t' * (indent_amount)) + '}' + f" /* line {symbol.symbol.line}, offset 0x{symbol.value:X} */ \n")
-            elif type(symbol) is not None:
-                symbol_lines = str(symbol.symbol).splitlines(True)
-                symbol_lines = [('\t' * indent_amount) + x + '\n' for x in symbol_lines]
-                blocks.writelines(symbol_lines)
-        blocks.seek(0)
-        out = """{return_type} {func_name}({args}) {{
-\t{blocks}
-}} /* found in: {obj} */""".format(
-    return_type = return_type,
-    func_name = self.name,
-    args=arg_strings,
-    blocks="\t".join(blocks.readlines()[:-1]),
-    obj=object_files
-    )
-        return out
-
-
-
-
+        writer.write(f"{return_type} {self.name}({arg_strings}) {{\n")
+        base = writer.level
+        # The last line of the body (the function end) is left out, so each line is only written once the next is known
+        pending = None
+        written = False
+        for depth, line in self._body_lines():
+            if pending is not None:
+                writer.level = base + 1 + max(pending[0], 0)
+                writer.write(pending[1])
+                written = True
+            pending = (depth, line)
+        if not written:
+            # An empty body is still an (indented) empty line
+            writer.level = base + 1
+            writer.write("\n")
+        writer.level = base
+        writer.write(("\n" if written else "") + f"}} /* found in: {object_files} */")
+
+    def _body_lines(self, block: "FunctionBlock" = None, indent_amount: int = 0) -> Iterator[Tuple[int, str]]:
+        # Lines of the function body (less the arguments) along with how deeply nested in blocks they are. Symbols
+        # spanning several lines are followed by an empty line after each of their lines but the last
+        for item in (self.body if block is None else block).items:
+            if type(item) is FunctionBlock:
+                yield indent_amount, '{' + f" /* line {item.line}, offset 0x{item.offset:X} */ \n"
+                yield from self._body_lines(item, indent_amount + 1)
+                if item.end_line is not None:
+                    yield indent_amount, '}' + f" /* line {item.end_line}, offset 0x{item.end_offset:X} */ \n"
+            elif type(item.symbol) is BlockEndSymbol:
+                yield indent_amount - 1, '}' + f" /* line {item.symbol.line}, offset 0x{item.value:X} */ \n"
+            else:
+                for line in str(item.symbol).splitlines(True):
+                    if line.endswith("\n"):
+                        yield indent_amount, line
+                        yield 0, "\n"
+                    else:
+                        yield indent_amount, line + "\n"
 
     def __repr__(self):
         return "<Function {name}(fp:{fp},fsize:{fsize},retreg:{retreg},mask:0x{mask:x},maskoffs:0x{maskoffs:x})@{file}:{line}".format(
@@ -309,23 +554,63 @@ class FunctionSymbol(SymbolABC):
         return [x for x in self.children if type(x.symbol) in [BlockSymbol, BlockEndSymbol]]
 
     @property
-    def args(self):
-        return [x for x in self.children if x.cls_name in ['RegParam', 'Argument']]
+    def args(self) -> List["SymbolEntry"]:
+        if self._body is None:
+            self._build_body()
+        return self._args
+
+
+class FunctionBlock:
+    """A `{ }` block of a function body, see `FunctionSymbol.body`. `items` holds the entries in the block (other than
+    the function's arguments) and the blocks nested in it, in the order they appear
+
+    Args:
+        line (int): Line the block starts on
+        offset (int): Address the block starts at
+    """
+    __slots__ = ("line", "offset", "end_line", "end_offset", "items")
+
+    def __init__(self, line: int, offset: int):
+        self.line = line
+        self.offset = offset
+        self.end_line: int = None
+        self.end_offset: int = None
+        """Where the block ends, None if it's never closed"""
+        self.items: List[Union[SymbolEntry, FunctionBlock]] = []
+
+    @property
+    def locals(self) -> List["SymbolEntry"]:
+        """Variables declared directly in this block"""
+        return [item for item in self.items if type(item) is not FunctionBlock and type(item.symbol) in (DefinitionSymbol, ArraySymbol)]
+
+    @property
+    def blocks(self) -> List["FunctionBlock"]:
+        """Blocks nested directly in this one"""
+        return [item for item in self.items if type(item) is FunctionBlock]
+
+    def walk(self) -> Iterator["FunctionBlock"]:
+        """This block and every block nested in it, outermost first"""
+        yield self
+        for block in self.blocks:
+            yield from block.walk()
+
+    def __repr__(self):
+        return f"<FunctionBlock(line:{self.line},offset:0x{self.offset or 0:X},items:{len(self.items)})>"
 
 class DefinitionSymbol(SymbolABC):
-    def __init__(self, file_input: io.BytesIO):
-        self.cls, self._type, self.sz = struct.unpack("<hHi", file_input.read(8))
-        self.type_modifiers = [_TYPE_MODIFIERS[(self._type >> (x * 2 + 4)) & 3] for x in range(0, 6)]
+    __slots__ = ("cls", "descriptor", "sz", "name", "children")
+
+    def __init__(self, file_input: io.BytesIO, symfile: "symdump.SymFile" = None):
+        self.cls, type_word, self.sz = struct.unpack("<hHi", file_input.read(8))
+        self.descriptor = type_descriptor(type_word)
         self.name = read_pascal_string(file_input).decode('ASCII')
 
-        self.cls_name = _SYMBOL_TYPES.get(self.cls)
-        self.type_name = _PRIMITIVE_TYPES[self._type & 0x0F]
         self.children: List[SymbolEntry] = None
 
         if self.cls == 10 or self.cls == 15 or self.cls == 12:
             self.children = []
             while True:
-                n_definition = SymbolEntry(file_input)
+                n_definition = SymbolEntry(file_input, symfile)
                 if n_definition.symbol.cls == 102:
                     break
                 else:
@@ -333,40 +618,78 @@ class DefinitionSymbol(SymbolABC):
         else:
             pass
 
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int, symfile: "symdump.SymFile" = None):
+        self = cls.__new__(cls)
+        self.cls, type_word, self.sz = _DEFINITION_STRUCT.unpack_from(buffer, offset)
+        self.descriptor = type_descriptor(type_word)
+        self.name, offset = unpack_pascal_string(buffer, offset + 8)
+
+        self.children: List[SymbolEntry] = None
+
+        if self.cls == 10 or self.cls == 15 or self.cls == 12:
+            self.children = []
+            while True:
+                n_definition, offset = SymbolEntry.from_buffer(buffer, offset, symfile=symfile)
+                if n_definition.symbol.cls == 102:
+                    break
+                else:
+                    self.children.append(n_definition)
+        return self, offset
 
     def __hash__(self):
-        return hash((self.cls, self.sz, self._type, self.name))
+        return hash((self.cls, self.sz, self.descriptor.word, self.name))
+
+    @property
+    def _type(self) -> int:
+        return self.descriptor.word
+
+    @property
+    def type_name(self):
+        return self.descriptor.base
 
+    @property
+    def type_modifiers(self) -> Tuple[Tuple[str, str], ...]:
+        return self.descriptor.modifiers
+
+    @property
+    def cls_name(self):
+        return _SYMBOL_TYPES.get(self.cls)
+
+    @cached_render
     def __str__(self):
+        return render(self)
+
+    def write_to(self, writer: IndentWriter) -> None:
         if self.type_name == "null":
-            return f"/* {self.name} */"
+            writer.write(f"/* {self.name} */")
         else:
-            return f"{self._fmt_type()} {self._fmt_name()}{self._fmt_brackets()}{self._fmt_body()}{'' if self.cls_name in ['Argument', 'RegParam'] else ';'}{self._fmt_comment()}"
+            writer.write(f"{self._fmt_type()} {self._fmt_name()}{self._fmt_brackets()}")
+            self._write_body(writer)
+            writer.write(f"{'' if self.cls_name in ['Argument', 'RegParam'] else ';'}{self._fmt_comment()}")
 
-        
-    def _fmt_body(self):
+    def _write_body(self, writer: IndentWriter) -> None:
         # Format definitions that have a body, but are not functions (structs, enums, e.t.c)
         if not self.is_function and self.children is not None and not self.is_function_ptr:
-            definitions = " {\n"
-            for definition in self.children:
-                if not definition.symbol.is_fake:
-                    definitions += f"\t{str(definition)}\n"
-                elif self.type_name == 'enum':
-                    definitions += '\n'.join(['\t' + x for x in str.splitlines(str(symdump.SymFile().type_definitions[definition.symbol.tag]))])[0:-1] + " " + definition.symbol.name + ",\n"
-                else:
-                    definitions += '\n'.join(['\t' + x for x in str.splitlines(str(symdump.SymFile().type_definitions[definition.symbol.tag]))])[0:-1] + " " + definition.symbol.name + ";\n"
-            definitions = definitions[0:-1]
-            definitions += "\n}"
-            return definitions
-        return ""
+            writer.write(" {\n")
+            with writer.indented():
+                for definition in self.children:
+                    if not definition.symbol.is_fake:
+                        definition.symbol.write_to(writer)
+                        writer.write("\n")
+                    else:
+                        # Nested types are written out in full, less the ; (or whatever else they end in)
+                        nested = "\n".join(str.splitlines(str(self.symfile.type_definition(definition.symbol.tag, definition.loc))))
+                        writer.write(f"{nested[0:-1]} {definition.symbol.name}{',' if self.type_name == 'enum' else ';'}\n")
+            writer.write("}")
     
     def _fmt_brackets(self):
         if self.type_name in ['enummember', 'unionmember']:
             return ""
         elif self.is_function:
-            if symdump.SymFile().functions.get(self.name) is not None:
-                function_def = symdump.SymFile().functions[self.name]
-                arg_string = [str(x) for x in symdump.SymFile().functions[self.name].symbol.args]
+            if self.symfile.functions.get(self.name) is not None:
+                function_def = self.symfile.functions[self.name]
+                arg_string = [str(x) for x in self.symfile.functions[self.name].symbol.args]
                 arg_string = [re.sub(r"\s?\;\t\/\*.*", "", x) for x in arg_string] 
                 return f"({', '.join(arg_string)})"
             else:
@@ -414,7 +737,7 @@ class DefinitionSymbol(SymbolABC):
 
     @property
     def pointer_num(self):
-        return self.type_modifiers.count(('pointer', '*{}'))
+        return self.descriptor.pointer_num
 
     @property
     def is_fake(self):
@@ -422,23 +745,35 @@ class DefinitionSymbol(SymbolABC):
 
     @property
     def is_function(self):
-        return ('func_return', '({})') in self.type_modifiers
+        return self.descriptor.func_returns > 0
 
     @property
     def is_function_ptr(self):
-        if symdump.SymFile().functions.get(self.name) is not None:
-            return self.type_modifiers.count(('func_return', '({})')) >= 2 and self.pointer_num >= 1
-        else:
-            return self.type_modifiers.count(('func_return', '({})')) >= 1 and self.pointer_num >= 1
+        descriptor = self.descriptor
+        if descriptor.pointer_num < 1 or descriptor.func_returns < 1:
+            return False
+        if self.symfile.functions.get(self.name) is not None:
+            return descriptor.func_returns >= 2
+        return True
 
 
 
 class SourceLineBeginSymbol(SymbolABC):
+    __slots__ = ("line", "sl_symbols", "file")
+
     def __init__(self, file_input: io.BytesIO):
         self.line = struct.unpack("<I", file_input.read(4))
         self.sl_symbols = []
         self.file = read_pascal_string(file_input).decode('ASCII')
 
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int):
+        self = cls.__new__(cls)
+        self.line = _U32_STRUCT.unpack_from(buffer, offset)
+        self.sl_symbols = []
+        self.file, offset = unpack_pascal_string(buffer, offset + 4)
+        return self, offset
+
     def __repr__(self):
         return f"<SourceLineBegin(file:{self.file},line:{self.line})>"
 
@@ -447,6 +782,7 @@ class SourceLineSymbol(SymbolABC):
     """
     These symbols are used to indicate what line of the most recently set file we are on
     """
+    __slots__ = ("dir_type", "value")
 
     typenums: List[int] = [0, 2, 4, 6]
     """Associated type numbers for different kinds of source line symbols"""
@@ -465,6 +801,17 @@ class SourceLineSymbol(SymbolABC):
         else:
             self.value = 1
 
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int, dir_type: int):
+        self = cls.__new__(cls)
+        self.dir_type = dir_type
+        if dir_type != 0:
+            value_struct = _SOURCE_LINE_STRUCTS[dir_type]
+            self.value = value_struct.unpack_from(buffer, offset)[0]
+            return self, offset + value_struct.size
+        self.value = 1
+        return self, offset
+
     def __add__(self, other):
         return self.value + other
 
@@ -478,20 +825,93 @@ class SourceLineSymbol(SymbolABC):
         )
 
 
-# Dispatch dictionary for basic symbols
+_SOURCE_LINE_STRUCTS: Dict[int, struct.Struct] = {
+    dir_type: struct.Struct(f"<{fmt}") for dir_type, (_, fmt, _) in SourceLineSymbol.sizes.items() if fmt is not None
+}
+
+
+# Dispatch dictionary for basic symbols. Each takes the input and the `SymFile` being read, which only symbols that
+# contain entries of their own need
 _TYPE_MAPPING = {
-    0: lambda x: SourceLineSymbol(x, 0),
-    2: lambda x: SourceLineSymbol(x, 2),
-    4: lambda x: SourceLineSymbol(x, 4),
-    6: lambda x: SourceLineSymbol(x, 6),
-    8: SourceLineBeginSymbol,
+    0: lambda x, f: SourceLineSymbol(x, 0),
+    2: lambda x, f: SourceLineSymbol(x, 2),
+    4: lambda x, f: SourceLineSymbol(x, 4),
+    6: lambda x, f: SourceLineSymbol(x, 6),
+    8: lambda x, f: SourceLineBeginSymbol(x),
     12: FunctionSymbol,
-    16: BlockSymbol,
-    18: BlockEndSymbol,
+    16: lambda x, f: BlockSymbol(x),
+    18: lambda x, f: BlockEndSymbol(x),
     20: DefinitionSymbol,
-    22: ArraySymbol,
-    24: OverlaySymbol,
-    26: SetOverlaySymbol
+    22: lambda x, f: ArraySymbol(x),
+    24: lambda x, f: OverlaySymbol(x),
+    26: lambda x, f: SetOverlaySymbol(x)
+}
+
+def skip_entry(buffer: memoryview, offset: int) -> Tuple[int, int, int]:
+    """Walks over the entry at `offset` without decoding it
+
+    Returns:
+        Tuple[int, int, int]: The entry type, the offset its symbol starts at, and the offset of the next entry
+    """
+    entry_type = buffer[offset + 4]
+    offset += 5
+    if entry_type == 8:
+        offset += 1
+    if entry_type & 0x80 == 0:
+        return entry_type, offset, offset + 1 + buffer[offset]
+    symbol_offset = offset
+    kind = entry_type & 0x7F
+    if kind in _FIXED_SYMBOL_SIZES:
+        offset += _FIXED_SYMBOL_SIZES[kind]
+    elif kind == 8:
+        offset += 4
+        offset += 1 + buffer[offset]
+    elif kind == 12:
+        offset += 20
+        offset += 1 + buffer[offset]
+        offset += 1 + buffer[offset]
+        while True:
+            child_type, _, offset = skip_entry(buffer, offset)
+            if child_type & 0x7F == 14:
+                break
+        offset += 4
+    elif kind == 20:
+        cls = _I16_STRUCT.unpack_from(buffer, offset)[0]
+        offset += 8
+        offset += 1 + buffer[offset]
+        if cls == 10 or cls == 15 or cls == 12:
+            while True:
+                _, child_offset, offset = skip_entry(buffer, offset)
+                if _I16_STRUCT.unpack_from(buffer, child_offset)[0] == 102:
+                    break
+    elif kind == 22:
+        n_dims = _I16_STRUCT.unpack_from(buffer, offset + 8)[0]
+        offset += 10 + 4 * max(n_dims, 0)
+        offset += 1 + buffer[offset]
+        offset += 1 + buffer[offset]
+    return entry_type, symbol_offset, offset
+
+
+# Same as `_TYPE_MAPPING`, but for decoding from a buffer. Each returns the symbol and the offset following it
+_BUFFER_MAPPING = {
+    0: lambda x, o, f: SourceLineSymbol.from_buffer(x, o, 0),
+    2: lambda x, o, f: SourceLineSymbol.from_buffer(x, o, 2),
+    4: lambda x, o, f: SourceLineSymbol.from_buffer(x, o, 4),
+    6: lambda x, o, f: SourceLineSymbol.from_buffer(x, o, 6),
+    8: lambda x, o, f: SourceLineBeginSymbol.from_buffer(x, o),
+    12: FunctionSymbol.from_buffer,
+    16: lambda x, o, f: BlockSymbol.from_buffer(x, o),
+    18: lambda x, o, f: BlockEndSymbol.from_buffer(x, o),
+    20: DefinitionSymbol.from_buffer,
+    22: lambda x, o, f: ArraySymbol.from_buffer(x, o),
+    24: lambda x, o, f: OverlaySymbol.from_buffer(x, o),
+    26: lambda x, o, f: SetOverlaySymbol.from_buffer(x, o)
+}
+
+# Function bodies are skipped over, and only decoded once they're needed
+_LAZY_BUFFER_MAPPING = {
+    **_BUFFER_MAPPING,
+    12: lambda x, o, f: FunctionSymbol.from_buffer(x, o, f, lazy=True)
 }
 
 
@@ -502,12 +922,15 @@ class SymbolEntry:
 
     Structure is like this:
     | Addr (uint) | Symbol Type (uchar) | mx_info (Optional, uchar) | Label (Pascal Style String, char[]) | Symbol Definition (XXX) |
+
+    `symfile` is the `SymFile` the entry belongs to, which its symbol renders against
     """
+    __slots__ = ("loc", "symfile", "value", "type", "mx_info", "label", "symbol")
 
-    def __init__(self, file_input: io.BytesIO):
+    def __init__(self, file_input: io.BytesIO, symfile: "symdump.SymFile" = None):
         self.loc = file_input.tell()
+        self.symfile = symfile
         self.value, self.type = struct.unpack("<IB", file_input.read(5))
-        self.type_name = _SYMBOL_TYPES.get(self.type)
         self.mx_info: Union[None, int] = None
         self.label: Union[None, str] = None
         self.symbol: Union[None, SourceLineSymbol, SetOverlaySymbol, OverlaySymbol, FunctionSymbol, ArraySymbol, DefinitionSymbol,
@@ -517,9 +940,36 @@ class SymbolEntry:
         if self.type & 0x80 == 0:
             self.label = read_pascal_string(file_input).decode('ASCII')
         if self.type & 0x7F in _TYPE_MAPPING.keys() and self.type & 0x80 != 0:
-            self.symbol = _TYPE_MAPPING[self.type & 0x7F](file_input)
+            self.symbol = _TYPE_MAPPING[self.type & 0x7F](file_input, symfile)
         if self.symbol is not None:
             self.symbol.entry = self
+
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int, lazy_functions: bool = False, symfile: "symdump.SymFile" = None):
+        """Decodes an entry starting at `offset` in `buffer`, without going through a stream. With `lazy_functions` set,
+        function bodies are only decoded when first accessed
+
+        Returns:
+            Tuple[SymbolEntry, int]: The entry, and the offset of the entry following it
+        """
+        self = cls.__new__(cls)
+        self.loc = offset
+        self.symfile = symfile
+        self.value, self.type = _ENTRY_STRUCT.unpack_from(buffer, offset)
+        offset += 5
+        self.mx_info = None
+        self.label = None
+        self.symbol = None
+        if self.type == 8:
+            self.mx_info = buffer[offset]
+            offset += 1
+        if self.type & 0x80 == 0:
+            self.label, offset = unpack_pascal_string(buffer, offset)
+        elif self.type & 0x7F in _BUFFER_MAPPING:
+            mapping = _LAZY_BUFFER_MAPPING if lazy_functions else _BUFFER_MAPPING
+            self.symbol, offset = mapping[self.type & 0x7F](buffer, offset, symfile)
+            self.symbol.entry = self
+        return self, offset
         
 
     def __repr__(self):
@@ -535,6 +985,10 @@ class SymbolEntry:
         str_val = str(self.symbol)
         return str_val
 
+    @property
+    def type_name(self):
+        return _SYMBOL_TYPES.get(self.type)
+
     @property
     def cls_name(self):
         """Attempts to return the class name of the underlying symbol. If not possible returns None
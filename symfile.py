@@ -1,50 +1,269 @@
 """
 Provides the entry point to a PSX symbol file
 """
+import bisect
+import contextlib
+import gc
 import io
+import mmap
+import os
+import re
 import struct
-from typing import List, Dict
+from typing import List, Dict, Iterator, Tuple, Union
 from symdump.object_file import ObjectFile
+from symdump.output import DirectorySink, OutputSink
+from symdump.render_cache import DEFAULT_RENDER_CACHE_SIZE, RenderCache
+from symdump.type_registry import TypeDefinition, TypeRegistry
+from symdump.name_index import NameIndex
 
 from symdump.symbols import SymbolEntry
 from symdump.source_file import SourceFile
 import symdump.symbols as syms
 
-class Singleton(type):
-    _instances = {}
-    def __call__(cls, *args, **kwargs):
-        if cls not in cls._instances:
-            cls._instances[cls] = super(Singleton, cls).__call__(*args, **kwargs)
-        return cls._instances[cls]
+_HEADER_STRUCT = struct.Struct("<3sBB3x")
 
-class SymFile(metaclass=Singleton):
-    def __init__(self, input: io.BytesIO):
+
+def read_header(header: bytes) -> Tuple[bytes, int, int]:
+    """Unpacks the 8 byte file header, returning the magic, version and target. Raises `ValueError` on a bad magic number
+    """
+    magic, version, target = _HEADER_STRUCT.unpack_from(header)
+    if magic != b'MND':
+        raise ValueError("Magic number incorrect, expected {}, got {}".format(
+            b"MND",
+            magic
+        ))
+    return magic, version, target
+
+
+def _view_input(input: io.BytesIO) -> Union[memoryview, None]:
+    try:
+        return memoryview(mmap.mmap(input.fileno(), 0, access=mmap.ACCESS_READ))
+    except (AttributeError, io.UnsupportedOperation, OSError, ValueError):
+        pass
+    try:
+        return input.getbuffer().toreadonly()
+    except AttributeError:
+        return None
+
+
+def map_input(input: io.BytesIO) -> memoryview:
+    """Returns a read only view over the whole of `input`. Real files are memory mapped, anything else (e.g. `io.BytesIO`)
+    falls back to its underlying buffer
+    """
+    buffer = _view_input(input)
+    if buffer is None:
+        input.seek(0)
+        buffer = memoryview(input.read())
+    return buffer
+
+
+_HEADER_PATTERN = re.compile(b"MND..\0\0\0", re.DOTALL)
+"""A file header, as found where one SYM file has been concatenated onto another. An entry could in principle start with
+the same bytes, but it would need a value of 0x??444E4D followed by a type byte and three zero bytes"""
+
+
+def _is_header(data: bytes) -> bool:
+    return _HEADER_PATTERN.fullmatch(data) is not None
+
+
+class _SequentialReader:
+    """Reads a stream front to back (e.g. a pipe, which can't seek or say where it is) in large chunks, keeping track of
+    the position for `SymbolEntry`
+
+    Args:
+        stream (io.BufferedIOBase): Binary stream to read, from wherever it currently is
+    """
+    def __init__(self, stream, chunk_size: int = 1 << 16):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.position = 0
+        self._data = bytearray()
+
+    def _fill(self, size: int) -> None:
+        while len(self._data) < size:
+            chunk = self.stream.read(max(self.chunk_size, size - len(self._data)))
+            if not chunk:
+                break
+            self._data += chunk
+
+    def peek(self, size: int) -> bytes:
+        """Up to `size` bytes from the current position, without consuming them"""
+        self._fill(size)
+        return bytes(self._data[:size])
+
+    def read(self, size: int) -> bytes:
+        self._fill(size)
+        data = bytes(self._data[:size])
+        del self._data[:size]
+        self.position += len(data)
+        return data
+
+    def tell(self) -> int:
+        return self.position
+
+
+def iter_entries(source: Union[str, os.PathLike, bytes, io.BytesIO], lazy_functions: bool = False) -> Iterator[SymbolEntry]:
+    """Yields the top level entries of a SYM file one at a time, without keeping hold of them. As there's no `SymFile`
+    behind them, symbols that refer to other types or functions can't be rendered.
+
+    SYM files concatenated together (e.g. `cat a.sym b.sym |`) are read as one: the header of each file after the first is
+    skipped, and its entries follow on from the previous file's, with `loc` still counting from the start of the input.
+
+    Args:
+        source (Union[str, os.PathLike, bytes, io.BytesIO]): Path to the file, its contents, or a binary stream. Files
+            are memory mapped where possible, other streams are read sequentially from the start (if they can seek) or
+            from wherever they are (if they can't, e.g. `sys.stdin.buffer`)
+        lazy_functions (bool): Skip over function bodies until they're accessed, see `SymFile`. Has no effect on
+            streams that can't be mapped
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            yield from iter_entries(f, lazy_functions)
+        return
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        buffer = memoryview(source)
+    else:
+        buffer = _view_input(source)
+    if buffer is not None:
+        read_header(buffer[:8])
+        offset = 8
+        end = len(buffer)
+        # Everything that looks like a header, only the ones an entry would have started at are skipped
+        headers = [match.start() for match in _HEADER_PATTERN.finditer(buffer, 8)]
+        headers.append(end)
+        next_header = headers[0]
+        i = 0
+        while offset < end:
+            if offset >= next_header:
+                if offset == next_header:
+                    offset += 8
+                while headers[i] < offset:
+                    i += 1
+                next_header = headers[i]
+                continue
+            entry, offset = SymbolEntry.from_buffer(buffer, offset, lazy_functions)
+            yield entry
+    else:
+        with contextlib.suppress(AttributeError, io.UnsupportedOperation, OSError):
+            if source.seekable():
+                source.seek(0)
+        reader = _SequentialReader(source)
+        read_header(reader.read(8))
+        while True:
+            start = reader.peek(8)
+            if not start:
+                break
+            if _is_header(start):
+                reader.read(8)
+                continue
+            yield SymbolEntry(reader)
+
+
+# The file being rendered by a `SymFile.write_files` worker, inherited from the parent when the worker is forked
+_worker_symfile: "SymFile" = None
+
+
+def _init_render_worker(symfile: "SymFile") -> None:
+    global _worker_symfile
+    _worker_symfile = symfile
+
+
+def _render_source_file(name: str) -> Tuple[List[str], List[str]]:
+    source_file = _worker_symfile.source_files[name]
+    source_file.render_file()
+    return source_file.text_lines, source_file.header_text_lines
+
+
+class SymFile:
+    """Parsed representation of a SYM file. Every entry keeps a reference to the `SymFile` it was read from, so any number
+    of files can be loaded and rendered side by side
+
+    Args:
+        input (io.BytesIO): Stream to read the file from
+        use_mmap (bool): Decode entries straight from a memory mapped view of `input` instead of reading them one by one
+            from the stream. Produces the same symbols, but is considerably faster for large files
+        lazy_functions (bool): Only decode function headers up front, bodies are decoded on first access. Implies
+            `use_mmap`
+        columnar (bool): Load the file into a `SymbolTable` rather than decoding every entry. `symbols`, `functions`,
+            `definitions` and `sourcelines` become views over the table that decode entries as they're accessed.
+            Implies `use_mmap`, and turns `render_cache` off
+        render_cache_size (int): Number of rendered symbols to keep in `render_cache`, 0 to always render from scratch
+    """
+    def __init__(self, input: io.BytesIO, use_mmap: bool = False, lazy_functions: bool = False, columnar: bool = False,
+                 render_cache_size: int = DEFAULT_RENDER_CACHE_SIZE):
         self.input = input
+        self.buffer: memoryview = None
         self.source_files: Dict[str, SourceFile] = {}
         self.object_files: Dict[str, ObjectFile] = {}
+        self.object_file_index: Dict[str, List[str]] = {}
+        """Maps a symbol name to the names of the object files it appears in, built by `index` or `map_obj_files`"""
         self.function_count = 0
+        self.table: "symdump.columns.SymbolTable" = None
+        self.render_cache = RenderCache(render_cache_size)
+        """Rendered functions and types, reused until `index`, `map_types` or `map_obj_files` changes what they'd render as"""
+        self.type_registry = TypeRegistry()
+        """Every distinct definition of each type, built by `index`. Identical definitions share a single symbol"""
+        self._name_index: NameIndex = None
 
         # Seek to start of file just in case
         self.input.seek(0)
 
         # Read header
-        self.magic, self.version, self.target = struct.unpack("<3sBB3x", self.input.read(8))
+        self.magic, self.version, self.target = read_header(self.input.read(8))
+        self.length = self.input.seek(0, io.SEEK_END)
+        self.input.seek(8)
 
-        if self.magic != b'MND':
-            raise ValueError("Magic number incorrect, expected {}, got {}".format(
-                b"MND",
-                self.magic
-            ))
         self.symbols: List[SymbolEntry] = []
         self.type_definitions: Dict[str, syms.DefinitionSymbol] = {}
-        for entry in self:
-            self.symbols.append(entry)
-        self.functions = {func.name:func for func in self.symbols if type(func.symbol) is syms.FunctionSymbol}
+        self.fake_types: Dict[str, Tuple[List[int], List[syms.DefinitionSymbol]]] = {}
+        """Every definition of each anonymous (fake) type, along with the offsets they're defined at, built by `index`. See
+        `type_definition`"""
+        self._definitions: List[SymbolEntry] = None
+        self._sourcelines: List[SymbolEntry] = None
+        if columnar:
+            # Only imported here, as it tries to import NumPy
+            from symdump.columns import EntryView, SymbolTable
+            self.buffer = map_input(self.input)
+            self.table = SymbolTable(self.buffer)
+            self.symbols = EntryView(self, self.table.select(top_level=True))
+            # Views decode a new object on every access, so identity keyed render cache entries would never be hit
+            self.render_cache = RenderCache(0)
+        elif use_mmap or lazy_functions:
+            self.buffer = map_input(self.input)
+            offset = 8
+            end = len(self.buffer)
+            # Every entry/symbol pair is a reference cycle, so the collector would otherwise keep re-scanning the
+            # ever-growing symbol list while nothing is actually garbage
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                while offset < end:
+                    entry, offset = SymbolEntry.from_buffer(self.buffer, offset, lazy_functions, self)
+                    self.symbols.append(entry)
+            finally:
+                if gc_enabled:
+                    gc.enable()
+        else:
+            for entry in self:
+                self.symbols.append(entry)
+        if self.table is not None:
+            from symdump.columns import FunctionView
+            self.functions = FunctionView(self)
+        else:
+            self.functions = {func.name:func for func in self.symbols if type(func.symbol) is syms.FunctionSymbol}
+
+    def __getstate__(self):
+        # Neither the stream nor the mapping can be pickled, see `symdump.cache`
+        state = self.__dict__.copy()
+        state["input"] = None
+        state["buffer"] = None
+        if self.table is not None:
+            raise TypeError("Columnar SymFiles are views over the mapped file and can't be pickled")
+        return state
 
     def __next__(self) -> SymbolEntry:
-        if self.input.read(1):
-            self.input.seek(-1, 1)
-            return SymbolEntry(self.input)
+        if self.input.tell() < self.length:
+            return SymbolEntry(self.input, self)
         else:
             raise StopIteration
 
@@ -53,17 +272,114 @@ class SymFile(metaclass=Singleton):
 
     @property
     def definitions(self):
-        return [entry for entry in self.symbols if type(entry.symbol) is syms.DefinitionSymbol]
+        if self.table is not None:
+            from symdump.columns import EntryView
+            return EntryView(self, self.table.select(kinds=[20], top_level=True))
+        if self._definitions is None:
+            self._definitions = [entry for entry in self.symbols if type(entry.symbol) is syms.DefinitionSymbol]
+        return self._definitions
 
     @property
     def sourcelines(self):
-        return [entry for entry in self.symbols if type(entry.symbol) is syms.SourceLineBeginSymbol or type(entry.symbol) is syms.SourceLineSymbol]
+        if self.table is not None:
+            from symdump.columns import EntryView
+            return EntryView(self, self.table.select(kinds=[0, 2, 4, 6, 8], top_level=True))
+        if self._sourcelines is None:
+            self._sourcelines = [entry for entry in self.symbols if type(entry.symbol) is syms.SourceLineBeginSymbol or type(entry.symbol) is syms.SourceLineSymbol]
+        return self._sourcelines
+
+    @property
+    def name_index(self) -> NameIndex:
+        """Index of every function, type, global, source file and symbol name, built the first time it's needed after
+        `index` has been run
+        """
+        if self._name_index is None:
+            self._name_index = NameIndex(self)
+        return self._name_index
 
     # @property
     # def functions(self):
     #     return {func.name:func for func in self.symbols if type(func.symbol) is syms.FunctionSymbol}
 
+    def index(self):
+        """Does the work of `map_types`, `map_obj_files` and `create_files` in a single pass over `symbols`, and fills in
+        `definitions` and `sourcelines` along the way. Anything those built before is replaced.
+
+        Type definitions also go through `type_registry`, so repeated copies of a type end up sharing one symbol. Unlike
+        `create_files`, nothing is printed
+        """
+        self.render_cache.clear()
+        type_registry = TypeRegistry()
+        type_definitions: Dict[str, Union[syms.DefinitionSymbol, syms.ArraySymbol]] = {}
+        fake_types: Dict[str, Tuple[List[int], List[syms.DefinitionSymbol]]] = {}
+        object_files: Dict[str, ObjectFile] = {}
+        source_files: Dict[str, SourceFile] = {}
+        definitions: List[SymbolEntry] = []
+        sourcelines: List[SymbolEntry] = []
+        curr_obj_file: ObjectFile = None
+        curr_file: SourceFile = None
+        for entry in self.symbols:
+            symbol = entry.symbol
+            symbol_type = type(symbol)
+            if symbol_type is syms.DefinitionSymbol or symbol_type is syms.ArraySymbol:
+                if symbol_type is syms.DefinitionSymbol:
+                    definitions.append(entry)
+                symbol = type_registry.add(entry)
+                if symbol.name not in type_definitions:
+                    type_definitions[symbol.name] = symbol
+                if symbol_type is syms.DefinitionSymbol and symbol.is_fake:
+                    offsets, fakes = fake_types.setdefault(symbol.name, ([], []))
+                    offsets.append(entry.loc)
+                    fakes.append(symbol)
+                if symbol.cls == 103:  # Filename
+                    type_registry.start_object_file(symbol.name)
+                    curr_obj_file = object_files.get(symbol.name)
+                    if curr_obj_file is None:
+                        curr_obj_file = object_files[symbol.name] = ObjectFile(symbol.name)
+                    if curr_file is not None:
+                        curr_file.add_symbol(entry)
+                    continue
+            elif symbol_type is syms.SourceLineBeginSymbol or symbol_type is syms.FunctionSymbol:
+                if symbol_type is syms.SourceLineBeginSymbol:
+                    sourcelines.append(entry)
+                if symbol.file is not None and symbol.file not in source_files:
+                    curr_file = source_files[symbol.file] = SourceFile(symbol.file)
+                    curr_file.set_line(symbol.line[0])
+            elif symbol_type is syms.SourceLineSymbol:
+                sourcelines.append(entry)
+            if curr_obj_file is not None:
+                curr_obj_file.children.append(entry)
+                curr_obj_file.children_names.append(getattr(symbol, "name", None))
+            if curr_file is not None and symbol is not None and symbol_type is not syms.SourceLineBeginSymbol:
+                curr_file.add_symbol(entry)
+        object_file_index: Dict[str, List[str]] = {}
+        for obj_name, obj in object_files.items():
+            for name in dict.fromkeys(obj.children_names):
+                object_file_index.setdefault(name, []).append(obj_name)
+        self.type_definitions = type_definitions
+        self.fake_types = fake_types
+        self.type_registry = type_registry
+        self._name_index = None
+        self.object_files = object_files
+        self.object_file_index = object_file_index
+        self.source_files = source_files
+        if self.table is None:
+            self._definitions = definitions
+            self._sourcelines = sourcelines
+
+    def type_definition(self, tag: str, loc: int) -> TypeDefinition:
+        """The type a symbol at offset `loc` refers to by `tag`. Anonymous (fake) types are numbered per object file, so
+        for those it's the closest definition before `loc` (once `index` has been run), anything else comes from
+        `type_definitions`
+        """
+        scope = self.fake_types.get(tag)
+        if scope is None:
+            return self.type_definitions[tag]
+        offsets, fakes = scope
+        return fakes[max(bisect.bisect_right(offsets, loc) - 1, 0)]
+
     def map_types(self):
+        self.render_cache.clear()
         type_defs = [x.symbol for x in self.symbols if type(x.symbol) in [syms.DefinitionSymbol, syms.ArraySymbol]]
         for item in type_defs:
             if self.type_definitions.get(item.name) is not None:
@@ -72,6 +388,7 @@ class SymFile(metaclass=Singleton):
                 self.type_definitions[item.name] = item
 
     def map_obj_files(self):
+        self.render_cache.clear()
         curr_obj_file = ""
         for entry in self.symbols:
             if entry.symbol is not None and type(entry.symbol) in [syms.ArraySymbol, syms.DefinitionSymbol] and entry.symbol.cls_name == "Filename":
@@ -82,7 +399,16 @@ class SymFile(metaclass=Singleton):
                 if curr_obj_file != "":
                     self.object_files[curr_obj_file].children.append(entry)
                     self.object_files[curr_obj_file].children_names.append(entry.name)
+        self.object_file_index = {}
+        for obj_name, obj in self.object_files.items():
+            for name in dict.fromkeys(obj.children_names):
+                self.object_file_index.setdefault(name, []).append(obj_name)
 
+    def object_files_containing(self, name: str) -> List[str]:
+        """Names of the object files a symbol called `name` appears in, in the order the object files were defined.
+        Empty until `index` or `map_obj_files` has been run
+        """
+        return self.object_file_index.get(name, [])
 
 
 
@@ -107,3 +433,52 @@ class SymFile(metaclass=Singleton):
                 if curr_file is not None:
                     self.source_files[curr_file].add_symbol(entry)
 
+    def render_files(self, workers: Union[int, None] = 1):
+        """Renders every source file created by `index` or `create_files` into its `text_lines` and `header_text_lines`,
+        skipping any that already have been.
+
+        Args:
+            workers (Union[int, None]): Number of processes to render with, None for one per CPU. Rendering is only spread
+                out where processes can be forked, as the workers need to inherit this file rather than have it pickled.
+                The text is identical to rendering the files one at a time
+        """
+        # Only imported here, they add a noticeable amount to the start up time of anything importing symdump
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        names = [name for name, source_file in self.source_files.items() if not source_file.lines_written]
+        workers = os.cpu_count() if workers is None else workers
+        if workers > 1 and len(names) > 1 and "fork" in multiprocessing.get_all_start_methods():
+            # Keep the collector from touching, and so copying, every page of the inherited objects in each worker
+            gc.freeze()
+            try:
+                with ProcessPoolExecutor(max_workers=min(workers, len(names)), mp_context=multiprocessing.get_context("fork"),
+                                         initializer=_init_render_worker, initargs=(self,)) as executor:
+                    chunksize = max(1, len(names) // (workers * 4))
+                    for name, (text_lines, header_text_lines) in zip(names, executor.map(_render_source_file, names, chunksize=chunksize)):
+                        source_file = self.source_files[name]
+                        source_file.text_lines = text_lines
+                        source_file.header_text_lines = header_text_lines
+                        source_file.lines_written = True
+            finally:
+                gc.unfreeze()
+        else:
+            for name in names:
+                self.source_files[name].render_file()
+
+    def write_files(self, output_dir: str = "output", workers: Union[int, None] = 1, sink: OutputSink = None):
+        """Renders and writes out every source file created by `index` or `create_files`.
+
+        Args:
+            output_dir (str): Directory to write the files to, if `sink` isn't given
+            workers (Union[int, None]): Number of processes to render with, see `render_files`. With a single worker,
+                files are streamed straight to the sink rather than rendered first. Files are always written in the
+                same order
+            sink (OutputSink): Where to write the files instead, e.g. an archive (see `symdump.output`). Left open, so
+                more can be written to it
+        """
+        if workers is None or workers > 1:
+            self.render_files(workers)
+        with contextlib.nullcontext(sink) if sink is not None else DirectorySink(output_dir) as sink:
+            for source_file in self.source_files.values():
+                source_file.write_to(sink)
@@ -0,0 +1,82 @@
+"""
+Builds small SYM files in memory for the tests
+"""
+import io
+import struct
+from typing import List
+
+from symdump.symfile import SymFile
+
+HEADER = b"MND\x01\x00\x00\x00\x00"
+"""Magic, version and unit of a SYM file"""
+
+
+def string(text: str) -> bytes:
+    data = text.encode()
+    return bytes([len(data)]) + data
+
+
+def entry(value: int, kind: int, payload: bytes = b"") -> bytes:
+    return struct.pack("<IB", value, kind | 0x80) + payload
+
+
+def definition(value: int, cls: int, type_word: int, size: int, name: str, children: List[bytes] = None) -> bytes:
+    """A definition (kind 20), with `children` as its members followed by the closing .eos"""
+    data = entry(value, 20, struct.pack("<hHi", cls, type_word, size) + string(name))
+    if children is not None:
+        data += b"".join(children) + definition(0, 102, 0, 0, ".eos")
+    return data
+
+
+def array(value: int, cls: int, type_word: int, size: int, dims: List[int], tag: str, name: str) -> bytes:
+    """A definition with dimensions and a tag (kind 22)"""
+    return entry(value, 22, struct.pack("<hHih", cls, type_word, size, len(dims))
+                 + b"".join(struct.pack("<I", x) for x in dims) + string(tag) + string(name))
+
+
+def filename(object_file: str) -> bytes:
+    return definition(0, 103, 0, 0, object_file)
+
+
+def source_file(address: int, path: str, line: int = 1) -> bytes:
+    """Start of the lines of the source file `path` (kind 8), which everything after it goes in"""
+    return entry(address, 8, struct.pack("<I", line) + string(path))
+
+
+def function(address: int, name: str, path: str, line: int, body: List[bytes], end_address: int, end_line: int) -> bytes:
+    """A function (kind 12) starting at `address` on `line` of `path`, holding the entries of `body` and ended by a
+    function end (kind 14) at `end_address`
+    """
+    return (entry(address, 12, struct.pack("<hihIii", 29, 0, 31, 0, 0, line) + string(path) + string(name))
+            + b"".join(body) + entry(end_address, 14) + struct.pack("<i", end_line))
+
+
+def block(address: int, line: int) -> bytes:
+    """Start of a block in a function body (kind 16)"""
+    return entry(address, 16, struct.pack("<I", line))
+
+
+def block_end(address: int, line: int) -> bytes:
+    return entry(address, 18, struct.pack("<I", line))
+
+
+def line_set(address: int, line: int) -> bytes:
+    """Moves on to `line` at `address` (kind 6, sl_set)"""
+    return entry(address, 6, struct.pack("<I", line))
+
+
+def line_inc(address: int) -> bytes:
+    """Moves on to the next line at `address` (kind 0, sl_inc)"""
+    return entry(address, 0)
+
+
+def sym(*entries: bytes) -> bytes:
+    """A whole SYM file holding `entries`"""
+    return HEADER + b"".join(entries)
+
+
+def load(*entries: bytes) -> SymFile:
+    """Indexed `SymFile` of a SYM holding `entries`"""
+    symfile = SymFile(io.BytesIO(sym(*entries)))
+    symfile.index()
+    return symfile
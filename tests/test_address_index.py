@@ -0,0 +1,64 @@
+import struct
+
+import pytest
+
+from symdump import address_index
+from symdump.address_index import AddressIndex, Location
+from symdump.tests.symdata import entry, filename, function, line_inc, line_set, load, source_file
+
+MAIN = 0x80010000
+UPDATE = 0x80010100
+
+
+def _line_add(address: int, lines: int, size: int) -> bytes:
+    # sl_add1 (kind 2) or sl_add2 (kind 4)
+    return entry(address, 2 if size == 1 else 4, struct.pack("<B" if size == 1 else "<H", lines))
+
+
+def _game():
+    return load(
+        filename("main.o"),
+        source_file(MAIN - 0x10, "C:\\SRC\\MAIN.C", 1),
+        function(MAIN, "main", "C:\\SRC\\MAIN.C", 10, [
+            line_inc(MAIN + 4),  # 11
+            _line_add(MAIN + 8, 5, 1),  # 16
+            _line_add(MAIN + 0xC, 300, 2),  # 316
+            line_set(MAIN + 0x10, 40),
+        ], MAIN + 0x20, 42),
+        filename("update.o"),
+        function(UPDATE, "update", "C:\\SRC\\UPDATE.C", 7, [line_inc(UPDATE + 4)], UPDATE + 0x10, 9),
+    )
+
+
+@pytest.fixture(params=["numpy", "bisect"])
+def index(request, monkeypatch):
+    if request.param == "numpy" and address_index.np is None:
+        pytest.skip("needs NumPy")
+    if request.param == "bisect":
+        monkeypatch.setattr(address_index, "np", None)
+    return AddressIndex(_game())
+
+
+def test_functions_and_lines(index):
+    main_c, update_c = "C:\\SRC\\MAIN.C", "C:\\SRC\\UPDATE.C"
+    assert index.lookup_many([MAIN, MAIN + 4, MAIN + 8, MAIN + 0xE, MAIN + 0x14, MAIN + 0x20]) == [
+        Location(MAIN, "main", 0, main_c, 10),
+        Location(MAIN + 4, "main", 4, main_c, 11),
+        Location(MAIN + 8, "main", 8, main_c, 16),
+        Location(MAIN + 0xE, "main", 0xE, main_c, 316),
+        Location(MAIN + 0x14, "main", 0x14, main_c, 40),
+        Location(MAIN + 0x20, "main", 0x20, main_c, 42),
+    ]
+    assert index.lookup(UPDATE + 6) == Location(UPDATE + 6, "update", 6, update_c, 8)
+
+
+def test_addresses_outside_functions(index):
+    # Between functions, before the first and after the last
+    for address in (MAIN + 0x40, MAIN - 4, UPDATE + 0x14, 0):
+        assert index.lookup(address) == Location(address, None, None, None, None)
+
+
+def test_batch_matches_single_lookups(index):
+    addresses = list(range(MAIN - 8, UPDATE + 0x18, 2))
+    assert index.lookup_many(addresses) == [index.lookup(x) for x in addresses]
+    assert list(index.function_indices([MAIN + 2, UPDATE, UPDATE + 0x40])) == [0, 1, -1]
@@ -0,0 +1,43 @@
+import os
+
+from symdump import batch
+from symdump.tests.symdata import filename, function, source_file, sym
+
+MAIN = 0x80010000
+_dump_file = batch.dump_file
+
+
+def _dump_or_crash(path: str, output_dir: str) -> batch.DumpResult:
+    # Kills the worker outright, the way running out of memory would, rather than raising
+    if os.path.basename(path).startswith("crash"):
+        os._exit(1)
+    return _dump_file(path, output_dir)
+
+
+def _game(tmp_path, name: str) -> str:
+    path = tmp_path / name
+    path.write_bytes(sym(filename("main.o"), source_file(MAIN, "C:\\SRC\\MAIN.C"),
+                         function(MAIN, "main", "C:\\SRC\\MAIN.C", 10, [], MAIN + 0x20, 12)))
+    return str(path)
+
+
+def test_corrupt_file_fails_alone(tmp_path):
+    paths = [_game(tmp_path, "a.sym"), str(tmp_path / "bad.sym"), _game(tmp_path, "c.sym")]
+    (tmp_path / "bad.sym").write_bytes(b"not a sym file")
+    results = batch.dump_batch(paths, str(tmp_path / "output"), workers=2)
+    assert [x.path for x in results] == paths
+    assert [x.error is None for x in results] == [True, False, True]
+    assert "ValueError" in results[1].error
+    assert results[0].source_files == 1
+    assert os.path.isfile(tmp_path / "output" / "a" / "SRC" / "MAIN.C")
+
+
+def test_crashed_worker_only_fails_its_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "dump_file", _dump_or_crash)
+    paths = [_game(tmp_path, name) for name in ("a.sym", "crash.sym", "c.sym", "d.sym", "e.sym")]
+    results = batch.dump_batch(paths, str(tmp_path / "output"), workers=2)
+    assert [x.path for x in results] == paths
+    assert [x.error is None for x in results] == [True, False, True, True, True]
+    assert results[1].error.startswith("BrokenProcessPool")
+    for name in ("a", "c", "d", "e"):
+        assert os.path.isfile(tmp_path / "output" / name / "SRC" / "MAIN.C")
@@ -0,0 +1,44 @@
+import operator
+import os
+import pickle
+import zlib
+
+import pytest
+
+from symdump.cache import _CACHE_SUFFIX, cache_key, load_symfile
+from symdump.symbols import type_descriptor
+from symdump.tests.symdata import definition, filename, sym
+
+STRUCT = 8
+INT = 4
+
+
+class _Restores:
+    """Pickles to a call that fails when it's unpickled, like a payload from a different layout of the classes"""
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+
+    def __reduce__(self):
+        return self.func, self.args
+
+
+@pytest.mark.parametrize("payload", [
+    _Restores(type_descriptor, ()),  # TypeError
+    _Restores(operator.getitem, ({}, "missing")),  # KeyError
+    _Restores(getattr, (object(), "missing")),  # AttributeError
+])
+def test_unloadable_cache_entry_is_a_miss(tmp_path, payload):
+    data = sym(filename("a.o"), definition(0, 10, STRUCT, 4, "Foo", [definition(0, 8, INT, 4, "x")]))
+    path = tmp_path / "a.sym"
+    path.write_bytes(data)
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    cache_path = cache_dir / (cache_key(memoryview(data)) + _CACHE_SUFFIX)
+    cache_path.write_bytes(zlib.compress(pickle.dumps(payload)))
+
+    symfile = load_symfile(str(path), str(cache_dir))
+    assert "Foo" in symfile.type_definitions
+    # Replaced by a good entry, which loads
+    assert load_symfile(str(path), str(cache_dir)).type_definitions.keys() == symfile.type_definitions.keys()
+    assert os.path.getsize(cache_path) > 0
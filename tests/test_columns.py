@@ -0,0 +1,74 @@
+import io
+
+import pytest
+
+from symdump import columns
+from symdump.symfile import SymFile
+from symdump.tests.symdata import (array, block, block_end, definition, filename, function, line_inc, line_set, source_file,
+                                   sym)
+
+INT = 4
+STRUCT = 8
+FUNCTION = 2 << 4
+MAIN = 0x80010000
+UPDATE = 0x80010100
+
+
+def _data() -> bytes:
+    return sym(
+        filename("main.o"),
+        definition(0, 10, STRUCT, 8, "Foo", [definition(0, 8, INT, 4, "x"), array(4, 8, INT, 4, [], "", "y")]),
+        source_file(MAIN, "C:\\SRC\\MAIN.C"),
+        function(MAIN, "main", "C:\\SRC\\MAIN.C", 10, [
+            line_inc(MAIN + 4), block(MAIN + 4, 11), definition(16, 1, INT, 4, "count"), block_end(MAIN + 8, 12),
+        ], MAIN + 0x20, 14),
+        definition(MAIN, 2, INT | FUNCTION, 0, "main"),
+        filename("update.o"),
+        line_set(UPDATE, 3),
+        function(UPDATE, "update", "C:\\SRC\\UPDATE.C", 7, [], UPDATE + 0x10, 9),
+        definition(0x80020000, 2, INT, 4, "g_counter"),
+    )
+
+
+@pytest.fixture(params=["numpy", "loops"])
+def table(request, monkeypatch):
+    if request.param == "numpy" and columns.np is None:
+        pytest.skip("needs NumPy")
+    if request.param == "loops":
+        monkeypatch.setattr(columns, "np", None)
+    return columns.SymbolTable(memoryview(_data()))
+
+
+def _names(table, **filters):
+    return table.names(table.select(**filters))
+
+
+def test_rows_and_columns(table):
+    assert table.object_files == ["main.o", "update.o"]
+    functions = list(table.select(kinds=[12]))
+    assert table.names(functions) == ["main", "update"]
+    # Function sizes come from their end entries, members and locals point at what they're nested in
+    assert [int(table.size[row]) for row in functions] == [0x20, 0x10]
+    foo = int(table.select(classes=["Struct"])[0])
+    assert [int(x) for x in table.select(top_level=False, classes=["StructMember"])] == [foo + 1, foo + 2]
+    assert table.names(x for x in range(len(table)) if table.parent[x] == functions[0]) == [None, None, "count", None, None]
+
+
+def test_select_filters(table):
+    assert _names(table, kinds=[20], top_level=True, object_file="main.o") == ["main.o", "Foo", "main"]
+    assert _names(table, kinds=[20, 22], object_file="update.o") == ["update.o", "g_counter"]
+    assert _names(table, classes=[2]) == ["main", "g_counter"]
+    assert _names(table, kinds=[12], address_range=(UPDATE, UPDATE + 1)) == ["update"]
+    assert _names(table, classes=["Struct"], object_file="missing.o") == []
+    assert len(table.select()) == len(table)
+
+
+def test_views_match_decoded_file():
+    decoded = SymFile(io.BytesIO(_data()))
+    view = SymFile(io.BytesIO(_data()), columnar=True)
+    for name in ("symbols", "definitions", "sourcelines"):
+        assert [(x.loc, x.value, x.type, x.name) for x in getattr(view, name)] == \
+               [(x.loc, x.value, x.type, x.name) for x in getattr(decoded, name)]
+    assert list(view.functions) == list(decoded.functions)
+    assert str(view.functions["main"].symbol.children[2].symbol) == str(decoded.functions["main"].symbol.children[2].symbol)
+    assert view.render_cache.maxsize == 0
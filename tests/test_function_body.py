@@ -0,0 +1,80 @@
+import io
+
+from symdump.symfile import SymFile
+from symdump.tests.symdata import block, block_end, definition, filename, function, line_inc, load, source_file, sym
+
+INT = 4
+FUNCTION = 2 << 4
+MAIN = 0x80010000
+
+
+def _main() -> list:
+    return [
+        filename("main.o"),
+        source_file(MAIN, "C:\\SRC\\MAIN.C"),
+        function(MAIN, "main", "C:\\SRC\\MAIN.C", 10, [
+            definition(4, 17, INT, 4, "argc"),
+            definition(8, 9, INT, 4, "argv"),
+            block(MAIN + 4, 11),
+            definition(16, 1, INT, 4, "i"),
+            block(MAIN + 8, 12),
+            definition(17, 1, INT, 4, "j"),
+            line_inc(MAIN + 0xC),
+            block_end(MAIN + 0x10, 14),
+            block_end(MAIN + 0x14, 15),
+            block(MAIN + 0x18, 16),
+            definition(18, 1, INT, 4, "k"),
+            block_end(MAIN + 0x1C, 17),
+        ], MAIN + 0x20, 18),
+        definition(MAIN, 2, INT | FUNCTION, 0, "main"),
+    ]
+
+
+def test_block_tree():
+    main = load(*_main()).functions["main"].symbol
+    assert [x.name for x in main.args] == ["argc", "argv"]
+    body = main.body
+    assert body.locals == [] and len(body.blocks) == 2
+    outer, last = body.blocks
+    assert (outer.line, outer.offset, outer.end_line, outer.end_offset) == (11, MAIN + 4, 15, MAIN + 0x14)
+    assert [x.name for x in outer.locals] == ["i"]
+    inner, = outer.blocks
+    assert [x.name for x in inner.locals] == ["j"] and inner.end_line == 14
+    assert [x.name for x in last.locals] == ["k"]
+    assert [block.line for block in body.walk()] == [10, 11, 12, 16]
+
+
+def test_unmatched_block_end_is_kept():
+    main = load(filename("main.o"), function(MAIN, "main", "C:\\SRC\\MAIN.C", 10, [
+        definition(16, 1, INT, 4, "i"), block_end(MAIN + 4, 11),
+    ], MAIN + 8, 12), definition(MAIN, 2, INT | FUNCTION, 0, "main")).functions["main"].symbol
+    assert [type(x.symbol).__name__ for x in main.body.items] == ["DefinitionSymbol", "BlockEndSymbol", "NoneType"]
+    assert main.body.blocks == []
+
+
+def test_rendering():
+    # The same text the function rendered as before its body was built into a block tree
+    main = load(*_main()).functions["main"].symbol
+    assert str(main) == (
+        "int main(int argc\t/* $a0 */, int argv\t/* $t0 */) {\n"
+        "\t{ /* line 11, offset 0x80010004 */ \n"
+        "\t\tint i;\t/* $s0 */\n"
+        "\t\t{ /* line 12, offset 0x80010008 */ \n"
+        "\t\t\tint j;\t/* $s1 */\n"
+        "\t\t\t<SourceLine[sl_inc](1)>\n"
+        "\t\t} /* line 14, offset 0x80010010 */ \n"
+        "\t} /* line 15, offset 0x80010014 */ \n"
+        "\t{ /* line 16, offset 0x80010018 */ \n"
+        "\t\tint k;\t/* $s2 */\n"
+        "\t} /* line 17, offset 0x8001001C */ \n"
+        "\n"
+        "} /* found in: ['main.o'] */"
+    )
+
+
+def test_lazy_bodies_match():
+    eager = load(*_main())
+    lazy = SymFile(io.BytesIO(sym(*_main())), lazy_functions=True)
+    lazy.index()
+    assert lazy.functions["main"].symbol._children is None
+    assert str(lazy.functions["main"].symbol) == str(eager.functions["main"].symbol)
@@ -0,0 +1,45 @@
+import io
+
+import pytest
+
+from symdump.symfile import iter_entries
+from symdump.tests.symdata import definition, filename, source_file, sym
+
+STRUCT = 8
+INT = 4
+
+FIRST = sym(filename("a.o"), source_file(0x80010000, "C:\\SRC\\A.C"),
+            definition(0, 10, STRUCT, 4, "Foo", [definition(0, 8, INT, 4, "x")]))
+SECOND = sym(filename("b.o"), definition(0, 13, INT, 4, "Bar"))
+
+
+class _Pipe(io.RawIOBase):
+    """Stream that can only be read front to back, like a pipe"""
+    def __init__(self, data: bytes):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        # Hand out a few bytes at a time, so reads have to be stitched together
+        data = self._data.read(min(len(buffer), 3))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _summary(entries):
+    return [(entry.loc, entry.value, entry.type, getattr(entry.symbol, "name", None)) for entry in entries]
+
+
+def test_concatenated_files_are_read_as_one():
+    entries = _summary(iter_entries(FIRST + SECOND))
+    assert [name for *_, name in entries] == ["a.o", None, "Foo", "b.o", "Bar"]
+    assert entries[3][0] == len(FIRST) + 8
+
+
+def test_non_seekable_stream_matches_buffer():
+    expected = _summary(iter_entries(FIRST + SECOND))
+    with pytest.raises(OSError):
+        _Pipe(b"").tell()
+    assert _summary(iter_entries(io.BufferedReader(_Pipe(FIRST + SECOND)))) == expected
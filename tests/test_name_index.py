@@ -0,0 +1,66 @@
+import itertools
+
+from symdump.name_index import ANY, FUNCTION, GLOBAL, SOURCE_FILE, SYMBOL, TYPE, NameIndex
+from symdump.tests.symdata import array, definition, filename, function, load, source_file
+
+INT = 4
+STRUCT = 8
+FUNCTION_TYPE = 2 << 4
+MAIN = 0x80010000
+
+
+def _index() -> NameIndex:
+    return load(
+        filename("main.o"),
+        definition(0, 10, STRUCT, 4, ".0fake", [definition(0, 8, INT, 4, "x")]),
+        definition(0, 10, STRUCT, 4, "PlayerState", [definition(0, 8, INT, 4, "health")]),
+        array(0, 13, STRUCT, 4, [], "PlayerState", "PlayerStateT"),
+        source_file(MAIN, "C:\\SRC\\PLAYER.C"),
+        function(MAIN, "Player_Update", "C:\\SRC\\PLAYER.C", 10, [], MAIN + 0x20, 12),
+        function(MAIN + 0x20, "Player_Draw", "C:\\SRC\\PLAYER.C", 20, [], MAIN + 0x40, 22),
+        definition(MAIN, 2, INT | FUNCTION_TYPE, 0, "Player_Update"),
+        definition(0x80020000, 2, INT, 4, "g_playerCount"),
+        definition(0x80020004, 3, INT, 4, "s_layer"),
+    ).name_index
+
+
+def test_kinds():
+    index = _index()
+    assert index.kind("Player_Update") == FUNCTION | SYMBOL
+    assert index.kind("PlayerState") == TYPE | SYMBOL
+    assert index.kind("g_playerCount") == GLOBAL | SYMBOL
+    assert index.kind("s_layer") == GLOBAL | SYMBOL
+    assert index.kind("C:\\SRC\\PLAYER.C") == SOURCE_FILE
+    assert index.kind(".0fake") == SYMBOL
+    assert index.kind("missing") == 0
+    assert "PlayerStateT" in index and "Player" not in index
+    assert index.symbols["PlayerState"].symbol.cls == 10
+
+
+def test_prefix():
+    index = _index()
+    assert index.prefix("Player") == ["PlayerState", "PlayerStateT", "Player_Draw", "Player_Update"]
+    assert index.prefix("Player", FUNCTION) == ["Player_Draw", "Player_Update"]
+    assert index.prefix("Player", TYPE, limit=1) == ["PlayerState"]
+    assert index.prefix("Q") == []
+
+
+def test_search():
+    index = _index()
+    assert index.search("ayer") == ["PlayerState", "PlayerStateT", "Player_Draw", "Player_Update", "g_playerCount",
+                                    "s_layer"]
+    assert index.search("layer", GLOBAL) == ["g_playerCount", "s_layer"]
+    assert index.search("ay", FUNCTION, limit=1) == ["Player_Draw"]
+    assert index.search("PLAYER", SOURCE_FILE) == ["C:\\SRC\\PLAYER.C"]
+    assert index.search("zzz") == [] and index.search("Playerz") == []
+
+
+def test_search_matches_a_scan():
+    # Every substring of every name, through both the trigram lookup and the short query scan
+    index = _index()
+    for name in index.names:
+        for start, end in itertools.combinations(range(len(name) + 1), 2):
+            text = name[start:end]
+            assert index.search(text) == [x for x in index.names if text in x]
+    for kinds in (FUNCTION, TYPE, GLOBAL, SOURCE_FILE, SYMBOL, ANY):
+        assert index.search("a", kinds) == [x for x in index.names if "a" in x and index.kind(x) & kinds]
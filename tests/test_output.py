@@ -0,0 +1,51 @@
+import contextlib
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from symdump.output import OutputSink, StreamSink, TarSink, ZipSink, open_sink
+
+FILES = {"SRC/A.C": "int a;\n", "SRC/SUB/B.H": "int b;\n"}
+
+
+def _write(sink: OutputSink) -> None:
+    with sink:
+        for path, text in FILES.items():
+            with sink.open(path) as f:
+                f.write(text)
+
+
+def test_incomplete_sink_fails_when_created():
+    class NoOpen(OutputSink):
+        pass
+    with pytest.raises(TypeError):
+        NoOpen()
+
+
+def test_stream_sink_uses_stdout_at_creation():
+    stdout = io.StringIO()
+    with contextlib.redirect_stdout(stdout):
+        _write(StreamSink())
+    assert "/* ==> SRC/SUB/B.H <== */\nint b;\n" in stdout.getvalue()
+
+
+def test_directory_layout_is_kept(tmp_path):
+    _write(open_sink(str(tmp_path / "output")))
+    for path, text in FILES.items():
+        assert (tmp_path / "output" / path).read_text() == text
+
+
+def test_tar_keeps_layout(tmp_path):
+    _write(TarSink(str(tmp_path / "output.tar.gz"), "gz"))
+    with tarfile.open(tmp_path / "output.tar.gz") as tar:
+        assert tar.getnames() == ["SRC", "SRC/A.C", "SRC/SUB", "SRC/SUB/B.H"]
+        assert {path: tar.extractfile(path).read().decode() for path in FILES} == FILES
+
+
+def test_zip_keeps_layout(tmp_path):
+    _write(ZipSink(str(tmp_path / "output.zip")))
+    with zipfile.ZipFile(tmp_path / "output.zip") as archive:
+        assert archive.namelist() == ["SRC/", "SRC/A.C", "SRC/SUB/", "SRC/SUB/B.H"]
+        assert {path: archive.read(path).decode() for path in FILES} == FILES
@@ -0,0 +1,71 @@
+import io
+import pickle
+
+from symdump.render_cache import RenderCache
+from symdump.symfile import SymFile
+from symdump.tests.symdata import definition, filename, load, sym
+
+INT = 4
+STRUCT = 8
+
+
+class _Symbol:
+    pass
+
+
+def test_least_recently_used_are_evicted():
+    cache = RenderCache(2)
+    a, b, c = _Symbol(), _Symbol(), _Symbol()
+    cache.put(a, "__str__", "a")
+    cache.put(b, "__str__", "b")
+    assert cache.get(a, "__str__") == "a"
+    cache.put(c, "__str__", "c")
+    assert cache.get(b, "__str__") is None
+    assert (cache.get(a, "__str__"), cache.get(c, "__str__")) == ("a", "c")
+    assert (cache.hits, cache.misses, len(cache)) == (3, 1, 2)
+
+
+def test_options_are_cached_apart():
+    cache = RenderCache()
+    symbol = _Symbol()
+    cache.put(symbol, "__str__", "int x;")
+    assert cache.get(symbol, "param_str") is None
+    assert cache.get(symbol, "__str__") == "int x;"
+
+
+def test_disabled_clear_and_pickle():
+    disabled = RenderCache(0)
+    disabled.put(_Symbol(), "__str__", "text")
+    assert len(disabled) == 0
+    cache = RenderCache(8)
+    symbol = _Symbol()
+    cache.put(symbol, "__str__", "text")
+    cache.get(symbol, "__str__")
+    cache.clear()
+    assert (len(cache), cache.hits) == (0, 1)
+    cache.put(symbol, "__str__", "text")
+    restored = pickle.loads(pickle.dumps(cache))
+    assert (restored.maxsize, len(restored), restored.hits) == (8, 0, 0)
+
+
+def _foo() -> bytes:
+    return definition(0, 10, STRUCT, 4, "Foo", [definition(0, 8, INT, 4, "x")])
+
+
+def test_symbols_render_through_the_cache():
+    symfile = load(filename("a.o"), _foo())
+    foo = symfile.type_definitions["Foo"]
+    text = str(foo)
+    misses = symfile.render_cache.misses
+    assert str(foo) == text
+    assert symfile.render_cache.hits == 1 and symfile.render_cache.misses == misses
+    # Indexing again can change what types render as, so the cache starts over
+    symfile.index()
+    assert len(symfile.render_cache) == 0
+
+
+def test_uncached_rendering_is_the_same():
+    uncached = SymFile(io.BytesIO(sym(filename("a.o"), _foo())), render_cache_size=0)
+    uncached.index()
+    assert str(uncached.type_definitions["Foo"]) == str(load(filename("a.o"), _foo()).type_definitions["Foo"])
+    assert (len(uncached.render_cache), uncached.render_cache.hits) == (0, 0)
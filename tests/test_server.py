@@ -0,0 +1,144 @@
+import asyncio
+import json
+import socket
+import threading
+
+import pytest
+
+from symdump.server import QueryError, SymbolClient, SymbolServer, main, remove_socket
+from symdump.tests.symdata import definition, filename, function, line_inc, load, source_file, sym
+
+INT = 4
+STRUCT = 8
+FUNCTION = 2 << 4
+MAIN = 0x80010000
+
+
+def _game(struct_member: str = "x"):
+    return load(
+        filename("main.o"),
+        source_file(MAIN, "C:\\SRC\\MAIN.C"),
+        function(MAIN, "main", "C:\\SRC\\MAIN.C", 10, [line_inc(MAIN + 8)], MAIN + 0x20, 12),
+        definition(MAIN, 2, INT | FUNCTION, 0, "main"),
+        definition(0x80020000, 2, INT, 4, "g_counter"),
+        definition(0, 10, STRUCT, 4, "Foo", [definition(0, 8, INT, 4, struct_member)]),
+    )
+
+
+@pytest.fixture
+def server():
+    return SymbolServer({"game.sym": _game()})
+
+
+def _result(server: SymbolServer, **request):
+    response = server.handle(request)
+    assert response["ok"], response
+    return response["result"]
+
+
+def _error(server: SymbolServer, **request) -> str:
+    response = server.handle(request)
+    assert not response["ok"]
+    return response["error"]
+
+
+def test_function(server):
+    result = _result(server, op="function", name="main")
+    assert (result["address"], result["end_address"], result["line"]) == (MAIN, MAIN + 0x20, 10)
+    assert result["source"].startswith("int main() {")
+    assert "No function called 'missing'" in _error(server, op="function", name="missing")
+    assert _error(server, op="function") == "'name' is missing"
+
+
+def test_symbolize(server):
+    result = _result(server, op="symbolize", addresses=[MAIN, hex(MAIN + 8), MAIN + 0x100])
+    assert [(x["function"], x["offset"], x["line"]) for x in result] == [("main", 0, 10), ("main", 8, 11), (None, None, None)]
+    assert "'addresses'" in _error(server, op="symbolize", addresses=["main"])
+
+
+def test_type(server):
+    result = _result(server, op="type", name="Foo")
+    assert result["source"].startswith("struct Foo {")
+    assert result["other_definitions"] == []
+    assert "No type called 'Bar'" in _error(server, op="type", name="Bar")
+
+
+def test_search(server):
+    assert _result(server, op="search", text="o", kind="global") == ["g_counter"]
+    assert _result(server, op="search", text="ma", prefix=True) == ["main", "main.o"]
+    assert len(_result(server, op="search", text="o", limit=1)) == 1
+    assert _result(server, op="search", text="o", limit=0) == []
+
+
+@pytest.mark.parametrize("request_args, message", [
+    ({"text": "o", "limit": -1}, "'limit' has to be a non-negative integer"),
+    ({"text": "o", "limit": "5"}, "'limit' has to be a non-negative integer"),
+    ({"text": "o", "limit": 1.5}, "'limit' has to be a non-negative integer"),
+    ({"text": "o", "limit": True}, "'limit' has to be a non-negative integer"),
+    ({"text": "o", "kind": "struct"}, "'kind' has to be one of"),
+    ({"text": "o", "kind": ["function"]}, "'kind' has to be one of"),
+    ({"text": 5}, "'text' has to be a string"),
+    ({}, "'text' is missing"),
+])
+def test_bad_search(server, request_args, message):
+    assert _error(server, op="search", **request_args).startswith(message)
+
+
+def test_bad_requests(server):
+    assert _error(server, op="delete").startswith("'op' has to be one of")
+    assert _error(server, op="type", name="Foo", file="other.sym").startswith("No file called 'other.sym'")
+    response = json.loads(server.handle_line(b'{"op": "files"'))
+    assert not response["ok"] and response["error"].startswith("Invalid JSON")
+    assert json.loads(server.handle_line(b'["files"]'))["error"].startswith("'op' has to be one of")
+    ops = _result(server, op="stats")["ops"]
+    assert ops["invalid"]["errors"] == 3
+    assert ops["type"] == {**ops["type"], "count": 1, "errors": 1}
+
+
+def test_files_are_told_apart(tmp_path):
+    server = SymbolServer({"a/game.sym": _game("x"), "b/game.sym": _game("y")})
+    assert [x["name"] for x in _result(server, op="files")] == ["a/game.sym", "b/game.sym"]
+    assert "'file' is needed" in _error(server, op="type", name="Foo")
+    assert "int y;" in _result(server, op="type", name="Foo", file="b/game.sym")["source"]
+
+
+def test_remove_socket_leaves_other_files(tmp_path):
+    path = tmp_path / "server.sock"
+    path.write_text("not a socket")
+    with pytest.raises(FileExistsError):
+        remove_socket(str(path))
+    assert path.read_text() == "not a socket"
+    remove_socket(str(tmp_path / "missing.sock"))
+
+
+def test_main_refuses_to_replace_a_file(tmp_path):
+    (tmp_path / "game.sym").write_bytes(sym())
+    path = tmp_path / "notes.txt"
+    path.write_text("notes")
+    with pytest.raises(SystemExit):
+        main([str(tmp_path / "game.sym"), "--socket", str(path)])
+    assert path.read_text() == "notes"
+
+
+def test_serve_unix(tmp_path, server):
+    path = str(tmp_path / "server.sock")
+    # A socket left over from a previous server is replaced
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(path)
+    stale.close()
+    loop = asyncio.new_event_loop()
+    listener = loop.run_until_complete(server.serve_unix(path))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        with SymbolClient(path) as first, SymbolClient(path) as second:
+            assert first.query("function", name="main")["address"] == MAIN
+            assert second.query("search", text="Fo") == ["Foo"]
+            with pytest.raises(QueryError, match="'limit'"):
+                first.query("search", text="o", limit=-5)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        listener.close()
+        loop.run_until_complete(listener.wait_closed())
+        loop.close()
@@ -0,0 +1,95 @@
+import shutil
+import subprocess
+
+import pytest
+
+from symdump.sorting import header_text
+from symdump.tests.symdata import array, definition, filename, load
+
+INT = 4
+STRUCT = 8
+UNION = 9
+ENUM = 10
+ENUM_MEMBER = 11
+POINTER = 1 << 4
+FUNCTION_POINTER = 1 << 4 | 2 << 6
+FUNCTION = 2 << 4
+
+COMPILER = shutil.which("cc") or shutil.which("gcc") or shutil.which("clang")
+
+
+def _colour() -> bytes:
+    return definition(0, 15, ENUM, 4, "Colour", [
+        definition(0, 16, ENUM_MEMBER, 4, "RED"),
+        definition(5, 16, ENUM_MEMBER, 4, "BLUE"),
+        definition(0xFFFFFFFF, 16, ENUM_MEMBER, 4, "NONE"),
+    ])
+
+
+def _types() -> list:
+    return [
+        filename("a.o"),
+        _colour(),
+        definition(0, 13, INT | FUNCTION_POINTER, 4, "Callback"),
+        definition(0, 13, INT | FUNCTION, 4, "Handler"),
+        # Node points at Tree, which is only defined after it
+        definition(0, 10, STRUCT, 12, "Node", [
+            array(0, 8, STRUCT | POINTER, 4, [], "Tree", "tree"),
+            definition(4, 8, INT | FUNCTION_POINTER, 4, "visit"),
+            array(8, 8, ENUM, 4, [], "Colour", "colour"),
+        ]),
+        definition(0, 12, UNION, 4, ".0fake", [definition(0, 11, INT, 4, "i"), array(0, 11, ENUM, 4, [], "Colour", "c")]),
+        definition(0, 10, STRUCT, 8, "Tree", [
+            array(0, 8, STRUCT | POINTER, 4, [], "Node", "root"),
+            array(4, 8, UNION, 4, [], ".0fake", "value"),
+        ]),
+        array(0, 13, STRUCT, 8, [], "Tree", "Tree"),
+        array(0, 13, ENUM, 4, [], "Colour", "Colour"),
+        # Another object file, with its own anonymous type of the same name
+        filename("b.o"),
+        definition(0, 10, STRUCT, 8, ".0fake", [definition(0, 8, INT, 4, "x"), definition(4, 8, INT, 4, "y")]),
+        array(0, 13, STRUCT, 8, [], ".0fake", "Point"),
+    ]
+
+
+def _compile(tmp_path, header: str, uses: str) -> None:
+    path = tmp_path / "types.h"
+    path.write_text(header + uses)
+    result = subprocess.run([COMPILER, "-fsyntax-only", "-Wall", "-x", "c", str(path)], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_enum_members_and_typedefs():
+    header = header_text(load(*_types()), "TYPES_H")
+    assert "\tRED = 0,\n\tBLUE = 5,\n\tNONE = -1,\n" in header
+    assert "typedef int (*Callback)();" in header
+    assert "typedef int Handler();" in header
+    assert "typedef struct Tree Tree;" in header
+    assert header.index("struct Tree;") < header.index("struct Node {") < header.index("struct Tree {")
+    assert "int x;" in header and "int i;" in header
+
+
+def test_typedef_before_its_struct():
+    # typedef struct Foo Foo; with the typedef first, which needs the struct before it
+    header = header_text(load(filename("a.o"), array(0, 13, STRUCT, 4, [], "Foo", "Foo"),
+                              definition(0, 10, STRUCT, 4, "Foo", [definition(0, 8, INT, 4, "f")])))
+    assert header.index("struct Foo {") < header.index("typedef struct Foo Foo;")
+
+
+def test_source_files_render_enums_as_before():
+    # Only the header writes enums as C, dumped source files are unchanged
+    symfile = load(filename("a.o"), _colour())
+    assert "\t RED;\t/* $zero */\n" in str(symfile.type_definitions["Colour"])
+
+
+@pytest.mark.skipif(COMPILER is None, reason="needs a C compiler")
+def test_header_compiles(tmp_path):
+    _compile(tmp_path, header_text(load(*_types()), "TYPES_H"),
+             "\nstatic Tree tree;\nstatic Point point;\nstatic Callback callback;\nstatic Colour colour = BLUE;\n")
+
+
+@pytest.mark.skipif(COMPILER is None, reason="needs a C compiler")
+def test_typedef_struct_pair_compiles(tmp_path):
+    for entries in ((array(0, 13, STRUCT, 4, [], "Foo", "Foo"), definition(0, 10, STRUCT, 4, "Foo", [definition(0, 8, INT, 4, "f")])),
+                    (definition(0, 10, STRUCT, 4, "Foo", [definition(0, 8, INT, 4, "f")]), array(0, 13, STRUCT, 4, [], "Foo", "Foo"))):
+        _compile(tmp_path, header_text(load(filename("a.o"), *entries)), "\nstatic Foo foo;\nstatic struct Foo bar;\n")
@@ -0,0 +1,12 @@
+from symdump import symbolize
+from symdump.tests.symdata import sym
+
+
+def test_main_leaves_stdout_open(tmp_path, capsys):
+    (tmp_path / "empty.sym").write_bytes(sym())
+    (tmp_path / "trace.log").write_text("pc=80010000\n")
+    for _ in range(2):
+        assert symbolize.main([str(tmp_path / "empty.sym"), str(tmp_path / "trace.log")]) == 0
+    assert capsys.readouterr().out == "80010000 ?? ??:0\n" * 2
+    print("still open")
+    assert capsys.readouterr().out == "still open\n"
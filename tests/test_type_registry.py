@@ -0,0 +1,51 @@
+import io
+
+from symdump.tests.symdata import array, definition, filename, load
+from symdump.type_registry import ORDINARY, TAG
+
+STRUCT = 8
+INT = 4
+
+
+def _foo(member: str = "x") -> bytes:
+    return definition(0, 10, STRUCT, 4, "Foo", [definition(0, 8, INT, 4, member)])
+
+
+def test_typedef_struct_pair_is_not_a_conflict():
+    # typedef struct Foo Foo;
+    registry = load(filename("a.o"), _foo(), array(0, 13, STRUCT, 4, [], "Foo", "Foo")).type_registry
+    assert set(registry.variants) == {(TAG, "Foo"), (ORDINARY, "Foo")}
+    assert registry.conflicts() == {}
+    sink = io.StringIO()
+    registry.write_report(sink)
+    assert "0 conflicting names" in sink.getvalue()
+
+
+def test_identical_definitions_are_shared():
+    registry = load(filename("a.o"), _foo(), filename("b.o"), _foo()).type_registry
+    assert registry.duplicates == 1
+    assert registry.found_in[TAG, "Foo"] == [["a.o", "b.o"]]
+    assert registry.conflicts() == {}
+
+
+def test_different_definitions_of_a_tag_conflict():
+    registry = load(filename("a.o"), _foo("x"), filename("b.o"), _foo("y")).type_registry
+    assert list(registry.conflicts()) == [(TAG, "Foo")]
+    assert registry.found_in[TAG, "Foo"] == [["a.o"], ["b.o"]]
+
+
+def _fake_user(fake_member: str, name: str) -> bytes:
+    # An anonymous struct, and a struct holding one as its member `inner`
+    return (definition(0, 10, STRUCT, 4, ".0fake", [definition(0, 8, INT, 4, fake_member)])
+            + definition(0, 10, STRUCT, 4, name, [array(0, 8, STRUCT, 4, [], ".0fake", "inner")]))
+
+
+def test_fake_types_are_rendered_from_their_own_object_file():
+    symfile = load(filename("a.o"), _fake_user("a", "Outer"), array(0, 13, STRUCT, 4, [], ".0fake", "OuterFake"),
+                   filename("b.o"), _fake_user("b", "Other"), array(0, 13, STRUCT, 4, [], ".0fake", "OtherFake"))
+    assert len(symfile.type_registry.variants[TAG, ".0fake"]) == 2
+    for name, member, other in (("Outer", "a", "b"), ("Other", "b", "a"),
+                                ("OuterFake", "a", "b"), ("OtherFake", "b", "a")):
+        text = str(symfile.type_definitions[name])
+        assert f"int {member};" in text
+        assert f"int {other};" not in text
@@ -0,0 +1,38 @@
+import os
+
+from symdump.tests.symdata import definition, filename, source_file, sym
+from symdump.watch import DumpWatcher
+
+STRUCT = 8
+INT = 4
+
+
+def _write_sym(path, member: str = "x") -> None:
+    with open(path, "wb") as f:
+        f.write(sym(filename("a.o"), source_file(0x80010000, "C:\\SRC\\A.C"),
+                    definition(0, 10, STRUCT, 4, "Foo", [definition(0, 8, INT, 4, member)])))
+
+
+def _watcher(tmp_path) -> DumpWatcher:
+    return DumpWatcher(str(tmp_path / "a.sym"), str(tmp_path / "output"), cache_dir=str(tmp_path / "cache"))
+
+
+def test_only_changed_files_are_written(tmp_path):
+    _write_sym(tmp_path / "a.sym")
+    assert sorted(_watcher(tmp_path).update().written) == ["SRC/A.C", "SRC/A.H"]
+    assert _watcher(tmp_path).update().written == []
+    _write_sym(tmp_path / "a.sym", "y")
+    assert _watcher(tmp_path).update().written == ["SRC/A.C"]
+
+
+def test_missing_and_modified_outputs_are_rewritten(tmp_path):
+    _write_sym(tmp_path / "a.sym")
+    _watcher(tmp_path).update()
+    header = tmp_path / "output" / "SRC" / "A.H"
+    expected = header.read_bytes()
+    os.remove(header)
+    assert _watcher(tmp_path).update().written == ["SRC/A.H"]
+    with open(header, "ab") as f:
+        f.write(b"/* edited */")
+    assert _watcher(tmp_path).update().written == ["SRC/A.H"]
+    assert header.read_bytes() == expected
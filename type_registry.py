@@ -0,0 +1,119 @@
+"""
+Structural deduplication of the type definitions in a SYM, see `TypeRegistry`
+"""
+from typing import Dict, List, TextIO, Tuple, Union
+
+import symdump.symbols as syms
+
+_TYPE_CLASSES = (10, 12, 13, 15)
+"""Struct, Union, Typedef and Enum"""
+
+TypeDefinition = Union[syms.DefinitionSymbol, syms.ArraySymbol]
+
+TAG = "tag"
+"""Namespace of struct, union and enum tags"""
+ORDINARY = "ordinary"
+"""Namespace of typedef names (shared with variables and functions)"""
+
+TypeKey = Tuple[str, str]
+"""Namespace and name of a type, `typedef struct Foo Foo` defines both (TAG, "Foo") and (ORDINARY, "Foo")"""
+
+
+def namespace(symbol: TypeDefinition) -> str:
+    """Which of C's namespaces the type defined by `symbol` is named in"""
+    return ORDINARY if symbol.cls == 13 else TAG
+
+
+class TypeRegistry:
+    """Keeps a single copy of each structurally distinct type definition. The same struct, union, enum or typedef is
+    usually defined again in every object file that uses it, identical copies are shared rather than stored (and
+    rendered) once per object file, and definitions that share a name without being identical are kept apart as
+    variants of that name. Names are per namespace, as in C, so `typedef struct Foo Foo` is one definition of the tag
+    `Foo` and one of the typedef `Foo`, rather than two conflicting definitions.
+
+    Two definitions are identical when their class, type, size, name and address match, along with every member's
+    offset, class, type, size, dimensions, tag and name. Anonymous (fake) types are numbered per object file, so members
+    of one are compared by the structure of the fake type in their object file rather than by its name.
+    """
+    def __init__(self):
+        self.variants: Dict[TypeKey, List[TypeDefinition]] = {}
+        """Every structurally distinct definition of each type, by namespace and name, in the order they were found"""
+        self.found_in: Dict[TypeKey, List[List[str]]] = {}
+        """Names of the object files each of `variants` is defined in"""
+        self.duplicates = 0
+        """Number of definitions that were replaced by an identical one found before them"""
+        self._shapes: Dict[tuple, Tuple[TypeDefinition, List[str]]] = {}
+        self._fakes: Dict[str, tuple] = {}
+        self._object_file: str = None
+
+    def __getstate__(self):
+        # Only needed while adding definitions, and as big as all the definitions put together
+        state = self.__dict__.copy()
+        state["_shapes"] = {}
+        state["_fakes"] = {}
+        return state
+
+    def __len__(self):
+        return sum(len(x) for x in self.variants.values())
+
+    def start_object_file(self, name: str) -> None:
+        """Called at each object file boundary, fake type names only mean something within an object file"""
+        self._fakes = {}
+        self._object_file = name
+
+    def shape(self, symbol: TypeDefinition) -> tuple:
+        """Hashable description of `symbol`'s structure, equal for definitions that would render the same"""
+        if type(symbol) is syms.ArraySymbol:
+            return (symbol.cls, symbol.descriptor.word, symbol.length, symbol.dims, self._fakes.get(symbol.tag, symbol.tag),
+                    symbol.name)
+        if symbol.children is None:
+            return symbol.cls, symbol.descriptor.word, symbol.sz, symbol.name
+        return (symbol.cls, symbol.descriptor.word, symbol.sz, symbol.name,
+                tuple((child.value, self.shape(child.symbol)) for child in symbol.children))
+
+    def add(self, entry: syms.SymbolEntry) -> TypeDefinition:
+        """Registers the type defined by `entry`. If an identical one has been seen before, `entry` is pointed at that
+        instead, and its own copy dropped
+
+        Returns:
+            TypeDefinition: The definition `entry` now holds
+        """
+        symbol = entry.symbol
+        if symbol.cls not in _TYPE_CLASSES:
+            return symbol
+        shape = self.shape(symbol)
+        fake = type(symbol) is syms.DefinitionSymbol and symbol.is_fake
+        if fake:
+            self._fakes[symbol.name] = shape
+        key = (entry.value, shape)
+        try:
+            existing, found_in = self._shapes[key]
+        except KeyError:
+            found_in = [] if self._object_file is None else [self._object_file]
+            self._shapes[key] = (symbol, found_in)
+            type_key = (namespace(symbol), symbol.name)
+            self.variants.setdefault(type_key, []).append(symbol)
+            self.found_in.setdefault(type_key, []).append(found_in)
+            return symbol
+        if self._object_file is not None and self._object_file not in found_in[-1:]:
+            found_in.append(self._object_file)
+        if existing is not symbol:
+            entry.symbol = existing
+            self.duplicates += 1
+        return existing
+
+    def conflicts(self) -> Dict[TypeKey, List[TypeDefinition]]:
+        """Named types with more than one distinct definition in the same namespace. Anonymous types aren't included,
+        their names are only unique per object file
+        """
+        return {type_key: variants for type_key, variants in self.variants.items()
+                if len(variants) > 1 and not (type(variants[0]) is syms.DefinitionSymbol and variants[0].is_fake)}
+
+    def write_report(self, sink: TextIO) -> None:
+        """Writes each conflicting type to `sink`, every variant along with the object files it's found in"""
+        conflicts = self.conflicts()
+        sink.write(f"{len(self)} distinct types, {self.duplicates} duplicates shared, {len(conflicts)} conflicting names\n")
+        for (type_namespace, name), variants in conflicts.items():
+            sink.write(f"\n{name} ({type_namespace}): {len(variants)} definitions\n")
+            for i, (variant, object_files) in enumerate(zip(variants, self.found_in[type_namespace, name])):
+                sink.write(f"/* variant {i + 1}, defined in: {', '.join(object_files)} */\n{variant}\n")
@@ -1,8 +1,22 @@
 import io
 import struct
+from typing import Tuple
 
 
 def read_pascal_string(input: io.BytesIO) -> bytes:
     str_len = int.from_bytes(input.read(1), 'little')
     value = struct.unpack(f"<{str_len}s", input.read(str_len))[0]
-    return value
\ No newline at end of file
+    return value
+
+
+def unpack_pascal_string(buffer: memoryview, offset: int) -> Tuple[str, int]:
+    """Decodes a pascal style string directly from `buffer` at `offset`
+
+    Returns:
+        Tuple[str, int]: The decoded string, and the offset of the first byte after it
+    """
+    str_len = buffer[offset]
+    end = offset + 1 + str_len
+    if end > len(buffer):
+        raise struct.error(f"pascal string at {offset} runs past the end of the buffer")
+    return str(buffer[offset + 1:end], 'ASCII'), end
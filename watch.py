@@ -0,0 +1,201 @@
+"""
+Keeps a dump up to date with a SYM file that's regenerated on every link, only rewriting the output files whose contents
+actually changed.
+
+Usage: python -m symdump.watch <file.sym> [-o OUTPUT] [-i INTERVAL] [-j WORKERS] [--once]
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import time
+from typing import Dict, List, NamedTuple, Tuple, Union
+
+from symdump.cache import cache_key, load_symfile
+from symdump.output import DirectorySink
+from symdump.symfile import map_input
+
+MANIFEST_NAME = ".symdump-manifest.json"
+"""File in the output directory recording what was written on the previous run"""
+
+
+class UpdateResult(NamedTuple):
+    """Outcome of bringing the output up to date with the SYM"""
+    written: List[str]
+    """Output files whose contents changed, relative to the output directory"""
+    unchanged: int
+    removed: List[str]
+    """Output files from the previous run that the SYM no longer produces"""
+    seconds: float
+
+    def __str__(self):
+        return f"{len(self.written)} written, {self.unchanged} unchanged, {len(self.removed)} removed in {self.seconds:.2f}s"
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class DumpWatcher:
+    """Dumps `path` into `output_dir`, comparing each output file's contents against a hash of what was written last
+    time (kept in `MANIFEST_NAME`, so this carries over between runs) and skipping the ones that are the same. An output
+    file whose size or modification time no longer matches the manifest has been changed by something else, so it's
+    compared against what's actually on disk instead, and a missing one is always written. Files written by a previous
+    run that are no longer produced are removed; nothing else in `output_dir` is touched.
+
+    The SYM goes through `load_symfile`, so switching back to a SYM that's been seen before skips parsing it, and a SYM
+    that was rewritten with the same contents isn't dumped at all.
+
+    Args:
+        path (str): SYM file to watch
+        output_dir (str): Directory to dump into
+        workers (Union[int, None]): Processes to render with, see `SymFile.render_files`
+        **load_args: Passed on to `load_symfile`
+    """
+    def __init__(self, path: str, output_dir: str = "output", workers: Union[int, None] = 1, **load_args):
+        self.path = path
+        self.output_dir = output_dir
+        self.workers = workers
+        self.load_args = load_args
+        self.manifest: Dict[str, List] = self._read_manifest()
+        """Hash, size and modification time (ns) of each output file as written, by its path within the dump (see
+        `SourceFile.relative_paths`)"""
+        self._signature: Tuple[int, int] = None
+        self._key: str = None
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.output_dir, MANIFEST_NAME)
+
+    def _read_manifest(self) -> Dict[str, List]:
+        try:
+            with open(self._manifest_path(), "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return manifest if isinstance(manifest, dict) else {}
+
+    def _write_manifest(self) -> None:
+        tmp_path = self._manifest_path() + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=0, sort_keys=True)
+        os.replace(tmp_path, self._manifest_path())
+
+    def _stat(self) -> Union[Tuple[int, int], None]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _current(self, relative: str, full_path: str, digest: str) -> Union[List, None]:
+        # The manifest entry for an output file that already holds `digest`, None if it has to be written
+        try:
+            stat = os.stat(full_path)
+        except FileNotFoundError:
+            return None
+        recorded = [digest, stat.st_size, stat.st_mtime_ns]
+        previous = self.manifest.get(relative)
+        if isinstance(previous, list) and previous[1:] == recorded[1:]:
+            return recorded if previous[0] == digest else None
+        # Not written by the last run (e.g. the first run over an existing dump), or changed since
+        with open(full_path, "rb") as f:
+            return recorded if _digest(f.read()) == digest else None
+
+    def update(self) -> Union[UpdateResult, None]:
+        """Dumps the SYM as it is now, writing only what changed
+
+        Returns:
+            Union[UpdateResult, None]: What was done, None if the SYM's contents haven't changed since the last update
+        """
+        start = time.perf_counter()
+        self._signature = self._stat()
+        with open(self.path, "rb") as f:
+            key = cache_key(map_input(f))
+        if key == self._key:
+            return None
+        with contextlib.redirect_stdout(io.StringIO()):
+            symfile = load_symfile(self.path, **self.load_args)
+        symfile.render_files(self.workers)
+
+        sink = DirectorySink(self.output_dir)
+        manifest: Dict[str, List] = {}
+        written = []
+        for source_file in symfile.source_files.values():
+            for relative, lines in zip(source_file.relative_paths(),
+                                       (source_file.text_lines, source_file.header_text_lines)):
+                data = sink.encode("".join(lines))
+                digest = _digest(data)
+                full_path = sink.full_path(relative)
+                current = self._current(relative, full_path, digest)
+                if current is None:
+                    sink.write_bytes(relative, data)
+                    stat = os.stat(full_path)
+                    current = [digest, stat.st_size, stat.st_mtime_ns]
+                    written.append(relative)
+                manifest[relative] = current
+        os.makedirs(self.output_dir, exist_ok=True)
+        removed = []
+        for relative in self.manifest.keys() - manifest.keys():
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(sink.full_path(relative))
+            removed.append(relative)
+        self.manifest = manifest
+        self._write_manifest()
+        self._key = key
+        return UpdateResult(written, len(manifest) - len(written), sorted(removed), time.perf_counter() - start)
+
+    def poll(self) -> Union[UpdateResult, None]:
+        """Updates the dump if the SYM has changed since it was last looked at, and has stopped changing (so a SYM the
+        linker is still writing isn't read half way through)
+
+        Returns:
+            Union[UpdateResult, None]: What was done, None if nothing needed doing yet
+        """
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return None
+        time.sleep(0.1)
+        if self._stat() != signature:
+            return None
+        return self.update()
+
+    def run(self, interval: float = 1.0) -> None:
+        """Polls the SYM every `interval` seconds until interrupted, printing what each update did"""
+        while True:
+            try:
+                result = self.poll()
+            except (OSError, ValueError) as e:
+                # Most likely caught the SYM being written, it'll be picked up again once it's changed
+                print(f"Failed to dump {self.path}: {type(e).__name__}: {e}")
+                self._signature = None
+            else:
+                if result is not None:
+                    print(f"{self.path}: {result}")
+            time.sleep(interval)
+
+
+def main(argv: Union[List[str], None] = None) -> int:
+    parser = argparse.ArgumentParser(description="Keep a dump up to date with a SYM file, rewriting only what changed")
+    parser.add_argument("symfile", help="SYM file to watch")
+    parser.add_argument("-o", "--output", default="output", help="Directory to dump into")
+    parser.add_argument("-i", "--interval", type=float, default=1.0, help="Seconds between checks for a changed SYM")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="Number of processes to render with")
+    parser.add_argument("--once", action="store_true", help="Update the dump once and exit, rather than watching")
+    args = parser.parse_args(argv)
+
+    watcher = DumpWatcher(args.symfile, args.output, args.workers)
+    result = watcher.update()
+    print(f"{args.symfile}: {result}")
+    if args.once:
+        return 0
+    try:
+        watcher.run(args.interval)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,53 @@
+"""
+Writing rendered symbols straight to a text sink, see `SymbolABC.write_to`
+"""
+import contextlib
+import io
+from typing import Iterator, TextIO
+
+
+class IndentWriter:
+    """Writes text to `sink` (a file, pipe, `io.StringIO` or anything else with a `write` method), starting every line
+    with `level` copies of `indent`. Indentation is added as each line is started, so `level` can be changed at any
+    point and applies from the next line on.
+
+    Args:
+        sink (TextIO): Where the text goes
+        indent (str): What one level of indentation is
+        level (int): Starting indentation level
+    """
+    def __init__(self, sink: TextIO, indent: str = "\t", level: int = 0):
+        self.sink = sink
+        self.indent = indent
+        self.level = level
+        self._line_start = True
+
+    def write(self, text: str) -> None:
+        if not text:
+            return
+        if self.level <= 0:
+            self.sink.write(text)
+        else:
+            prefix = self.indent * self.level
+            body = text[:-1] if text[-1] == "\n" else text
+            if self._line_start:
+                self.sink.write(prefix)
+            self.sink.write(body.replace("\n", "\n" + prefix))
+            if len(body) != len(text):
+                self.sink.write("\n")
+        self._line_start = text[-1] == "\n"
+
+    @contextlib.contextmanager
+    def indented(self, levels: int = 1) -> Iterator["IndentWriter"]:
+        self.level += levels
+        try:
+            yield self
+        finally:
+            self.level -= levels
+
+
+def render(symbol) -> str:
+    """Renders a symbol to a string through its `write_to` method"""
+    sink = io.StringIO()
+    symbol.write_to(IndentWriter(sink))
+    return sink.getvalue()